@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Throughput, memory and output-size benchmarks for the report generator.
+
+Builds synthetic specs of 10 to 10,000 paragraphs with every backend
+(in-memory build without cache, incremental build with a warm fragment
+cache, streaming build), checks the output with the formatting validator
+and times the hot helpers on their own, including a 1,000-row table.
+Results are written as JSON, one file per commit, so runs can be compared:
+
+    python benchmarks/bench_generate.py
+    python benchmarks/bench_generate.py --sizes 10 100 --compare benchmarks/results/abc1234.json
+"""
+
+import argparse
+import datetime
+import functools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from docx import Document
+from lxml import etree
+
+from coursework.build import build, build_streaming
+from coursework.layout import paginate
+from coursework.spec import compile_spec
+from coursework.styles import add_heading, add_para, add_paragraph, apply_styles, set_font
+from coursework.tables import add_table
+from coursework.validate import rules, validate
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+SIZES = (10, 100, 1000, 10000)
+
+SENTENCE = ('Система має забезпечувати безпечну реєстрацію та авторизацію користувачів, '
+            'створення та управління особистими цілями з різними частотами виконання. ')
+
+# Ceiling for the streaming backend on the largest spec, in MB of traced memory
+STREAM_CEILING_MB = 8
+
+TABLE_ROWS = 1000
+# Ceiling for rendering one TABLE_ROWS x 4 table, in seconds
+TABLE_CEILING_S = 1.0
+
+
+def synthetic_spec(paragraphs):
+    """Spec text with the given number of body paragraphs and a realistic mix of markup"""
+    lines = ['::: center', 'КУРСОВА РОБОТА', ':::', '---', '# ЗМІСТ', '', '::: toc', ':::']
+    for i in range(paragraphs):
+        if i % 40 == 0:
+            lines += ['---', f'# РОЗДІЛ {i // 40 + 1}', '']
+        elif i % 10 == 0:
+            lines += ['', f'## {i // 40 + 1}.{i % 40 // 10} Підрозділ', '']
+        if i % 10 == 5:
+            lines.append(f'+ Пункт переліку {i}')
+        elif i % 10 == 7:
+            lines.append(f'**Ключові слова:** {SENTENCE}')
+        else:
+            lines.append(f'{i}. {SENTENCE * 3}')
+    return '\n'.join(lines) + '\n'
+
+
+def document_stats(path):
+    """(zipped size, document.xml size, element count) of a .docx"""
+    with zipfile.ZipFile(path) as zf:
+        info = zf.getinfo('word/document.xml')
+        with zf.open(info) as f:
+            elements = sum(1 for _ in etree.iterparse(f, events=('start',)))
+    return os.path.getsize(path), info.file_size, elements
+
+
+def measure(fn, memory=True):
+    """Wall time of fn() and, optionally, its peak traced memory in a second run"""
+    start = time.perf_counter()
+    fn()
+    wall = time.perf_counter() - start
+    peak = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return wall, peak
+
+
+def run_case(name, size, fn, output, memory):
+    wall, peak = measure(fn, memory)
+    zipped, xml, elements = document_stats(output) if output else (None, None, None)
+    case = {
+        'case': name,
+        'paragraphs': size,
+        'wall_s': round(wall, 4),
+        'peak_traced_mb': round(peak / 1e6, 3) if peak is not None else None,
+        'xml_elements': elements,
+        'document_xml_bytes': xml,
+        'zipped_bytes': zipped,
+    }
+    print(f"{name:<12} {size:>6} {case['wall_s']:>9.3f}s "
+          f"{case['peak_traced_mb'] if peak is not None else '-':>9} MB "
+          f"{elements if elements is not None else '-':>8} el "
+          f"{zipped if zipped is not None else '-':>9} B")
+    return case
+
+
+def bench_sizes(sizes, memory):
+    cases = []
+    formatting = rules()
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            spec = os.path.join(tmp, f'spec{size}.md')
+            with open(spec, 'w', encoding='utf-8') as f:
+                f.write(synthetic_spec(size))
+            out = os.path.join(tmp, f'out{size}.docx')
+            cache = os.path.join(tmp, f'cache{size}')
+            build([spec], out, cache_dir=cache)
+            ops = compile_spec(spec, None)
+            cases.append(run_case('build', size, lambda: build([spec], out, cache_dir=None), out, memory))
+            cases.append(run_case('build_warm', size, lambda: build([spec], out, cache_dir=cache), out, memory))
+            cases.append(run_case('stream', size, lambda: build_streaming([spec], out, cache_dir=None), out, memory))
+            cases.append(run_case('validate', size, lambda: validate(out, formatting), None, memory))
+            cases.append(run_case('paginate', size, lambda: paginate(ops), None, memory))
+    return cases
+
+
+def bench_helpers(number=2000, repeat=3):
+    """Microseconds per call of the hot helpers, each repeat on a fresh document"""
+    text = SENTENCE * 2
+    calls = {
+        'set_font': lambda doc: functools.partial(set_font, doc.add_paragraph().add_run('x')),
+        'add_paragraph': lambda doc: functools.partial(add_paragraph, doc, text),
+        'add_para': lambda doc: functools.partial(add_para, doc, text),
+        'add_heading': lambda doc: functools.partial(add_heading, doc, 'Підрозділ', 2),
+    }
+    micro = {}
+    for name, call in calls.items():
+        seconds = min(timeit.timeit(call(apply_styles(Document())), number=number) for _ in range(repeat))
+        micro[name] = round(seconds / number * 1e6, 2)
+        print(f"{name:<14} {micro[name]:>8.2f} us/call")
+    return micro
+
+
+def bench_table(rows=TABLE_ROWS, number=5):
+    """Microseconds to add one table of the given number of rows to a fresh document"""
+    data = tuple((f'field{i}', 'String', 'String', SENTENCE[:60]) for i in range(rows))
+    docs = [apply_styles(Document()) for _ in range(number * 3)]
+    it = iter(docs)
+    seconds = min(timeit.repeat(lambda: add_table(next(it), 'Таблиця', ('Поле', 'Тип Java', 'Тип BSON', 'Опис'),
+                                                  data, (3, 3, 2, 4)), number=number, repeat=3))
+    micro = round(seconds / number * 1e6, 2)
+    print(f"{f'add_table_{rows}':<14} {micro:>8.2f} us/call")
+    return micro
+
+
+def commit_id():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(current, path):
+    """Print wall time and size ratios against an earlier results file"""
+    with open(path, encoding='utf-8') as f:
+        previous = json.load(f)
+    before = {(c['case'], c['paragraphs']): c for c in previous['cases']}
+    print(f"\nCompared with {previous['commit']}:")
+    for case in current['cases']:
+        old = before.get((case['case'], case['paragraphs']))
+        if not old:
+            continue
+        ratio = case['wall_s'] / old['wall_s'] if old['wall_s'] else float('nan')
+        line = f"{case['case']:<12} {case['paragraphs']:>6} time x{ratio:.2f}"
+        if case['zipped_bytes'] and old['zipped_bytes']:
+            line += f"  size x{case['zipped_bytes'] / old['zipped_bytes']:.2f}"
+        print(line)
+    for name, value in current['micro'].items():
+        if previous['micro'].get(name):
+            print(f"{name:<19} time x{value / previous['micro'][name]:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the coursework generator')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='numbers of paragraphs in the synthetic specs')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc runs')
+    parser.add_argument('-o', '--output', help='results file (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    print(f"{'case':<12} {'paras':>6} {'wall':>10} {'peak':>12} {'elements':>11} {'zipped':>11}")
+    results = {
+        'commit': commit_id(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'cases': bench_sizes(args.sizes, not args.no_memory),
+        'micro': bench_helpers(),
+    }
+    results['micro'][f'add_table_{TABLE_ROWS}'] = bench_table()
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\nResults saved: {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+    stream = [c for c in results['cases'] if c['case'] == 'stream' and c['peak_traced_mb'] is not None]
+    if stream and stream[-1]['peak_traced_mb'] > STREAM_CEILING_MB:
+        print(f"Streaming build exceeded {STREAM_CEILING_MB} MB: {stream[-1]['peak_traced_mb']} MB")
+        return 1
+    if results['micro'][f'add_table_{TABLE_ROWS}'] / 1e6 > TABLE_CEILING_S:
+        print(f"A {TABLE_ROWS}-row table took longer than {TABLE_CEILING_S} s")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
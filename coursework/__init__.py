@@ -0,0 +1 @@
+"""Helpers for generating the Habit Tracker coursework report."""
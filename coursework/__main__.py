@@ -0,0 +1,85 @@
+"""Command line of the report tools: python -m coursework <command> [options]
+
+Each command runs the command line of one module (build is
+generate_coursework.py). Modules are imported only when their command runs,
+so the dispatcher itself loads neither python-docx nor lxml. build hands
+its arguments to the build server (coursework.server) when one is
+listening, which makes a rebuild cost a socket round trip plus the changed
+sections; with --local, or without a server, it builds in this process.
+"""
+
+import os
+import runpy
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# command -> (module, description)
+COMMANDS = {
+    'build': ('generate_coursework', 'generate the report, through the build server when one is running'),
+    'serve': ('coursework.server', 'keep a warm build server on a Unix socket (--stop to stop it)'),
+    'watch': ('coursework.watch', 'rebuild the report whenever its sources change'),
+    'validate': ('coursework.validate', 'check a .docx against the report formatting rules'),
+    'diff': ('coursework.diff', 'compare two versions of the report paragraph by paragraph'),
+    'optimize': ('coursework.optimize', 'shrink a generated .docx without changing how it renders'),
+    'extract': ('coursework.extract', 'reconstruct the content spec of a .docx report'),
+    'batch': ('coursework.batch', 'generate one personalised report per record'),
+    'guidelines': ('coursework.guidelines', 'query the methodical guidelines'),
+    'loadtest': ('coursework.loadtest', 'load test the backend API and save the results'),
+    'dataset': ('coursework.dataset', 'generate synthetic MongoDB collections for the backend'),
+}
+
+PROG = 'python -m coursework'
+
+
+def usage():
+    lines = [f'usage: {PROG} <command> [options]', '', 'commands:']
+    lines += [f'  {name:<12}{description}' for name, (_, description) in COMMANDS.items()]
+    lines += ['', f'{PROG} <command> --help shows the options of a command']
+    return '\n'.join(lines)
+
+
+def _build(args):
+    if '--local' in args:
+        args = [arg for arg in args if arg != '--local']
+    elif not {'-h', '--help'} & set(args):
+        from coursework import server
+
+        try:
+            status, output = server.request(args)
+        except OSError:
+            # No server listening
+            status, output = None, ''
+        print(output, end='')
+        if status is not None:
+            return status
+    import generate_coursework
+
+    return generate_coursework.main(args)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0 if argv else 2
+    command, args = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f'{PROG}: unknown command {command!r}\n\n{usage()}', file=sys.stderr)
+        return 2
+    # generate_coursework.py lives next to the package
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    sys.argv = [f'{PROG} {command}', *args]
+    if command == 'build':
+        return _build(args)
+    try:
+        runpy.run_module(COMMANDS[command][0], run_name='__main__', alter_sys=True)
+    except SystemExit as e:
+        # The module's own exit status (None, a number or a message)
+        return e.code
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""Personalised reports generated in bulk from one shared template.
+
+The report body is identical for every student apart from the {{name}}
+placeholders on the title page, so a Template compiles and renders it once,
+with the placeholders left in the text. Each section becomes a serialized
+fragment of document.xml; the sections without placeholders are copied
+verbatim into every package and the others are stamped by replacing the
+placeholder bytes with the escaped values. A value that would render
+differently from plain text (line breaks, tabs, surrounding whitespace, an
+empty string) makes its section go through the renderer instead.
+
+Every other package part (styles, settings, theme, numbering, thumbnail) is
+the same for all documents and is deflated once; coursework.package copies
+the compressed bytes into each output, so a document costs one string join
+and the compression of its document.xml. Documents are written on a process
+pool, each worker holding its own copy of the template.
+
+Headings take part in the table of contents and its page estimate; when a
+heading contains a placeholder the TOC is resolved again for each document
+and the sections it changes are re-rendered. Diagrams are drawn once from
+the template, so their definitions are not personalised (captions are).
+"""
+
+import csv
+import io
+import json
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+from docx import Document
+
+from coursework import profiling
+from coursework.build import FragmentCache, _render_section, section_key, split_sections
+from coursework.diagrams import media, resolve_diagrams
+from coursework.javascan import resolve_sources
+from coursework.loadtest import resolve_results
+from coursework.package import Part, link_media, write_package
+from coursework.spec import CACHE_DIR, VARIABLE, compile_spec, substitute
+from coursework.styles import apply_styles
+from coursework.toc import resolve_toc
+
+DOCUMENT_PART = 'word/document.xml'
+DEFAULT_PATTERN = '{n:03d}_{student}.docx'
+
+_VARIABLE_BYTES = re.compile(VARIABLE.pattern.encode('ascii'))
+_UNSAFE_NAME = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+def load_records(path):
+    """Variable sets from a CSV file (one row per document) or a JSON list of objects"""
+    if path.lower().endswith('.csv'):
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            return [dict(row) for row in csv.DictReader(f)]
+    with open(path, encoding='utf-8') as f:
+        records = json.load(f)
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise ValueError(f'{path}: expected a list of objects')
+    return records
+
+
+def _inner(fragment):
+    """Children of a serialized w:body wrapper, without the declaration and the wrapper"""
+    start = fragment.index(b'>', fragment.index(b'<w:body')) + 1
+    return fragment[start:fragment.rindex(b'</w:body>')]
+
+
+def _stampable(value):
+    """Whether value renders as its escaped text in place of a placeholder"""
+    return bool(value) and value == value.strip() and not any(ch < ' ' for ch in value)
+
+
+def _package_parts(media_parts=()):
+    """Pre-compressed parts of the styled blank document plus figure media, and its document.xml"""
+    buf = io.BytesIO()
+    apply_styles(Document()).save(buf)
+    parts = []
+    with zipfile.ZipFile(buf) as package:
+        for info in package.infolist():
+            data = package.read(info)
+            if info.filename == DOCUMENT_PART:
+                document = data
+                parts.append(None)
+            else:
+                parts.append(Part(info.filename, link_media(info.filename, data, media_parts)))
+    parts.extend(Part(part.name, part.data) for part in media_parts)
+    return parts, document
+
+
+class Template:
+    """The report compiled and rendered once, stamped per set of variables"""
+
+    def __init__(self, specs, defaults=None, cache_dir=CACHE_DIR):
+        self.defaults = dict(defaults or {})
+        ops = []
+        with profiling.span('compile', specs=len(specs)):
+            for spec in specs:
+                ops.extend(compile_spec(spec, cache_dir))
+        with profiling.span('resolve_sources'):
+            ops = resolve_sources(ops, cache_dir=cache_dir)
+        with profiling.span('resolve_results'):
+            ops = resolve_results(ops)
+        with profiling.span('resolve_diagrams'):
+            self._ops = resolve_diagrams(ops, cache_dir=cache_dir)
+        with profiling.span('resolve_toc'):
+            self.sections = [section for _, section in split_sections(resolve_toc(self._ops))]
+        self.dynamic_toc = any(op[0] == 'heading' and '{{' in op[1] for op in self._ops)
+        cache = FragmentCache(cache_dir)
+        self.fragments = []
+        self.variables = []
+        for section in self.sections:
+            key = section_key(section)
+            fragment = cache.get(key)
+            if fragment is None:
+                fragment = _render_section(section)
+                cache.put(key, fragment)
+            self.fragments.append(_inner(fragment))
+            # Listings are never substituted, braces in them are code
+            self.variables.append(frozenset(VARIABLE.findall(repr([op for op in section if op[0] != 'code']))))
+        with profiling.span('package parts'):
+            self.parts, document = _package_parts(media(self._ops, cache_dir))
+        start = document.index(b'>', document.index(b'<w:body')) + 1
+        self.head, self.tail = document[:start], document[document.index(b'<w:sectPr'):]
+
+    def _sections(self, variables):
+        """Sections of the document for variables, or the template's when only the TOC is static"""
+        if not self.dynamic_toc:
+            return self.sections
+        return [section for _, section in split_sections(resolve_toc(substitute(self._ops, variables)))]
+
+    def document_xml(self, variables):
+        """document.xml of the report with the placeholders filled in"""
+        variables = {**self.defaults, **variables}
+        sections = self._sections(variables)
+        if len(sections) != len(self.sections):
+            raise ValueError('substituted variables changed the section structure')
+        values = {}
+        body = [self.head]
+        for section, template, fragment, names in zip(sections, self.sections, self.fragments, self.variables):
+            if not names:
+                if section is not template and section != template:
+                    fragment = _inner(_render_section(section))
+                body.append(fragment)
+                continue
+            filled = substitute(template, variables)
+            if section is not template and section != filled:
+                body.append(_inner(_render_section(section)))
+            elif all(_stampable(str(variables[name])) for name in names):
+                for name in names:
+                    if name not in values:
+                        values[name] = escape(str(variables[name])).encode('utf-8')
+                body.append(_VARIABLE_BYTES.sub(lambda m: values.get(m.group(1).decode('ascii'), m.group(0)),
+                                                fragment))
+            else:
+                body.append(_inner(_render_section(filled)))
+        body.append(self.tail)
+        return b''.join(body)
+
+    def write(self, variables, path):
+        """Write the personalised package to path"""
+        document = Part(DOCUMENT_PART, self.document_xml(variables))
+        write_package(path, [document if part is None else part for part in self.parts])
+        return path
+
+
+def output_path(output_dir, pattern, n, variables):
+    """File name for the n-th document, with characters unsafe in file names replaced"""
+    return os.path.join(output_dir, _UNSAFE_NAME.sub('_', pattern.format(n=n, **variables)))
+
+
+_template = None
+
+
+def _init_worker(template):
+    global _template
+    _template = template
+
+
+def _write(job):
+    variables, path = job
+    return _template.write(variables, path)
+
+
+def generate(template, records, output_dir, pattern=DEFAULT_PATTERN, jobs=None):
+    """Write one package per record and return their paths"""
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = jobs or os.cpu_count() or 1
+    work = []
+    for n, record in enumerate(records, 1):
+        variables = {**template.defaults, **record}
+        work.append((variables, output_path(output_dir, pattern, n, variables)))
+    if jobs == 1 or len(work) < 2:
+        return [template.write(*job) for job in work]
+    with ProcessPoolExecutor(min(jobs, len(work)), initializer=_init_worker, initargs=(template,)) as pool:
+        return list(pool.map(_write, work, chunksize=max(1, len(work) // (jobs * 4))))
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from generate_coursework import SPECS, load_variables
+
+    parser = argparse.ArgumentParser(description='Generate one personalised report per record')
+    parser.add_argument('records', help='CSV with a header row, or a JSON list of objects')
+    parser.add_argument('-o', '--output-dir', default='batch', help='directory for the packages')
+    parser.add_argument('-p', '--pattern', default=DEFAULT_PATTERN,
+                        help='file name pattern over the variables and {n} (default: %(default)s)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='worker processes (default: one per CPU)')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    template = Template(SPECS, load_variables())
+    prepared = time.perf_counter()
+    paths = generate(template, load_records(args.records), args.output_dir, args.pattern, args.jobs)
+    done = time.perf_counter()
+    rate = len(paths) / (done - prepared) * 60 if done > prepared else 0
+    print(f"Template prepared in {prepared - start:.2f} s")
+    print(f"Documents written: {len(paths)} to {args.output_dir} "
+          f"in {done - prepared:.2f} s ({rate:.0f} documents/min)")
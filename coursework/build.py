@@ -0,0 +1,329 @@
+"""Incremental document assembly from cached section fragments.
+
+A compiled spec is split into sections at every heading (the title page is
+the section before the first heading). Each section is rendered once into a
+w:body XML fragment and stored under .cache/fragments/ keyed by a hash of
+its operations and the style registry. A rebuild reuses the stored fragments
+and only renders the sections whose content or styles changed.
+
+Sections are independent apart from their order, so missing fragments can
+be rendered on a process pool (jobs > 1) and merged in sequence. Every
+fragment goes through the same serialize/append path and the package is
+written with fixed zip timestamps, so parallel and serial builds produce
+byte-identical files.
+
+Every stage and section runs inside a profiling span, so an active
+coursework.profiling.Tracer sees where the build time goes. Extra writers
+from coursework.emit (Markdown, HTML) receive each section's operations in
+the same pass, whether the section was rendered or reused.
+"""
+
+import collections
+import contextlib
+import copy
+import hashlib
+import io
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from docx import Document
+from docx.oxml import parse_xml
+from lxml import etree
+
+from coursework import profiling
+from coursework.layout import heading_pages, paginate
+from coursework.package import link_media
+from coursework.render import render
+from coursework.spec import CACHE_DIR, compile_spec, substitute
+from coursework.streaming import StreamingDocument
+from coursework.styles import STYLES, apply_styles, cache_style_ids
+from coursework.toc import resolve_toc
+
+# Bump whenever rendering changes in a way the section hash cannot see
+FRAGMENT_VERSION = 1
+
+_STYLES_FINGERPRINT = repr(STYLES)
+
+
+def split_sections(ops):
+    """Split compiled operations into (title, ops) sections at each heading"""
+    sections = []
+    title, current = None, []
+    for op in ops:
+        if op[0] == 'heading' and (current or title is not None):
+            sections.append((title, current))
+            current = []
+        if op[0] == 'heading':
+            title = op[1]
+        current.append(op)
+    if current:
+        sections.append((title, current))
+    return sections
+
+
+def section_key(ops):
+    """Hash of a section's operations and everything that affects its rendering"""
+    digest = hashlib.sha256(f'{FRAGMENT_VERSION}:{_STYLES_FINGERPRINT}'.encode('utf-8'))
+    digest.update(repr(ops).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def render_fragment(doc, ops):
+    """Render a section into the document body and return its XML fragment"""
+    body = doc.element.body
+    start = len(body) - 1
+    render(doc, ops)
+    wrapper = etree.Element(body.tag, nsmap=body.nsmap)
+    for el in body[start:len(body) - 1]:
+        wrapper.append(copy.deepcopy(el))
+    return etree.tostring(wrapper, encoding='UTF-8')
+
+
+def append_fragment(doc, fragment):
+    """Append a cached XML fragment to the end of the document body"""
+    sectPr = doc.element.body[-1]
+    for el in list(parse_xml(fragment)):
+        sectPr.addprevious(el)
+
+
+# Fragments most recently read or written by this process, by (cache path,
+# key), least recently used first. A key is a hash of the section's content,
+# so an entry never goes stale; a long-lived process (watch mode, the build
+# server) stops reading its fragments from disk.
+MEMORY_FRAGMENTS = 1024
+_memory = collections.OrderedDict()
+
+
+class FragmentCache:
+    """On-disk store of rendered section fragments (disabled when cache_dir is None)"""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.path = os.path.join(cache_dir, 'fragments') if cache_dir else None
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, key + '.xml')
+
+    def get(self, key):
+        if not self.path:
+            return None
+        fragment = _memory.get((self.path, key))
+        if fragment is not None:
+            _memory.move_to_end((self.path, key))
+            # The directory may have been wiped while this process kept running
+            if not os.path.exists(self._file(key)):
+                self._write(key, fragment)
+            return fragment
+        try:
+            with open(self._file(key), 'rb') as f:
+                fragment = f.read()
+        except FileNotFoundError:
+            return None
+        self._remember(key, fragment)
+        return fragment
+
+    def put(self, key, fragment):
+        if not self.path:
+            return
+        self._remember(key, fragment)
+        self._write(key, fragment)
+
+    def _write(self, key, fragment):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = self._file(key) + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(fragment)
+        os.replace(tmp, self._file(key))
+
+    def _remember(self, key, fragment):
+        _memory[self.path, key] = fragment
+        _memory.move_to_end((self.path, key))
+        while len(_memory) > MEMORY_FRAGMENTS:
+            _memory.popitem(last=False)
+
+
+_scratch = None
+_template = None
+
+
+def new_document():
+    """An empty document with the style registry applied
+
+    Parsing the default template and applying the styles is done once per
+    process; every build gets a deep copy of that document.
+    """
+    global _template
+    if _template is None:
+        _template = apply_styles(Document())
+    return copy.deepcopy(_template)
+
+
+def _render_section(ops):
+    """Render one section into a reusable scratch document and return its fragment"""
+    global _scratch
+    if _scratch is None:
+        _scratch = cache_style_ids(apply_styles(Document()))
+    body = _scratch.element.body
+    for el in body[:-1]:
+        body.remove(el)
+    return render_fragment(_scratch, ops)
+
+
+def _fragment_stats(fragment):
+    """Paragraph, run and byte counts of a serialized fragment"""
+    return {
+        'paragraphs': fragment.count(b'<w:p>') + fragment.count(b'<w:p '),
+        'runs': fragment.count(b'<w:r>') + fragment.count(b'<w:r '),
+        'bytes': len(fragment),
+    }
+
+
+def _compile(specs, cache_dir, variables=None):
+    ops = []
+    with profiling.span('compile', specs=len(specs)):
+        for spec in specs:
+            ops.extend(compile_spec(spec, cache_dir))
+    if variables is not None:
+        with profiling.span('substitute', variables=len(variables)):
+            ops = substitute(ops, variables)
+    # The resolvers are imported only for specs that use their blocks, so a
+    # plain spec does not load the source scanner, load test or diagram code
+    if _uses(ops, 'java'):
+        from coursework.javascan import resolve_sources
+
+        with profiling.span('resolve_sources'):
+            ops = resolve_sources(ops, cache_dir=cache_dir)
+    if _uses(ops, 'loadtest'):
+        from coursework.loadtest import resolve_results
+
+        with profiling.span('resolve_results'):
+            ops = resolve_results(ops)
+    if _uses(ops, 'diagram'):
+        from coursework.diagrams import resolve_diagrams
+
+        with profiling.span('resolve_diagrams'):
+            ops = resolve_diagrams(ops, cache_dir=cache_dir)
+    with profiling.span('resolve_toc'):
+        return resolve_toc(ops)
+
+
+def _uses(ops, kind):
+    return any(op[0] == kind for op in ops)
+
+
+def _media(ops, cache_dir):
+    """Media parts of the figures in ops (coursework.diagrams.media())"""
+    if not _uses(ops, 'figure'):
+        return []
+    from coursework.diagrams import media
+
+    return media(ops, cache_dir)
+
+
+def save(doc, output, parts=()):
+    """Save the package with fixed zip timestamps so equal content gives equal bytes
+
+    The package is written next to output and moved over it, so the file is
+    never seen half-written (a watcher rebuilding it while Word reloads it).
+    parts are the figures' media parts (coursework.diagrams.media()), added
+    after the document's own parts together with their relationships.
+    """
+    buf = io.BytesIO()
+    doc.save(buf)
+    tmp = f'{output}.{os.getpid()}.tmp'
+    try:
+        with zipfile.ZipFile(buf) as src, zipfile.ZipFile(tmp, 'w', zipfile.ZIP_DEFLATED) as dst:
+            for info in src.infolist():
+                data = link_media(info.filename, src.read(info), parts)
+                dst.writestr(zipfile.ZipInfo(info.filename), data, zipfile.ZIP_DEFLATED)
+            for part in parts:
+                dst.writestr(zipfile.ZipInfo(part.name), part.data, zipfile.ZIP_DEFLATED)
+        os.replace(tmp, output)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+        raise
+
+
+def _estimate(sections, ops):
+    """Estimated start page of every section and the total page count"""
+    with profiling.span('paginate'):
+        pages, total = paginate(ops)
+        headings = iter(heading_pages(ops, pages))
+        # Only the title page section has no heading
+        return [next(headings)[2] if title is not None else 1 for title, _ in sections], total
+
+
+def _feed(writers, ops):
+    for writer in writers:
+        for op in ops:
+            writer.write(op)
+
+
+@contextlib.contextmanager
+def _closing(writers):
+    """Close the extra writers when the build ends, whether or not it succeeded"""
+    try:
+        yield
+    finally:
+        for writer in writers:
+            writer.close()
+
+
+def build(specs, output, cache_dir=CACHE_DIR, jobs=1, variables=None, writers=()):
+    """Assemble the document from spec files, rendering only changed sections
+
+    {{name}} placeholders are filled from variables when given, and every
+    operation is also handed to the extra writers, which are closed at the
+    end. Returns the document, the titles of the re-rendered sections and
+    the estimated page count.
+    """
+    with _closing(writers):
+        doc = new_document()
+        cache = FragmentCache(cache_dir)
+        ops = _compile(specs, cache_dir, variables)
+        sections = split_sections(ops)
+        keys = [section_key(section) for _, section in sections]
+        fragments = [cache.get(key) for key in keys]
+        missing = [i for i, fragment in enumerate(fragments) if fragment is None]
+        starts, pages = _estimate(sections, ops)
+        results = {}
+        if jobs > 1 and len(missing) > 1:
+            with profiling.span('render pool', jobs=jobs, sections=len(missing)):
+                with ProcessPoolExecutor(min(jobs, len(missing))) as pool:
+                    results = dict(zip(missing, pool.map(_render_section, [sections[i][1] for i in missing])))
+        for i, (title, section) in enumerate(sections):
+            with profiling.span(title or '(title page)', 'section') as stats:
+                fragment = fragments[i]
+                if fragment is None:
+                    fragment = results.pop(i, None) or _render_section(section)
+                    cache.put(keys[i], fragment)
+                append_fragment(doc, fragment)
+                _feed(writers, section)
+                stats.update(cached=fragments[i] is not None, page=starts[i], **_fragment_stats(fragment))
+        with profiling.span('save'):
+            save(doc, output, _media(ops, cache_dir))
+    return doc, [sections[i][0] for i in missing], pages
+
+
+def build_streaming(specs, output, cache_dir=CACHE_DIR, variables=None, writers=()):
+    """Render spec files straight into the output package with flat memory use
+
+    Extra writers get every operation as well and are closed at the end.
+    Returns the closed streaming document and the estimated page count.
+    """
+    with _closing(writers):
+        ops = _compile(specs, cache_dir, variables)
+        sections = split_sections(ops)
+        starts, pages = _estimate(sections, ops)
+        with StreamingDocument(output) as doc:
+            for (title, section), page in zip(sections, starts):
+                with profiling.span(title or '(title page)', 'section') as stats:
+                    written = doc.paragraphs_written
+                    render(doc, section)
+                    _feed(writers, section)
+                    stats.update(paragraphs=doc.paragraphs_written - written, page=page)
+            doc.add_media(_media(ops, cache_dir))
+    return doc, pages
@@ -0,0 +1,777 @@
+"""Synthetic data for the backend's MongoDB collections at production scale.
+
+Generates users, their goals and daily progress logs, groups with their
+memberships, the achievements of DataSeeder and the user achievements the
+progress earns, as mongoimport-ready JSON lines (MongoDB Extended JSON).
+
+The shape of the data comes from the sources, not from this file: field
+names, references between collections and enum constants are checked
+against the @Document classes (coursework.javascan.schemas()) before
+anything is written, and the achievements are read from DataSeeder. A
+renamed field or a new enum constant stops the generator instead of
+producing documents the backend cannot read.
+
+Sampling is done in NumPy batches of CHUNK_USERS users:
+
+- sign-ups grow exponentially over the time frame; goals per user follow a
+  negative binomial distribution (most users have a few, some many)
+- every goal gets a frequency, an optional end date and a lifetime after
+  which its owner gives up; check-ins form a two-state Markov chain per goal
+  (keep going / resume after a miss), which gives the geometric streak
+  lengths real habit trackers see
+- group popularity is Zipf distributed, so a few groups hold most members,
+  and private groups have pending and rejected requests
+- user achievements follow AchievementService: awarded per goal at the
+  first check-in that satisfies the rule (GOAL_COMPLETED at the first
+  check-in, as the service does)
+
+ObjectIds are built from the creation time, a collection tag and a
+sequence number, so a reference is computed from the referenced document's
+index instead of being looked up, and integrity holds by construction.
+
+Documents are rendered without per-document Python: every collection has a
+fixed-width line layout (values are padded with whitespace, which JSON
+ignores), the columns are encoded as byte matrices and copied into the
+lines, and the lines go to disk in files of at most FILE_DOCS documents.
+Memory stays flat apart from the groups, which are held for the whole run.
+verify() reads the files back through the same fixed offsets and checks
+every reference.
+
+    python -m coursework.dataset -u 1000000 -o dataset
+    python -m coursework.dataset --verify dataset
+"""
+
+import json
+import os
+import re
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from coursework.javascan import SOURCE_ROOT, scan, schemas
+from coursework.spec import CACHE_DIR
+
+USERS = 100_000
+CHUNK_USERS = 10_000
+FILE_DOCS = 1_000_000
+RENDER_ROWS = 1 << 16
+
+END = '2025-06-01'
+DAYS = 365
+DAY = 86400
+# Sign-ups per day grow by e^GROWTH over the time frame
+GROWTH = 1.5
+
+GOALS_PER_USER = 3.0
+GOAL_DISPERSION = 1.5
+GOAL_DELAY_DAYS = 14
+# Share of goals with an end date and its range in weeks
+ENDED_SHARE = 0.4
+END_WEEKS = (4, 26)
+# Mean periods before a goal is given up, by frequency
+FREQUENCIES = {'DAILY': (6, 1, 45), 'WEEKLY': (3, 7, 12), 'MONTHLY': (1, 30, 6)}
+FIRST_CHECKIN = 0.9
+# Beta distributions of checking in after a check-in and after a miss
+KEEP = (6, 2)
+RESUME = (2, 4)
+COMPLETE_ADHERENCE = 0.6
+PAUSE_SHARE = 0.35
+# Check-in hour, mean and deviation
+CHECKIN_HOUR = (19.5, 3.0)
+
+USERS_PER_GROUP = 50
+GROUP_DELAY_DAYS = 20
+GROUP_SHARE = 0.4
+GROUPS_PER_MEMBER = 1.8
+MAX_GROUPS = 8
+GROUP_ZIPF = 1.1
+JOIN_DELAY_DAYS = 7
+
+ROLES = {'USER': 999, 'ADMIN': 1}
+USER_STATUSES = {'ACTIVE': 995, 'BLOCKED': 5}
+VISIBILITIES = {'PUBLIC': 8, 'PRIVATE': 2}
+PENDING_STATUSES = {'APPROVED': 7, 'PENDING': 2, 'REJECTED': 1}
+
+# bcrypt("password") with 12 rounds, as NFR2.1 requires
+PASSWORD_HASH = '$2b$12$j9eT8MJ501jEGth2247r.OLdaELLbvMmANpLeYz0Wjbm9Du0F8GAG'
+
+FIRST_NAMES = ('Олександр', 'Андрій', 'Дмитро', 'Максим', 'Іван', 'Богдан', 'Тарас', 'Назар', 'Олег', 'Юрій',
+               'Марія', 'Олена', 'Анна', 'Катерина', 'Ірина', 'Софія', 'Дарина', 'Наталія', 'Вікторія', 'Юлія')
+LAST_NAMES = ('Шевченко', 'Коваленко', 'Бондаренко', 'Ткаченко', 'Кравченко', 'Олійник', 'Шевчук', 'Поліщук',
+              'Бойко', 'Мельник', 'Лисенко', 'Руденко', 'Савченко', 'Марченко', 'Гончаренко', 'Мороз')
+GOAL_TITLES = ('Ранкова зарядка', 'Читати 30 хвилин', 'Пити 2 л води', 'Медитація 10 хвилин',
+               'Вивчати англійську', '10 000 кроків', 'Без солодкого', 'Пробіжка 5 км', 'Лягати до 23:00',
+               'Вести щоденник', 'Планувати бюджет', 'Прибирання', 'Йога', 'Подзвонити батькам',
+               'Прочитати книгу', 'Відвідати басейн')
+GOAL_DESCRIPTIONS = (None, None, 'Щодня без винятків', 'Для здоров’я', 'Підготовка до іспиту',
+                     'Разом з друзями', 'Маленькими кроками')
+GROUP_TOPICS = ('Ранні пташки', 'Біг', 'Читацький клуб', 'Англійська щодня', 'Здорове харчування',
+                'Медитація', 'Фітнес', 'Продуктивність', 'Фінансова грамотність', 'Йога')
+GROUP_DESCRIPTIONS = (None, 'Підтримуємо одне одного', 'Звітуємо щодня', 'Для початківців')
+NOTES = (None, None, None, None, None, None, None, None, 'Виконано', 'Було важко', 'Легко',
+         'Наполовину', 'Із запізненням', 'Чудовий день')
+VALUES = (1.0, 1.0, 1.0, 0.5, 1.5, 2.0)
+
+# Collections in the order they are written; the position is the ObjectId tag
+COLLECTIONS = ('achievements', 'users', 'groups', 'group_memberships', 'goals', 'progress_logs',
+               'user_achievements')
+TAGS = {name: n for n, name in enumerate(COLLECTIONS, 1)}
+
+MANIFEST = 'manifest.json'
+
+Value = namedtuple('Value', 'field data reference choices')
+
+
+class DatasetError(ValueError):
+    """Raised when the generator and the entity classes disagree, or written data is inconsistent"""
+
+
+# Encoders: every one returns an (n, width) uint8 matrix of padded JSON values
+
+_HEX = np.frombuffer(b'0123456789abcdef', np.uint8)
+_UNHEX = np.zeros(256, np.uint8)
+_UNHEX[_HEX] = np.arange(16, dtype=np.uint8)
+# Two characters per lookup: the hex digits of every byte, the decimal digits of 0-99
+_HEX_PAIRS = np.stack([np.repeat(_HEX, 16), np.tile(_HEX, 16)], axis=1).copy().view(np.uint16).ravel()
+_PAIRS = np.frombuffer(''.join(f'{n:02d}' for n in range(100)).encode('ascii'), np.uint8).reshape(100, 2)
+_DATE = np.frombuffer(b'{"$date":"0000-00-00T00:00:00Z"}', np.uint8)
+_OID = np.frombuffer(b'{"$oid":"000000000000000000000000"}', np.uint8)
+_NULL = np.frombuffer(b'null', np.uint8)
+
+
+def _digits(out, column, values, width):
+    """Write values as zero-padded decimal digits into out[:, column:column + width]"""
+    end = column + width
+    for k in range(0, width - 1, 2):
+        out[:, end - k - 2:end - k] = _PAIRS[values // 10 ** k % 100]
+    if width % 2:
+        out[:, column] = 48 + values // 10 ** (width - 1) % 10
+
+
+def _hex_ids(ts, tag, seq):
+    n = len(ts)
+    raw = np.empty((n, 12), np.uint8)
+    raw[:, :4] = ts.astype('>u4').view(np.uint8).reshape(n, 4)
+    raw[:, 4] = tag
+    raw[:, 5:] = seq.astype('>u8').view(np.uint8).reshape(n, 8)[:, 1:]
+    return _HEX_PAIRS[raw].view(np.uint8)
+
+
+def _oid(ts, tag, seq):
+    out = np.tile(_OID, (len(ts), 1))
+    out[:, 9:33] = _hex_ids(ts, tag, seq)
+    return out
+
+
+def _ref(ts, tag, seq, null=None):
+    """A reference: the id as a string (Spring stores String ...Id fields so), null where null is set"""
+    out = np.full((len(ts), 26), 32, np.uint8)
+    out[:, 0] = out[:, 25] = 34
+    out[:, 1:25] = _hex_ids(ts, tag, seq)
+    if null is not None:
+        out[null] = 32
+        out[null, :4] = _NULL
+    return out
+
+
+def _civil(days):
+    """Year, month and day of days since 1970-01-01 (proleptic Gregorian)"""
+    z = days + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = np.where(mp < 10, mp + 3, mp - 9)
+    return yoe + era * 400 + (month <= 2), month, day
+
+
+def _date(seconds, null=None):
+    out = np.tile(_DATE, (len(seconds), 1))
+    if not len(seconds):
+        return out
+    # The dates span a few hundred days: format each day once and look them up
+    days = seconds // DAY
+    first = days.min()
+    calendar = np.tile(np.frombuffer(b'0000-00-00', np.uint8), (days.max() - first + 1, 1))
+    year, month, day = _civil(np.arange(first, days.max() + 1))
+    for column, values, width in ((0, year, 4), (5, month, 2), (8, day, 2)):
+        _digits(calendar, column, values, width)
+    out[:, 10:20] = calendar[days - first]
+    rest = seconds - days * DAY
+    for column, values in ((21, rest // 3600), (24, rest // 60 % 60), (27, rest % 60)):
+        out[:, column:column + 2] = _PAIRS[values]
+    if null is not None:
+        out[null] = 32
+        out[null, :4] = _NULL
+    return out
+
+
+@lru_cache(maxsize=None)
+def _table(values):
+    tokens = [json.dumps(value, ensure_ascii=False).encode('utf-8') for value in values + (None,)]
+    width = max(len(token) for token in tokens)
+    return np.frombuffer(b''.join(token.ljust(width) for token in tokens), np.uint8).reshape(len(tokens), width)
+
+
+def _choice(values, codes):
+    """values[code] for every code, null for negative codes"""
+    table = _table(tuple(values))
+    return table[np.where(codes < 0, len(values), codes)]
+
+
+def _integer(values, width):
+    out = np.full((len(values), width), 32, np.uint8)
+    _digits(out, 0, values, width)
+    # Leading zeros are not JSON: blank them, keeping the last digit
+    for k in range(width - 1):
+        lead = (values < 10 ** (width - 1 - k)) & (out[:, k] == 48)
+        out[lead, k] = 32
+    return out
+
+
+def _email(seq, digits):
+    out = np.tile(np.frombuffer(b'"user' + b'0' * digits + b'@example.com"', np.uint8), (len(seq), 1))
+    _digits(out, 5, seq, digits)
+    return out
+
+
+def _weights(choices):
+    p = np.array(list(choices.values()), float)
+    return tuple(choices), p / p.sum()
+
+
+class Layout:
+    """Fixed-width line of a collection: the field names around a slot per value"""
+
+    def __init__(self, values):
+        self.fields = {}
+        pieces, offset = [], 0
+        for n, value in enumerate(values):
+            key = ('{' if not n else ',') + json.dumps(value.field) + ':'
+            pieces.append(key.encode('utf-8') + b' ' * value.data.shape[1])
+            offset += len(pieces[-1])
+            self.fields[value.field] = (offset - value.data.shape[1], value.data.shape[1])
+        self.template = np.frombuffer(b''.join(pieces) + b'}\n', np.uint8)
+        self.width = len(self.template)
+
+    def render(self, values):
+        """(n, width) matrix of the lines"""
+        out = np.empty((len(values[0].data), self.width), np.uint8)
+        end = 0
+        for value in values:
+            start, width = self.fields[value.field]
+            out[:, end:start] = self.template[end:start]
+            out[:, start:start + width] = value.data
+            end = start + width
+        out[:, end:] = self.template[end:]
+        return out
+
+
+class _Empty(dict):
+    """Raw columns of zero rows, for describing a collection without generating it"""
+
+    def __missing__(self, key):
+        return np.zeros(0, np.int64)
+
+
+def _achievement_rules(root=SOURCE_ROOT):
+    """(name, description, rule type, rule value) of the achievements DataSeeder creates"""
+    path = next((os.path.join(root, item.path) for item in scan(root, CACHE_DIR) if item.name == 'DataSeeder'), None)
+    if path is None:
+        raise DatasetError(f'no DataSeeder under {root}')
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    rules = []
+    for builder in re.findall(r'Achievement\.builder\(\)(.*?)\.build\(\)', source, re.S):
+        calls = dict(re.findall(r'\.(\w+)\(\s*([^()]*?)\s*\)', builder))
+        rules.append((json.loads(calls['name']), json.loads(calls.get('description', 'null')),
+                      calls['ruleType'].rsplit('.', 1)[-1], int(calls['ruleValue'])))
+    return tuple(rules)
+
+
+class Dataset:
+    """Generator state shared by all chunks: the time frame, the groups and the achievements"""
+
+    def __init__(self, users=USERS, seed=0, end=END, days=DAYS, root=SOURCE_ROOT):
+        self.user_count = users
+        self.seed = seed
+        self.end = int(np.datetime64(end, 's').astype(np.int64))
+        self.start = self.end - days * DAY
+        self.digits = len(str(max(users - 1, 1)))
+        self.names = tuple(f'{first} {last}' for first in FIRST_NAMES for last in LAST_NAMES)
+        self.rules = _achievement_rules(root)
+        self.frequencies = tuple(FREQUENCIES)
+        self.roles, self.role_p = _weights(ROLES)
+        self.user_statuses, self.user_status_p = _weights(USER_STATUSES)
+        self.visibilities, self.visibility_p = _weights(VISIBILITIES)
+        self.pending_statuses, self.pending_p = _weights(PENDING_STATUSES)
+        self.goal_statuses = ('ACTIVE', 'COMPLETED', 'PAUSED')
+        self.group_roles = ('OWNER', 'MEMBER')
+        self.rule_types = ('STREAK_DAYS', 'TOTAL_CHECKINS', 'GOAL_COMPLETED')
+        rng = np.random.default_rng([seed, 0])
+        count = max(1, -(-users // USERS_PER_GROUP))
+        self.group_owner = rng.integers(0, users, count)
+        created = self.user_created(self.group_owner) + (rng.exponential(GROUP_DELAY_DAYS, count) * DAY).astype(np.int64)
+        self.group_created = np.minimum(created, self.end - 1)
+        self.group_visibility = rng.choice(len(self.visibilities), count, p=self.visibility_p)
+        popularity = (rng.permutation(count) + 1.0) ** -GROUP_ZIPF
+        self.group_cdf = np.cumsum(popularity) / popularity.sum()
+        self.group_name = rng.integers(0, len(GROUP_TOPICS), count)
+        self.group_description = rng.integers(0, len(GROUP_DESCRIPTIONS), count)
+
+    def user_created(self, index):
+        """Sign-up time of users by index, growing exponentially towards the end"""
+        u = (np.asarray(index, np.float64) + 0.5) / self.user_count
+        return self.start + (np.log1p(u * np.expm1(GROWTH)) / GROWTH * (self.end - self.start - DAY)).astype(np.int64)
+
+    # Columns of every collection, from raw arrays
+
+    def achievements(self, raw):
+        ts = np.full(len(raw['seq']), self.start, np.int64)
+        return [
+            Value('_id', _oid(ts, TAGS['achievements'], raw['seq']), None, None),
+            Value('name', _choice([rule[0] for rule in self.rules], raw['seq']), None, None),
+            Value('description', _choice([rule[1] for rule in self.rules], raw['seq']), None, None),
+            Value('iconUrl', _choice((), np.full(len(ts), -1)), None, None),
+            Value('ruleType', _choice(self.rule_types, raw['rule']), None, self.rule_types),
+            Value('ruleValue', _integer(raw['value'], 6), None, None),
+        ]
+
+    def users(self, raw):
+        created = raw['created']
+        return [
+            Value('_id', _oid(created, TAGS['users'], raw['seq']), None, None),
+            Value('email', _email(raw['seq'], self.digits), None, None),
+            Value('passwordHash', _choice((PASSWORD_HASH,), np.zeros(len(created), np.int64)), None, None),
+            Value('displayName', _choice(self.names, raw['name']), None, None),
+            Value('role', _choice(self.roles, raw['role']), None, self.roles),
+            Value('status', _choice(self.user_statuses, raw['status']), None, self.user_statuses),
+            Value('createdAt', _date(created), None, None),
+            Value('updatedAt', _date(created), None, None),
+        ]
+
+    def groups(self, raw):
+        created, owner = raw['created'], raw['owner']
+        return [
+            Value('_id', _oid(created, TAGS['groups'], raw['seq']), None, None),
+            Value('name', _choice(GROUP_TOPICS, raw['name']), None, None),
+            Value('description', _choice(GROUP_DESCRIPTIONS, raw['description']), None, None),
+            Value('visibility', _choice(self.visibilities, raw['visibility']), None, self.visibilities),
+            Value('ownerId', _ref(self.user_created(owner), TAGS['users'], owner), 'users', None),
+            Value('createdAt', _date(created), None, None),
+            Value('updatedAt', _date(created), None, None),
+        ]
+
+    def group_memberships(self, raw):
+        group, user = raw['group'], raw['user']
+        return [
+            Value('_id', _oid(raw['created'], TAGS['group_memberships'], raw['seq']), None, None),
+            Value('groupId', _ref(self.group_created[group], TAGS['groups'], group), 'groups', None),
+            Value('userId', _ref(self.user_created(user), TAGS['users'], user), 'users', None),
+            Value('role', _choice(self.group_roles, raw['role']), None, self.group_roles),
+            Value('status', _choice(self.pending_statuses, raw['status']), None, self.pending_statuses),
+            Value('createdAt', _date(raw['created']), None, None),
+        ]
+
+    def goals(self, raw):
+        created, user = raw['created'], raw['user']
+        return [
+            Value('_id', _oid(created, TAGS['goals'], raw['seq']), None, None),
+            Value('userId', _ref(self.user_created(user), TAGS['users'], user), 'users', None),
+            Value('title', _choice(GOAL_TITLES, raw['title']), None, None),
+            Value('description', _choice(GOAL_DESCRIPTIONS, raw['description']), None, None),
+            Value('frequency', _choice(self.frequencies, raw['frequency']), None, self.frequencies),
+            Value('startDate', _date(raw['start_day'] * DAY), None, None),
+            Value('endDate', _date(raw['end_day'] * DAY, raw['end_day'] < 0), None, None),
+            Value('isPublic', _choice((False, True), raw['public']), None, None),
+            Value('status', _choice(self.goal_statuses, raw['status']), None, self.goal_statuses),
+            Value('createdAt', _date(created), None, None),
+            Value('updatedAt', _date(raw['updated']), None, None),
+        ]
+
+    def progress_logs(self, raw):
+        user = raw['user']
+        return [
+            Value('_id', _oid(raw['created'], TAGS['progress_logs'], raw['seq']), None, None),
+            Value('goalId', _ref(raw['goal_created'], TAGS['goals'], raw['goal']), 'goals', None),
+            Value('userId', _ref(self.user_created(user), TAGS['users'], user), 'users', None),
+            Value('date', _date(raw['day'] * DAY), None, None),
+            Value('value', _choice(VALUES, raw['value']), None, None),
+            Value('note', _choice(NOTES, raw['note']), None, None),
+            Value('createdAt', _date(raw['created']), None, None),
+        ]
+
+    def user_achievements(self, raw):
+        user, achievement = raw['user'], raw['achievement']
+        return [
+            Value('_id', _oid(raw['earned'], TAGS['user_achievements'], raw['seq']), None, None),
+            Value('userId', _ref(self.user_created(user), TAGS['users'], user), 'users', None),
+            Value('achievementId', _ref(np.full(len(user), self.start, np.int64), TAGS['achievements'], achievement),
+                  'achievements', None),
+            Value('goalId', _ref(raw['goal_created'], TAGS['goals'], raw['goal']), 'goals', None),
+            Value('earnedAt', _date(raw['earned']), None, None),
+        ]
+
+    def columns(self, collection, raw):
+        """Values of a collection's documents from raw columns, in field order"""
+        return getattr(self, collection)(raw)
+
+    def check(self, found):
+        """Raise DatasetError unless every collection matches its entity class"""
+        problems = []
+        for collection in COLLECTIONS:
+            if collection not in found:
+                problems.append(f'{collection}: no @Document class')
+                continue
+            values = {value.field: value for value in self.columns(collection, _Empty())}
+            fields = {'_id' if field.name == 'id' else field.name: field for field in found[collection]}
+            if set(values) != set(fields):
+                problems.append(f'{collection}: generated fields {sorted(values)}, entity has {sorted(fields)}')
+                continue
+            for name, field in fields.items():
+                value = values[name]
+                if (value.reference or '') != field.reference:
+                    problems.append(f'{collection}.{name}: generated reference to {value.reference or "nothing"}, '
+                                    f'entity refers to {field.reference or "nothing"}')
+                if value.choices is not None and set(value.choices) != set(field.constants):
+                    problems.append(f'{collection}.{name}: generated {", ".join(value.choices)}, '
+                                    f'enum has {", ".join(field.constants)}')
+            for name, value in values.items():
+                if value.reference and value.reference not in COLLECTIONS:
+                    problems.append(f'{collection}.{name}: {value.reference} is not generated')
+        if problems:
+            raise DatasetError('the generator does not match the entity classes:\n  ' + '\n  '.join(problems))
+
+    # Sampling
+
+    def achievement_rows(self):
+        n = len(self.rules)
+        return {'seq': np.arange(n), 'rule': np.array([self.rule_types.index(rule[2]) for rule in self.rules]),
+                'value': np.array([rule[3] for rule in self.rules])}
+
+    def group_rows(self):
+        count = len(self.group_owner)
+        groups = {'seq': np.arange(count), 'created': self.group_created, 'owner': self.group_owner,
+                  'visibility': self.group_visibility, 'name': self.group_name,
+                  'description': self.group_description}
+        owners = {'seq': np.arange(count), 'group': np.arange(count), 'user': self.group_owner,
+                  'role': np.full(count, self.group_roles.index('OWNER')),
+                  'status': np.full(count, self.pending_statuses.index('APPROVED')),
+                  'created': self.group_created}
+        return groups, owners
+
+    def user_rows(self, rng, users):
+        n = len(users)
+        return {'seq': users, 'created': self.user_created(users), 'name': rng.integers(0, len(self.names), n),
+                'role': rng.choice(len(self.roles), n, p=self.role_p),
+                'status': rng.choice(len(self.user_statuses), n, p=self.user_status_p)}
+
+    def membership_rows(self, rng, users):
+        joined = users[rng.random(len(users)) < GROUP_SHARE]
+        k = np.minimum(rng.geometric(1 / GROUPS_PER_MEMBER, len(joined)), MAX_GROUPS)
+        user = np.repeat(joined, k)
+        group = np.minimum(np.searchsorted(self.group_cdf, rng.random(len(user)), side='right'),
+                           len(self.group_cdf) - 1)
+        count = len(self.group_cdf)
+        _, first = np.unique(user * count + group, return_index=True)
+        user, group = user[first], group[first]
+        keep = self.group_owner[group] != user
+        user, group = user[keep], group[keep]
+        created = (np.maximum(self.user_created(user), self.group_created[group])
+                   + (rng.exponential(JOIN_DELAY_DAYS, len(user)) * DAY).astype(np.int64))
+        keep = created < self.end
+        user, group, created = user[keep], group[keep], created[keep]
+        status = np.where(self.group_visibility[group] == self.visibilities.index('PRIVATE'),
+                          rng.choice(len(self.pending_statuses), len(user), p=self.pending_p),
+                          self.pending_statuses.index('APPROVED'))
+        return {'group': group, 'user': user, 'role': np.full(len(user), self.group_roles.index('MEMBER')),
+                'status': status,
+                'created': created}
+
+    def goal_rows(self, rng, users):
+        """Goals of users, their progress logs and the achievements the logs earn"""
+        per_user = rng.negative_binomial(GOAL_DISPERSION, GOAL_DISPERSION / (GOAL_DISPERSION + GOALS_PER_USER),
+                                         len(users))
+        user = np.repeat(users, per_user)
+        created = np.repeat(self.user_created(users), per_user) + (
+            rng.exponential(GOAL_DELAY_DAYS, len(user)) * DAY).astype(np.int64)
+        keep = created < self.end - DAY
+        user, created = user[keep], created[keep]
+        n = len(user)
+        weights = np.array([FREQUENCIES[name][0] for name in self.frequencies], float)
+        frequency = rng.choice(len(weights), n, p=weights / weights.sum())
+        period = np.array([FREQUENCIES[name][1] for name in self.frequencies])[frequency]
+        lifetime = rng.geometric(1 / np.array([FREQUENCIES[name][2] for name in self.frequencies])[frequency])
+        start_day = created // DAY
+        horizon = self.end // DAY
+        ends = rng.random(n) < ENDED_SHARE
+        end_day = np.where(ends, start_day + rng.integers(END_WEEKS[0], END_WEEKS[1] + 1, n) * 7, -1)
+        last_day = np.where(ends, np.minimum(end_day, horizon), horizon)
+        cap = np.maximum(0, -(-(last_day - start_day) // period))
+        periods = np.minimum(lifetime, cap)
+        keep_p, resume_p = rng.beta(*KEEP, n), rng.beta(*RESUME, n)
+
+        # Check-ins period by period, goals sorted by length so the live ones are a prefix
+        order = np.argsort(-periods, kind='stable')
+        live = -periods[order]
+        keep_p, resume_p = keep_p[order], resume_p[order]
+        state = np.zeros(n, bool)
+        run = np.zeros(n, np.int64)
+        count = np.zeros(n, np.int64)
+        daily = (period == 1)[order]
+        checkins = sorted({rule[3] for rule in self.rules if rule[2] == 'TOTAL_CHECKINS'} | {1})
+        streaks = sorted({rule[3] for rule in self.rules if rule[2] == 'STREAK_DAYS'})
+        reached = {('TOTAL_CHECKINS', v): np.full(n, -1) for v in checkins}
+        reached.update({('STREAK_DAYS', v): np.full(n, -1) for v in streaks})
+        hits, steps, logged = [], [], 0
+        for t in range(int(periods.max()) if n else 0):
+            alive = np.searchsorted(live, -t, side='left')
+            draw = rng.random(alive)
+            state[:alive] = draw < (np.where(state[:alive], keep_p[:alive], resume_p[:alive]) if t else FIRST_CHECKIN)
+            run[:alive] = np.where(state[:alive], run[:alive] + 1, 0)
+            hit = np.flatnonzero(state[:alive])
+            count[hit] += 1
+            position = logged + np.arange(len(hit))
+            for v in checkins:
+                first = count[hit] == v
+                reached['TOTAL_CHECKINS', v][hit[first]] = position[first]
+            days = np.where(daily[hit], run[hit], 1)
+            for v in streaks:
+                first = (days >= v) & (reached['STREAK_DAYS', v][hit] < 0)
+                reached['STREAK_DAYS', v][hit[first]] = position[first]
+            hits.append(hit)
+            steps.append(np.full(len(hit), t))
+            logged += len(hit)
+        goal = order[np.concatenate(hits)] if hits else np.zeros(0, np.int64)
+        step = np.concatenate(steps) if steps else np.zeros(0, np.int64)
+
+        # Calendar of the check-ins
+        within = rng.integers(0, period[goal])
+        day = np.minimum(start_day[goal] + step * period[goal] + within, last_day[goal] - 1)
+        day = np.maximum(day, start_day[goal])
+        hour = np.clip(rng.normal(*CHECKIN_HOUR, len(goal)), 6, 23.99)
+        log_created = np.maximum(day * DAY + (hour * 3600).astype(np.int64), created[goal] + 60)
+        log_created = np.minimum(log_created, self.end - 1)
+
+        goal_count = np.zeros(n, np.int64)
+        goal_count[order] = count
+        ended = ends & (end_day <= horizon)
+        completed = ended & (lifetime >= cap) & (goal_count >= COMPLETE_ADHERENCE * np.maximum(periods, 1))
+        paused = (lifetime < cap) & (rng.random(n) < PAUSE_SHARE)
+        status = np.where(completed, 1, np.where(paused, 2, 0))
+        updated = created.copy()
+        np.maximum.at(updated, goal, log_created)
+
+        goals = {'user': user, 'created': created, 'frequency': frequency, 'start_day': start_day,
+                 'end_day': end_day, 'public': (rng.random(n) < 0.3).astype(np.int64), 'status': status,
+                 'updated': updated, 'title': rng.integers(0, len(GOAL_TITLES), n),
+                 'description': rng.integers(0, len(GOAL_DESCRIPTIONS), n)}
+        logs = {'goal': goal, 'user': user[goal], 'goal_created': created[goal], 'day': day,
+                'value': rng.integers(0, len(VALUES), len(goal)), 'note': rng.integers(0, len(NOTES), len(goal)),
+                'created': log_created}
+
+        # Each achievement at the earliest check-in of the user that satisfies it on its goal
+        earned = {'user': [], 'achievement': [], 'goal': [], 'earned': []}
+        for a, (_, _, rule, value) in enumerate(self.rules):
+            position = reached[rule, value] if rule != 'GOAL_COMPLETED' else reached['TOTAL_CHECKINS', 1]
+            candidates = order[position >= 0]
+            position = position[position >= 0]
+            times = log_created[position]
+            first = np.lexsort((times, user[candidates]))
+            _, unique = np.unique(user[candidates][first], return_index=True)
+            chosen = first[unique]
+            earned['user'].append(user[candidates][chosen])
+            earned['achievement'].append(np.full(len(chosen), a))
+            earned['goal'].append(candidates[chosen])
+            earned['earned'].append(times[chosen])
+        earned = {key: np.concatenate(parts) for key, parts in earned.items()}
+        order = np.argsort(earned['earned'], kind='stable')
+        earned = {key: column[order] for key, column in earned.items()}
+        earned['goal_created'] = created[earned['goal']]
+        return goals, logs, earned
+
+
+class JsonlWriter:
+    """Lines of every collection in files of at most file_docs documents, with a manifest"""
+
+    def __init__(self, directory, file_docs=FILE_DOCS):
+        self.directory = directory
+        self.file_docs = file_docs
+        self.collections = {}
+        self._open = {}
+
+    def write(self, collection, dataset, raw, offset=0):
+        """Render raw columns of a collection with sequence numbers from offset; returns the row count"""
+        n = len(next(iter(raw.values())))
+        entry = self.collections.get(collection)
+        for start in range(0, n, RENDER_ROWS):
+            rows = {key: column[start:start + RENDER_ROWS] for key, column in raw.items()}
+            rows['seq'] = offset + start + np.arange(len(next(iter(rows.values()))))
+            values = dataset.columns(collection, rows)
+            if entry is None:
+                layout = Layout(values)
+                entry = self.collections[collection] = {
+                    'documents': 0, 'line': layout.width, 'fields': layout.fields,
+                    'references': {value.field: value.reference for value in values if value.reference},
+                    'files': [], 'layout': layout}
+            self._lines(collection, entry, entry['layout'].render(values))
+        return n
+
+    def _lines(self, collection, entry, data):
+        while len(data):
+            f = self._open.get(collection)
+            if f is None or entry['documents'] % self.file_docs == 0:
+                if f is not None:
+                    f.close()
+                folder = os.path.join(self.directory, collection)
+                os.makedirs(folder, exist_ok=True)
+                name = f'{collection}-{len(entry["files"]):05d}.jsonl'
+                entry['files'].append(f'{collection}/{name}')
+                f = self._open[collection] = open(os.path.join(folder, name), 'wb')
+            room = self.file_docs - entry['documents'] % self.file_docs
+            f.write(data[:room])
+            entry['documents'] += len(data[:room])
+            data = data[room:]
+
+    def close(self, **info):
+        for f in self._open.values():
+            f.close()
+        manifest = dict(info, collections={
+            name: {key: value for key, value in entry.items() if key != 'layout'}
+            for name, entry in self.collections.items()})
+        tmp = os.path.join(self.directory, MANIFEST + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp, os.path.join(self.directory, MANIFEST))
+        return manifest
+
+
+def generate(directory, users=USERS, seed=0, end=END, days=DAYS, file_docs=FILE_DOCS, root=SOURCE_ROOT,
+             report=None):
+    """Write the dataset under directory and return its manifest
+
+    report(documents, seconds) is called after every chunk.
+    """
+    dataset = Dataset(users, seed, end, days, root)
+    dataset.check(schemas(scan(root, CACHE_DIR)))
+    writer = JsonlWriter(directory, file_docs)
+    started = time.perf_counter()
+    written = writer.write('achievements', dataset, dataset.achievement_rows())
+    groups, owners = dataset.group_rows()
+    written += writer.write('groups', dataset, groups)
+    memberships = writer.write('group_memberships', dataset, owners)
+    goals = logs = earned = 0
+    for chunk, first in enumerate(range(0, users, CHUNK_USERS)):
+        rng = np.random.default_rng([seed, 1, chunk])
+        ids = np.arange(first, min(first + CHUNK_USERS, users))
+        written += writer.write('users', dataset, dataset.user_rows(rng, ids), first)
+        added = writer.write('group_memberships', dataset, dataset.membership_rows(rng, ids), memberships)
+        memberships += added
+        goal_rows, log_rows, earned_rows = dataset.goal_rows(rng, ids)
+        # Goal indexes are local to the chunk until they get their sequence numbers
+        log_rows['goal'] = log_rows['goal'] + goals
+        earned_rows['goal'] = earned_rows['goal'] + goals
+        added_goals = writer.write('goals', dataset, goal_rows, goals)
+        added_logs = writer.write('progress_logs', dataset, log_rows, logs)
+        added_earned = writer.write('user_achievements', dataset, earned_rows, earned)
+        goals, logs, earned = goals + added_goals, logs + added_logs, earned + added_earned
+        written += added + added_goals + added_logs + added_earned
+        if report:
+            report(written, time.perf_counter() - started)
+    return writer.close(users=users, seed=seed, end=end, days=days, tags=TAGS,
+                        seconds=round(time.perf_counter() - started, 3))
+
+
+def _decode_ids(data):
+    """Timestamps, tags and sequence numbers of (n, 24) hex id matrices"""
+    nibbles = _UNHEX[data]
+    raw = (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+    ts = raw[:, :4].copy().view('>u4').ravel().astype(np.int64)
+    seq = np.zeros((len(raw), 8), np.uint8)
+    seq[:, 1:] = raw[:, 5:]
+    return ts, raw[:, 4].astype(np.int64), seq.view('>u8').ravel().astype(np.int64)
+
+
+def _lines(directory, entry):
+    for name in entry['files']:
+        path = os.path.join(directory, name)
+        if os.path.getsize(path):
+            yield name, np.memmap(path, np.uint8, 'r').reshape(-1, entry['line'])
+
+
+def verify(directory, report=None):
+    """Check the written ids and every reference through the manifest's offsets; returns documents checked"""
+    with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    collections, tags = manifest['collections'], manifest['tags']
+    referenced = {target for entry in collections.values() for target in entry['references'].values()}
+    stamps = {}
+    for name, entry in collections.items():
+        seen = np.zeros(entry['documents'], bool)
+        ts_by_seq = np.zeros(entry['documents'], np.int64) if name in referenced else None
+        start, width = entry['fields']['_id']
+        for file, lines in _lines(directory, entry):
+            for row in (lines[0], lines[-1]):
+                document = json.loads(row.tobytes())
+                if document['_id']['$oid'] != row[start + 9:start + 33].tobytes().decode():
+                    raise DatasetError(f'{file}: _id is not at the manifest offset')
+            ts, tag, seq = _decode_ids(np.asarray(lines[:, start + 9:start + 33]))
+            if (tag != tags[name]).any() or (seq >= len(seen)).any() or seen[seq].any():
+                raise DatasetError(f'{file}: ids outside the collection or repeated')
+            seen[seq] = True
+            if ts_by_seq is not None:
+                ts_by_seq[seq] = ts
+        if not seen.all():
+            raise DatasetError(f'{name}: {np.count_nonzero(~seen)} documents missing')
+        stamps[name] = ts_by_seq
+    checked = 0
+    for name, entry in collections.items():
+        for file, lines in _lines(directory, entry):
+            for field, target in entry['references'].items():
+                start, width = entry['fields'][field]
+                column = np.asarray(lines[:, start:start + width])
+                present = column[:, 0] == ord('"')
+                ts, tag, seq = _decode_ids(column[present, 1:25])
+                bad = (tag != tags[target]) | (seq >= len(stamps[target]))
+                bad[~bad] = stamps[target][seq[~bad]] != ts[~bad]
+                if bad.any():
+                    raise DatasetError(f'{file}: {np.count_nonzero(bad)} {field} values do not point into {target}')
+            checked += len(lines)
+        if report:
+            report(name, entry['documents'])
+    return checked
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate synthetic MongoDB collections for the backend')
+    parser.add_argument('-o', '--output', default='dataset', help='directory to write (default: %(default)s)')
+    parser.add_argument('-u', '--users', type=int, default=USERS, help='number of users (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default: %(default)s)')
+    parser.add_argument('--end', default=END, help='date the data ends at (default: %(default)s)')
+    parser.add_argument('--days', type=int, default=DAYS, help='days of sign-ups before --end (default: %(default)s)')
+    parser.add_argument('--file-docs', type=int, default=FILE_DOCS,
+                        help='documents per .jsonl file (default: %(default)s)')
+    parser.add_argument('--verify', metavar='DIR', help='only check the ids and references of a written dataset')
+    args = parser.parse_args()
+
+    if args.verify:
+        start = time.perf_counter()
+        total = verify(args.verify, report=lambda name, n: print(f'{name}: {n} documents, references ok'))
+        print(f'Checked {total} documents in {time.perf_counter() - start:.1f} s')
+        raise SystemExit
+
+    def progress(documents, seconds):
+        print(f'\r{documents} documents, {documents / max(seconds, 1e-9):,.0f}/s', end='', flush=True)
+
+    manifest = generate(args.output, args.users, args.seed, args.end, args.days, args.file_docs, report=progress)
+    print()
+    for name, entry in manifest['collections'].items():
+        print(f'{name}: {entry["documents"]} documents in {len(entry["files"])} files')
+    total = sum(entry['documents'] for entry in manifest['collections'].values())
+    print(f'{total} documents in {manifest["seconds"]:.1f} s ({total / manifest["seconds"]:,.0f}/s): {args.output}')
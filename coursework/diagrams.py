@@ -0,0 +1,563 @@
+"""Use-case, ER and package diagrams drawn from the report's own data.
+
+A diagram operation is ('diagram', kind, caption, definition), the
+definition being plain tuples:
+
+    usecase    (system, ((actor, (use case, ...)), ...))    ::: diagram usecase
+    er         ((collection, ((field, type, referenced collection or ''), ...)), ...)
+    packages   ((package, (type, ...), (package it depends on, ...)), ...)
+
+er and packages come from the scanned backend (::: java er, ::: java
+packages in coursework.javascan). A layout turns the definition into a list
+of shapes in points, measured with the Times New Roman widths of
+coursework.layout; the shapes are written out as SVG and rasterized to PNG
+by coursework.raster.
+
+resolve_diagrams() replaces every diagram operation by ('figure', key,
+width, height, caption). The key hashes the kind and the definition, so the
+drawn pair is cached in .cache/diagrams/ and a figure is only drawn again
+when what it shows changes; figures that are missing are drawn on a process
+pool. In the package the SVG is the picture (Word 2016 and later) and the
+PNG the fallback every .docx image carries. Both are stored once per key
+under word/media/ with relationship ids derived from the key, so cached
+section fragments stay valid in any document and a figure used twice
+shares its parts.
+"""
+
+import hashlib
+import math
+import os
+import pickle
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+from lxml import etree
+
+from coursework.layout import page_geometry, word_width
+from coursework.package import CONTENT_TYPES
+from coursework.raster import Canvas
+from coursework.spec import CACHE_DIR
+
+# Bump whenever layouts or drawing change to invalidate cached figures
+DIAGRAM_VERSION = 1
+
+# PNG resolution, pixels per point (150 dpi)
+PNG_SCALE = 150 / 72
+PEN = 0.75
+FONT_SIZE = 9
+SMALL_SIZE = 7.5
+LINE_GAP = 1.25
+GRAY = 238
+# Page height kept free below a figure for its caption, in points
+CAPTION_ROOM = 60
+
+Figure = namedtuple('Figure', 'svg png width height')
+MediaPart = namedtuple('MediaPart', 'name content_type rel_id data')
+
+EMU_PER_POINT = 12700
+
+
+def _wrap(text, width, size, bold=False):
+    """Lines of text no wider than width points where the words allow"""
+    lines, current = [], ''
+    for word in text.split():
+        candidate = f'{current} {word}' if current else word
+        if current and word_width(candidate, size=size, bold=bold) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    return lines + [current] if current else lines
+
+
+def _text_block(shapes, x, y, lines, size, anchor='middle', bold=False):
+    """Centred lines starting at baseline y; returns the baseline after the last one"""
+    for line in lines:
+        shapes.append(('text', x, y, line, size, anchor, bold))
+        y += size * LINE_GAP
+    return y
+
+
+def _boundary(cx, cy, rx, ry, px, py):
+    """Point where the segment from (px, py) to an ellipse's centre crosses the ellipse"""
+    dx, dy = px - cx, py - cy
+    t = 1 / math.hypot(dx / rx, dy / ry)
+    return cx + dx * t, cy + dy * t
+
+
+def _arrow(shapes, x0, y0, x1, y1, size=5, filled=True):
+    """Arrowhead at (x1, y1) for a line arriving from (x0, y0)"""
+    angle = math.atan2(y1 - y0, x1 - x0)
+    left = (x1 - size * math.cos(angle - 0.4), y1 - size * math.sin(angle - 0.4))
+    right = (x1 - size * math.cos(angle + 0.4), y1 - size * math.sin(angle + 0.4))
+    if filled:
+        shapes.append(('arrow', ((x1, y1), left, right)))
+    else:
+        shapes.append(('line', (left, (x1, y1), right), False))
+
+
+def _actor(shapes, x, y, name, width):
+    """Stick figure standing at (x, y) with its name below; returns the label's bottom"""
+    shapes.append(('ellipse', x, y - 20, 5, 5))
+    shapes.append(('line', ((x, y - 15), (x, y + 2)), False))
+    shapes.append(('line', ((x - 10, y - 9), (x + 10, y - 9)), False))
+    shapes.append(('line', ((x - 8, y + 14), (x, y + 2), (x + 8, y + 14)), False))
+    return _text_block(shapes, x, y + 26, _wrap(name, width, FONT_SIZE), FONT_SIZE)
+
+
+def _usecase(definition, width):
+    """Actors split between both sides of the system boundary, use cases in one or two columns"""
+    system, actors = definition
+    cases = list(dict.fromkeys(case for _, linked in actors for case in linked))
+    half = math.ceil(len(actors) / 2)
+    left, right = actors[:half], actors[half:]
+    actor_width = 84
+    x0 = actor_width if left else 4
+    x1 = width - (actor_width if right else 4)
+    columns = 2 if len(cases) > 6 else 1
+    gap = 14
+    column_width = (x1 - x0 - 20 - gap * (columns - 1)) / columns
+    rx = column_width / 2
+    wrapped = [_wrap(case, column_width * 0.74, FONT_SIZE) for case in cases]
+    ry = max(14, max((len(lines) for lines in wrapped), default=1) * FONT_SIZE * LINE_GAP / 2 + 7)
+
+    # Use cases linked to an actor on the right go to the right column, the
+    # rest fill the columns in order so that both stay about equally long
+    if columns == 2:
+        right_names = {name for name, _ in right}
+        on_right = [i for i, case in enumerate(cases)
+                    if any(case in linked for name, linked in actors if name in right_names)]
+        on_left = [i for i in range(len(cases)) if i not in on_right]
+        while len(on_left) - len(on_right) > 1:
+            on_right.append(on_left.pop())
+        while len(on_right) - len(on_left) > 1:
+            on_left.append(on_right.pop(0))
+        placed = [sorted(on_left), sorted(on_right)]
+    else:
+        placed = [list(range(len(cases)))]
+    pitch = 2 * ry + 10
+    top = 4
+    first = top + 30
+    rows = max(len(column) for column in placed)
+    stagger = pitch / 2 if columns == 2 else 0
+    height = 30 + rows * pitch + stagger + 4
+    shapes = [('rect', x0, top, x1 - x0, height, None)]
+    shapes.append(('text', (x0 + x1) / 2, top + 18, system, FONT_SIZE + 1, 'middle', True))
+    centres = {}
+    for column, indices in enumerate(placed):
+        cx = x0 + 10 + rx + column * (column_width + gap)
+        for row, i in enumerate(indices):
+            cy = first + ry + row * pitch + (stagger if column else 0)
+            centres[cases[i]] = (cx, cy)
+            shapes.append(('ellipse', cx, cy, rx, ry))
+            lines = wrapped[i]
+            baseline = cy - (len(lines) - 1) * FONT_SIZE * LINE_GAP / 2 + FONT_SIZE * 0.35
+            _text_block(shapes, cx, baseline, lines, FONT_SIZE)
+    bottom = top + height
+    # Links go under the use cases, which are filled, so they end at the outlines
+    links = []
+    for side, group in ((-1, left), (1, right)):
+        x = x0 - actor_width / 2 if side < 0 else x1 + actor_width / 2
+        for n, (name, linked) in enumerate(group):
+            y = top + height * (n + 0.5) / len(group)
+            bottom = max(bottom, _actor(shapes, x, y, name, actor_width - 6))
+            ax, ay = x - side * 12, y - 6
+            for case in linked:
+                cx, cy = centres[case]
+                links.append(('line', ((ax, ay), _boundary(cx, cy, rx, ry, ax, ay)), False))
+    return shapes[:1] + links + shapes[1:], width, bottom + 2
+
+
+def _depths(names, edges):
+    """Longest path from every node to a node without outgoing edges (cycles cut)"""
+    targets = {name: [b for a, b in edges if a == name and b != name] for name in names}
+    depth = {}
+
+    def visit(name):
+        if name not in depth:
+            # Provisional depth, so a cycle ends here
+            depth[name] = 0
+            depth[name] = 1 + max((visit(t) for t in targets[name]), default=-1)
+        return depth[name]
+
+    for name in names:
+        visit(name)
+    return depth
+
+
+def _layered(sizes, edges, width, targets_first=True, gap_x=12, gap_y=30):
+    """Boxes in layers along the edges, wrapping wide layers
+
+    Returns name -> (x, y, w, h), the height, and for every edge the slots
+    it passes through in the layers between its ends. With targets_first the
+    nodes edges point to come first (at the top), otherwise last. Within a
+    layer nodes follow the mean position of the nodes they are connected to
+    in the layers already placed; an edge spanning several layers reserves a
+    narrow slot in each layer it crosses, so it runs between the boxes there
+    rather than through them.
+    """
+    names = list(sizes)
+    depth = _depths(names, edges)
+    deepest = max(depth.values(), default=0)
+    level = {name: depth[name] if targets_first else deepest - depth[name] for name in names}
+    layers = [[] for _ in range(deepest + 1)]
+    for name in names:
+        layers[level[name]].append(name)
+    sizes = dict(sizes)
+    neighbours = {name: [] for name in names}
+    slots = []
+    for i, (a, b) in enumerate(edges):
+        if a == b:
+            slots.append([])
+            continue
+        step = 1 if level[b] > level[a] else -1
+        chain = [(i, layer) for layer in range(level[a] + step, level[b], step)]
+        for slot in chain:
+            sizes[slot] = (2, 0)
+            neighbours[slot] = []
+            layers[slot[1]].append(slot)
+        slots.append(chain)
+        path = [a] + chain + [b]
+        for u, v in zip(path, path[1:]):
+            neighbours[u].append(v)
+            neighbours[v].append(u)
+    boxes = {}
+    y = 4
+    for layer in layers:
+        if boxes:
+            index = {name: i for i, name in enumerate(layer)}
+
+            def position(name):
+                placed = [boxes[n][0] + boxes[n][2] / 2 for n in neighbours[name] if n in boxes]
+                return (sum(placed) / len(placed), index[name]) if placed else (width / 2, index[name])
+
+            layer = sorted(layer, key=position)
+        rows, row, used = [], [], 0
+        for name in layer:
+            w = sizes[name][0]
+            if row and used + gap_x + w > width:
+                rows.append(row)
+                row, used = [], 0
+            used += (gap_x if row else 0) + w
+            row.append(name)
+        if row:
+            rows.append(row)
+        for row in rows:
+            total = sum(sizes[name][0] for name in row) + gap_x * (len(row) - 1)
+            x = (width - total) / 2
+            tallest = max(sizes[name][1] for name in row)
+            for name in row:
+                w, h = sizes[name]
+                # A slot spans the whole row, the edge passes it vertically
+                boxes[name] = (x, y, w, h if name in names else tallest)
+                x += w + gap_x
+            y += tallest + gap_y
+    return {name: boxes[name] for name in names}, y - gap_y + 4, [
+        [boxes[slot] for slot in chain] for chain in slots]
+
+
+def _ends(boxes, edges, slots):
+    """Route of every edge as a polyline, its ends spread along the sides it leaves and arrives at"""
+    routes = []
+    for i, ((a, b), chain) in enumerate(zip(edges, slots)):
+        ay, ah = boxes[a][1], boxes[a][3]
+        by, bh = boxes[b][1], boxes[b][3]
+        if by + bh <= ay:
+            sides = 'top', 'bottom'
+        elif by >= ay + ah:
+            sides = 'bottom', 'top'
+        else:
+            sides = ('right', 'left') if boxes[b][0] > boxes[a][0] else ('left', 'right')
+        routes.append((i, a, b, sides, chain))
+
+    def centre(box):
+        return box[0] + box[2] / 2, box[1] + box[3] / 2
+
+    def spread(groups, toward):
+        # Ends sharing a side of a box are spaced evenly along it, in the
+        # order of where they come from, so they do not cross at the box
+        points = {}
+        for (name, side), group in groups.items():
+            x, y, w, h = boxes[name]
+            group.sort(key=lambda route: centre(toward(route))[side in ('left', 'right')])
+            for k, route in enumerate(group):
+                t = (k + 1) / (len(group) + 1)
+                points[route[0]] = {'top': (x + w * t, y), 'bottom': (x + w * t, y + h),
+                                    'left': (x, y + h * t), 'right': (x + w, y + h * t)}[side]
+        return points
+
+    leaving, arriving = {}, {}
+    for route in routes:
+        leaving.setdefault((route[1], route[3][0]), []).append(route)
+        arriving.setdefault((route[2], route[3][1]), []).append(route)
+    starts = spread(leaving, lambda route: route[4][0] if route[4] else boxes[route[2]])
+    ends = spread(arriving, lambda route: route[4][-1] if route[4] else boxes[route[1]])
+    lines = []
+    for i, _, _, _, chain in routes:
+        points = [starts[i]]
+        for x, y, w, h in chain:
+            top, bottom = (x + w / 2, y), (x + w / 2, y + h)
+            points.extend((top, bottom) if abs(points[-1][1] - y) < abs(points[-1][1] - y - h) else (bottom, top))
+        lines.append(points + [ends[i]])
+    return lines
+
+
+def _er(definition, width):
+    """One box per collection, referenced collections above the ones referring to them"""
+    row_height = SMALL_SIZE * 1.5
+    header = FONT_SIZE * 1.9
+    key_column = 16
+    sizes, rows = {}, {}
+    for collection, fields in definition:
+        texts = [f'{name}: {kind}' for name, kind, _ in fields]
+        w = max([word_width(collection, size=FONT_SIZE, bold=True) + 12]
+                + [word_width(text, size=SMALL_SIZE) + key_column + 10 for text in texts])
+        sizes[collection] = (math.ceil(w), header + row_height * len(fields) + 3)
+        rows[collection] = texts
+    edges = [(collection, target) for collection, fields in definition
+             for _, _, target in fields if target and target in sizes]
+    boxes, height, slots = _layered(sizes, edges, width, targets_first=True)
+    shapes = []
+    for collection, fields in definition:
+        x, y, w, h = boxes[collection]
+        shapes.append(('rect', x, y, w, h, 255))
+        shapes.append(('rect', x, y, w, header, GRAY))
+        shapes.append(('text', x + w / 2, y + header * 0.68, collection, FONT_SIZE, 'middle', True))
+        for i, ((name, _, target), text) in enumerate(zip(fields, rows[collection])):
+            baseline = y + header + row_height * (i + 0.72)
+            mark = 'PK' if name == 'id' else 'FK' if target else ''
+            if mark:
+                shapes.append(('text', x + 4, baseline, mark, SMALL_SIZE - 1, 'start', True))
+            shapes.append(('text', x + key_column + 4, baseline, text, SMALL_SIZE, 'start', False))
+    # Links go under the boxes, which are filled, so crossings hide behind them
+    links = []
+    for points in _ends(boxes, edges, slots):
+        links.append(('line', tuple(points), False))
+        _arrow(links, *points[-2], *points[-1])
+    return links + shapes, width, height
+
+
+def _packages(definition, width):
+    """Packages as folders listing their types, dependencies as dashed arrows pointing down"""
+    line = SMALL_SIZE * 1.3
+    header = FONT_SIZE * 1.8
+    tab = 6
+    sizes = {}
+    for name, types, _ in definition:
+        w = max([word_width(name, size=FONT_SIZE, bold=True) + 16]
+                + [word_width(t, size=SMALL_SIZE) + 12 for t in types] + [60])
+        sizes[name] = (math.ceil(w), tab + header + line * len(types) + 4)
+    edges = [(name, dep) for name, _, deps in definition for dep in deps if dep in sizes]
+    boxes, height, slots = _layered(sizes, edges, width, targets_first=False, gap_y=34)
+    shapes = []
+    for name, types, _ in definition:
+        x, y, w, h = boxes[name]
+        shapes.append(('rect', x, y, min(40, w / 2), tab, GRAY))
+        shapes.append(('rect', x, y + tab, w, h - tab, 255))
+        shapes.append(('rect', x, y + tab, w, header, GRAY))
+        shapes.append(('text', x + w / 2, y + tab + header * 0.68, name, FONT_SIZE, 'middle', True))
+        _text_block(shapes, x + 6, y + tab + header + line * 0.8, types, SMALL_SIZE, 'start')
+    links = []
+    for points in _ends(boxes, edges, slots):
+        links.append(('line', tuple(points), True))
+        _arrow(links, *points[-2], *points[-1], filled=False)
+    return links + shapes, width, height
+
+
+LAYOUTS = {'usecase': _usecase, 'er': _er, 'packages': _packages}
+
+
+def _n(value):
+    return f'{value:.2f}'.rstrip('0').rstrip('.')
+
+
+def _points(points):
+    return ' '.join(f'{_n(x)},{_n(y)}' for x, y in points)
+
+
+def to_svg(shapes, width, height):
+    """SVG document for a shape list"""
+    stroke = f'stroke="#000" stroke-width="{_n(PEN)}"'
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{_n(width)}pt" height="{_n(height)}pt" '
+           f'viewBox="0 0 {_n(width)} {_n(height)}" font-family="Times New Roman, serif">',
+           '<rect width="100%" height="100%" fill="#fff"/>']
+    for shape in shapes:
+        kind = shape[0]
+        if kind == 'line':
+            dash = ' stroke-dasharray="4 3"' if shape[2] else ''
+            out.append(f'<polyline points="{_points(shape[1])}" fill="none" {stroke}{dash}/>')
+        elif kind == 'rect':
+            _, x, y, w, h, fill = shape
+            colour = f'#{fill:02x}{fill:02x}{fill:02x}' if fill is not None else 'none'
+            out.append(f'<rect x="{_n(x)}" y="{_n(y)}" width="{_n(w)}" height="{_n(h)}" fill="{colour}" {stroke}/>')
+        elif kind == 'ellipse':
+            _, cx, cy, rx, ry = shape
+            out.append(f'<ellipse cx="{_n(cx)}" cy="{_n(cy)}" rx="{_n(rx)}" ry="{_n(ry)}" fill="#fff" {stroke}/>')
+        elif kind == 'arrow':
+            out.append(f'<polygon points="{_points(shape[1])}" fill="#000"/>')
+        elif kind == 'text':
+            _, x, y, text, size, anchor, bold = shape
+            weight = ' font-weight="bold"' if bold else ''
+            out.append(f'<text x="{_n(x)}" y="{_n(y)}" font-size="{_n(size)}" '
+                       f'text-anchor="{anchor}"{weight}>{escape(text)}</text>')
+    out.append('</svg>')
+    return '\n'.join(out).encode('utf-8')
+
+
+def to_png(shapes, width, height, scale=PNG_SCALE):
+    """PNG rendering of a shape list"""
+    canvas = Canvas(width, height, scale)
+    for shape in shapes:
+        kind = shape[0]
+        if kind == 'line':
+            canvas.polyline(shape[1], PEN, (4, 3) if shape[2] else None)
+        elif kind == 'rect':
+            _, x, y, w, h, fill = shape
+            if fill is not None:
+                canvas.fill_rect(x, y, w, h, fill)
+            canvas.polyline(((x, y), (x + w, y), (x + w, y + h), (x, y + h), (x, y)), PEN)
+        elif kind == 'ellipse':
+            canvas.ellipse(*shape[1:], PEN, fill=255)
+        elif kind == 'arrow':
+            canvas.polygon(shape[1])
+        elif kind == 'text':
+            _, x, y, text, size, anchor, bold = shape
+            canvas.text(x, y, text, size, word_width(text, size=size, bold=bold), anchor, bold)
+    return canvas.png()
+
+
+def draw(kind, definition, width=None):
+    """Figure for a diagram definition, at most width points wide (the text column by default)"""
+    shapes, w, h = LAYOUTS[kind](definition, width or page_geometry()[0])
+    return Figure(to_svg(shapes, w, h), to_png(shapes, w, h), w, h)
+
+
+def diagram_key(kind, definition):
+    """Hash of everything a figure depends on"""
+    return hashlib.sha256(repr((DIAGRAM_VERSION, kind, definition, page_geometry())).encode('utf-8')).hexdigest()
+
+
+# Figures drawn or loaded by this process, by key
+_figures = {}
+
+
+def _cached(cache_dir, key):
+    return os.path.join(cache_dir, 'diagrams', key + '.pickle') if cache_dir else None
+
+
+def _load(cache_dir, key):
+    figure = _figures.get(key)
+    path = _cached(cache_dir, key)
+    if figure is None and path and os.path.exists(path):
+        with open(path, 'rb') as f:
+            figure = _figures[key] = pickle.load(f)
+    return figure
+
+
+def _store(cache_dir, key, figure):
+    _figures[key] = figure
+    path = _cached(cache_dir, key)
+    if path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(figure, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+
+def _draw(args):
+    return draw(*args)
+
+
+def resolve_diagrams(ops, cache_dir=CACHE_DIR, jobs=None):
+    """Replace ('diagram', kind, caption, definition) operations by drawn ('figure', ...) ones"""
+    if not any(op[0] == 'diagram' for op in ops):
+        return ops
+    keys = {}
+    missing = {}
+    for op in ops:
+        if op[0] == 'diagram':
+            key = keys[op[1:]] = diagram_key(op[1], op[3])
+            if _load(cache_dir, key) is None:
+                missing[key] = (op[1], op[3])
+    jobs = jobs or os.cpu_count() or 1
+    if jobs > 1 and len(missing) > 1:
+        with ProcessPoolExecutor(min(jobs, len(missing))) as pool:
+            drawn = list(pool.map(_draw, missing.values()))
+    else:
+        drawn = [_draw(args) for args in missing.values()]
+    for key, figure in zip(missing, drawn):
+        _store(cache_dir, key, figure)
+    # A figure taller than the page shrinks until it fits there with its caption
+    limit = page_geometry()[1] - CAPTION_ROOM
+    resolved = []
+    for op in ops:
+        if op[0] == 'diagram':
+            key = keys[op[1:]]
+            figure = _figures[key]
+            scale = min(1.0, limit / figure.height)
+            op = ('figure', key, round(figure.width * scale, 2), round(figure.height * scale, 2), op[2])
+        resolved.append(op)
+    return resolved
+
+
+def figure(key, cache_dir=CACHE_DIR):
+    """The drawn Figure of a key resolve_diagrams() has seen"""
+    found = _load(cache_dir, key)
+    if found is None:
+        raise KeyError(f'figure {key[:12]} has not been drawn, run resolve_diagrams() first')
+    return found
+
+
+def rel_ids(key):
+    """Relationship ids of a figure's PNG and SVG parts"""
+    return f'rIdFig{key[:16]}', f'rIdFig{key[:16]}s'
+
+
+def media(ops, cache_dir=CACHE_DIR):
+    """Package parts (PNG and SVG, once per figure) for the figure operations"""
+    parts = []
+    seen = set()
+    for op in ops:
+        if op[0] != 'figure' or op[1] in seen:
+            continue
+        key = op[1]
+        seen.add(key)
+        drawn = figure(key, cache_dir)
+        png_id, svg_id = rel_ids(key)
+        parts.append(MediaPart(f'word/media/diagram-{key[:16]}.png', CONTENT_TYPES['png'], png_id, drawn.png))
+        parts.append(MediaPart(f'word/media/diagram-{key[:16]}.svg', CONTENT_TYPES['svg'], svg_id, drawn.svg))
+    return parts
+
+
+_DRAWING = (
+    '<w:drawing xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:wp="http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing" '
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<wp:inline distT="0" distB="0" distL="0" distR="0"><wp:extent cx="{cx}" cy="{cy}"/>'
+    '<wp:docPr id="{id}" name="{name}" descr="{descr}"/>'
+    '<wp:cNvGraphicFramePr><a:graphicFrameLocks noChangeAspect="1"/></wp:cNvGraphicFramePr>'
+    '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+    '<pic:pic><pic:nvPicPr><pic:cNvPr id="0" name="{name}"/><pic:cNvPicPr/></pic:nvPicPr>'
+    '<pic:blipFill><a:blip r:embed="{png}"><a:extLst>'
+    '<a:ext uri="{{96DAC541-7B7A-43D3-8B79-37D633B846F1}}">'
+    '<asvg:svgBlip xmlns:asvg="http://schemas.microsoft.com/office/drawing/2016/SVG/main" r:embed="{svg}"/>'
+    '</a:ext></a:extLst></a:blip><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+    '<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+    '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></pic:spPr></pic:pic>'
+    '</a:graphicData></a:graphic></wp:inline></w:drawing>'
+)
+
+
+def drawing(key, width, height, caption=None):
+    """w:drawing element showing a figure inline at width x height points"""
+    png_id, svg_id = rel_ids(key)
+    # docPr ids must differ between pictures; derive one from what is shown
+    shape_id = int(hashlib.sha256(f'{key}:{caption}'.encode('utf-8')).hexdigest()[:7], 16) + 1
+    name = f'diagram-{key[:16]}'
+    return etree.fromstring(_DRAWING.format(
+        cx=round(width * EMU_PER_POINT), cy=round(height * EMU_PER_POINT), id=shape_id, name=name,
+        descr=escape(caption or '', {'"': '&quot;'}), png=png_id, svg=svg_id))
@@ -0,0 +1,310 @@
+"""Structural diff of two versions of a generated report.
+
+Both packages are streamed: word/document.xml goes through lxml's
+iterparse and every paragraph is reduced to a fingerprint as soon as it
+ends, then discarded. A fingerprint is a 64-bit BLAKE2 digest of the
+paragraph's text together with its effective formatting, resolved with
+coursework.optimize's StyleModel (defaults, style chains, toggles and
+direct properties, the same model optimize() verifies against), so
+formatting that only moved between direct properties and styles, or runs
+that were merged, does not count as a change. The text alone is kept to
+recognise reformatted paragraphs.
+
+The two fingerprint sequences are aligned with Myers' O(ND) diff in its
+linear-space form (middle snakes, recursively). Paragraphs that occur on
+one side only are set aside first, as GNU diff does, so two reports that
+have little in common still align quickly. What remains unmatched is
+paired up afterwards:
+
+- removed and added with the same fingerprint     -> moved
+- removed and added with the same text            -> reformatted
+- everything else                                 -> removed / added
+
+Changes are reported in document order under the heading of the section
+they are in (the old report's section for removed paragraphs).
+"""
+
+import hashlib
+import zipfile
+from collections import defaultdict, deque, namedtuple
+
+from lxml import etree
+
+from coursework.optimize import DOCUMENT_PART, STYLES_PART, StyleModel, _freeze, _run_text
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_P, _R, _T, _PPR, _RPR = W + 'p', W + 'r', W + 't', W + 'pPr', W + 'rPr'
+
+Paragraph = namedtuple('Paragraph', 'number section text digest content format')
+Change = namedtuple('Change', 'kind section old new text detail')
+
+# Properties listed for a reformatted paragraph before the rest are summarised
+DETAIL_LIMIT = 3
+
+
+class _Formats:
+    """Effective formatting of paragraphs and runs, memoised by their markup
+
+    Reports repeat a handful of w:pPr and w:rPr over and over, so each
+    distinct one is resolved, frozen and hashed once."""
+
+    def __init__(self, styles):
+        self.styles = styles
+        self._paragraphs, self._runs = {}, {}
+
+    def paragraph(self, pPr):
+        """(frozen properties, digest) of a paragraph's own properties"""
+        key = _markup(pPr)
+        if key not in self._paragraphs:
+            props = _freeze(self.styles.paragraph(pPr))
+            self._paragraphs[key] = props, _digest(props)
+        return self._paragraphs[key]
+
+    def run(self, style, pPr, rPr):
+        """(frozen properties, digest) of a run inside a paragraph of the given style"""
+        key = style, _markup(rPr)
+        if key not in self._runs:
+            props = _freeze(self.styles.run(pPr, rPr))
+            self._runs[key] = props, _digest(props)
+        return self._runs[key]
+
+
+def _markup(el):
+    """Hashable form of an element, cheaper than serialising it"""
+    return None if el is None else (el.tag, tuple(el.items()), tuple(map(_markup, el)))
+
+
+def _digest(value):
+    return hashlib.blake2b(repr(value).encode('utf-8'), digest_size=8).digest()
+
+
+def fingerprints(path):
+    """Paragraphs of a .docx file in document order, table cells included"""
+    with zipfile.ZipFile(path) as package:
+        with package.open(STYLES_PART) as f:
+            styles = StyleModel(etree.parse(f).getroot())
+        with package.open(DOCUMENT_PART) as f:
+            return list(_paragraphs(f, _Formats(styles)))
+
+
+def _paragraphs(source, formats):
+    section = ''
+    for number, (_, p) in enumerate(etree.iterparse(source, events=('end',), tag=_P), 1):
+        pPr = p.find(_PPR)
+        props, digest = formats.paragraph(pPr)
+        style = formats.styles.paragraph_style(pPr)
+        # Adjacent runs with the same formatting are one span
+        spans = []
+        for r in p.iter(_R):
+            text = _run_text(r)
+            if text:
+                run = formats.run(style, pPr, r.find(_RPR))
+                if spans and spans[-1][1] is run:
+                    spans[-1][0].append(text)
+                else:
+                    spans.append(([text], run))
+        spans = [(''.join(parts), run) for parts, run in spans]
+        fingerprint = hashlib.blake2b(digest, digest_size=8)
+        for text, (_, run_digest) in spans:
+            fingerprint.update(run_digest)
+            fingerprint.update(text.encode('utf-8') + b'\0')
+        text = ''.join(t.text or '' for t in p.iter(_T)).strip()
+        if any(key == 'outlineLvl' for key, _ in props):
+            section = text
+        yield Paragraph(number, section, text, fingerprint.digest(), '\0'.join(span for span, _ in spans),
+                        (props, tuple((span, run) for span, (run, _) in spans)))
+        p.clear()
+        parent = p.getparent()
+        while p.getprevious() is not None:
+            del parent[0]
+
+
+def _middle_snake(a, alo, ahi, b, blo, bhi):
+    """Start and end of the middle snake of a shortest edit path from (alo, blo) to (ahi, bhi)"""
+    n, m = ahi - alo, bhi - blo
+    delta = n - m
+    limit = (n + m + 1) // 2
+    # Furthest x reached on each diagonal k = x - y, forwards, and backwards on c = k - delta
+    forward, backward = [0] * (2 * limit + 3), [0] * (2 * limit + 3)
+    forward[1], backward[1] = alo, ahi + 1
+    for d in range(limit + 1):
+        for k in range(d, -d - 1, -2):
+            if k == -d or (k != d and forward[k - 1] < forward[k + 1]):
+                x = forward[k + 1]
+            else:
+                x = forward[k - 1] + 1
+            y = blo + (x - alo) - k
+            x0, y0 = x, y
+            while x < ahi and y < bhi and a[x] == b[y]:
+                x, y = x + 1, y + 1
+            forward[k] = x
+            if delta % 2 and -(d - 1) <= k - delta <= d - 1 and x >= backward[k - delta]:
+                return (x0, y0), (x, y)
+        for c in range(d, -d - 1, -2):
+            if c == -d or (c != d and backward[c + 1] - 1 < backward[c - 1]):
+                x = backward[c + 1] - 1
+            else:
+                x = backward[c - 1]
+            y = blo + (x - alo) - (c + delta)
+            x1, y1 = x, y
+            while x > alo and y > blo and a[x - 1] == b[y - 1]:
+                x, y = x - 1, y - 1
+            backward[c] = x
+            if not delta % 2 and -d <= c + delta <= d and x <= forward[c + delta]:
+                return (x, y), (x1, y1)
+    raise AssertionError('no middle snake')
+
+
+def _matches(a, alo, ahi, b, blo, bhi, found):
+    """Append the matched (i, j) pairs of a shortest edit script to found"""
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        found.append((alo, blo))
+        alo, blo = alo + 1, blo + 1
+    tail = []
+    while ahi > alo and bhi > blo and a[ahi - 1] == b[bhi - 1]:
+        ahi, bhi = ahi - 1, bhi - 1
+        tail.append((ahi, bhi))
+    if alo < ahi and blo < bhi:
+        (x0, y0), (x1, y1) = _middle_snake(a, alo, ahi, b, blo, bhi)
+        _matches(a, alo, x0, b, blo, y0, found)
+        found.extend(zip(range(x0, x1), range(y0, y1)))
+        _matches(a, x1, ahi, b, y1, bhi, found)
+    found.extend(reversed(tail))
+
+
+def align(a, b):
+    """Index pairs (i, j) of a longest common subsequence of a and b, in order"""
+    # Elements found on one side only cannot match: diff what is left
+    common = set(a) & set(b)
+    ai = [i for i, x in enumerate(a) if x in common]
+    bj = [j for j, x in enumerate(b) if x in common]
+    found = []
+    _matches([a[i] for i in ai], 0, len(ai), [b[j] for j in bj], 0, len(bj), found)
+    return [(ai[x], bj[y]) for x, y in found]
+
+
+def _value(value):
+    if value is None:
+        return '-'
+    if value is True:
+        return 'on'
+    if isinstance(value, tuple):
+        attrs = {etree.QName(key).localname: v for key, v in value}
+        return attrs['val'] if list(attrs) == ['val'] else ' '.join(f'{k}={v}' for k, v in attrs.items())
+    return '...'
+
+
+def _run_values(spans):
+    values = defaultdict(set)
+    for _, formatting in spans:
+        for key, value in formatting:
+            values[key].add(_value(value))
+    return values
+
+
+def describe(old, new):
+    """Formatting differences between two renditions of the same text, as a short string"""
+    (old_props, old_spans), (new_props, new_spans) = old, new
+    changes = []
+    before, after = dict(old_props), dict(new_props)
+    for key in sorted(before.keys() | after.keys()):
+        if before.get(key) != after.get(key):
+            changes.append(f'{key} {_value(before.get(key))} -> {_value(after.get(key))}')
+    before, after = _run_values(old_spans), _run_values(new_spans)
+    for key in sorted(before.keys() | after.keys()):
+        if before.get(key) != after.get(key):
+            changes.append(f"{key} {'/'.join(sorted(before.get(key, {'-'})))} -> "
+                           f"{'/'.join(sorted(after.get(key, {'-'})))}")
+    if not changes:
+        return 'run formatting'
+    more = f' and {len(changes) - DETAIL_LIMIT} more' if len(changes) > DETAIL_LIMIT else ''
+    return ', '.join(changes[:DETAIL_LIMIT]) + more
+
+
+def diff(old, new):
+    """Changes between two fingerprint lists, in document order"""
+    pairs = align([p.digest for p in old], [p.digest for p in new])
+    # Edit script in document order: removals before the additions at the same place
+    events, i, j = [], 0, 0
+    for x, y in pairs + [(len(old), len(new))]:
+        events.extend(('removed', k) for k in range(i, x))
+        events.extend(('added', k) for k in range(j, y))
+        i, j = x + 1, y + 1
+    removed = {k for kind, k in events if kind == 'removed'}
+    by_digest, by_content = defaultdict(deque), defaultdict(deque)
+    for k in sorted(removed):
+        if old[k].text:
+            by_digest[old[k].digest].append(k)
+            by_content[old[k].content].append(k)
+    # Each added paragraph takes the first removed one with the same fingerprint, then text
+    partner = {}
+    for kind, k in events:
+        if kind == 'added' and by_digest[new[k].digest]:
+            partner[k] = ('moved', by_digest[new[k].digest].popleft())
+    for kind, k in events:
+        if kind != 'added' or k in partner:
+            continue
+        queue = by_content[new[k].content]
+        while queue and queue[0] in {o for _, o in partner.values()}:
+            queue.popleft()
+        if queue:
+            partner[k] = ('reformatted', queue.popleft())
+    paired = {o for _, o in partner.values()}
+    changes = []
+    for kind, k in events:
+        if kind == 'removed':
+            if k not in paired:
+                changes.append(Change('removed', old[k].section, old[k].number, None, old[k].text, ''))
+        elif k in partner:
+            kind, o = partner[k]
+            if kind == 'moved':
+                detail = f'from paragraph {old[o].number}' + \
+                    (f' [{old[o].section[:40]}]' if old[o].section != new[k].section else '')
+            else:
+                detail = describe(old[o].format, new[k].format)
+            changes.append(Change(kind, new[k].section, old[o].number, new[k].number, new[k].text, detail))
+        else:
+            changes.append(Change('added', new[k].section, None, new[k].number, new[k].text, ''))
+    return changes
+
+
+_MARKS = {'added': '+', 'removed': '-', 'moved': '>', 'reformatted': '~'}
+
+
+def report(changes, limit=None):
+    """Changes listed under their section headings followed by counts per kind"""
+    lines, section = [], None
+    for change in changes[:limit]:
+        if change.section != section:
+            section = change.section
+            lines.append(f'[{section or "title page"}]')
+        number = change.new if change.new is not None else change.old
+        text = f' "{change.text[:60]}"' if change.text else ' (empty)'
+        detail = f' ({change.detail})' if change.detail else ''
+        lines.append(f'  {_MARKS[change.kind]} {number}{text}{detail}')
+    if limit is not None and len(changes) > limit:
+        lines.append(f'... {len(changes) - limit} more')
+    counts = {kind: 0 for kind in _MARKS}
+    for change in changes:
+        counts[change.kind] += 1
+    lines.append(', '.join(f'{n} {kind}' for kind, n in counts.items()))
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    import time
+
+    parser = argparse.ArgumentParser(description='Show added, removed, moved and reformatted paragraphs '
+                                                 'between two versions of a .docx report')
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('-n', '--limit', type=int, default=100, help='changes to list (default: %(default)s)')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    old, new = fingerprints(args.old), fingerprints(args.new)
+    changes = diff(old, new)
+    print(report(changes, args.limit))
+    print(f'{len(old)} -> {len(new)} paragraphs compared in {time.perf_counter() - start:.3f} s')
+    sys.exit(1 if changes else 0)
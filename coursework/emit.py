@@ -0,0 +1,238 @@
+"""Markdown and HTML versions of the report from the compiled operations.
+
+The compiled spec is the content model, so Markdown and HTML come almost
+for free next to the .docx: coursework.build's build() and
+build_streaming() hand every operation to extra writers in the same pass
+that renders the document. A writer has write(op) and close(); op is one of
+the tuples coursework.render executes.
+
+MarkdownWriter produces GitHub-flavoured Markdown (title page blocks as
+centred HTML paragraphs, the TOC as a list of heading links, figures as SVG
+files in a figures/ directory next to it, listings as fenced code).
+HtmlWriter produces a standalone page styled after the style registry, with
+figures inlined as SVG, listings highlighted with the colours of the code
+token styles and page breaks that apply when it is printed.
+"""
+
+import html
+import os
+import re
+
+from coursework.diagrams import figure
+from coursework.listings import tokenize
+from coursework.styles import BODY, CODE, CODE_FONT, FONT_NAME, KEYWORD, STYLES, TITLE, TITLE_STRONG
+from coursework.toc import TOC_DEPTH
+
+_MD_SPECIAL = re.compile(r'([\\`*_<\[])')
+# Line starts Markdown would read as a heading, list, quote or rule
+_MD_BLOCK = re.compile(r'^(#|[-+*] |\d+[.)] |>|=+$|-+$)')
+_SLUG_DROP = re.compile(r'[^\w\- ]')
+_BACKTICKS = re.compile('`+')
+_ALIGN = {TITLE: 'center'}
+
+
+def slug(title, seen):
+    """GitHub-style anchor of a heading, made unique with -1, -2... suffixes"""
+    base = _SLUG_DROP.sub('', title.strip().lower()).replace(' ', '-')
+    count = seen.get(base, 0)
+    seen[base] = count + 1
+    return f'{base}-{count}' if count else base
+
+
+def _toc_slugs(entries, seen):
+    # Entries list the headings that follow, in order, so their anchors are
+    # the ones those headings will get
+    preview = dict(seen)
+    return [slug(title, preview) for title, level, _ in entries if level <= TOC_DEPTH]
+
+
+class MarkdownWriter:
+    """Writes GitHub-flavoured Markdown"""
+
+    def __init__(self, path):
+        self.f = open(path, 'w', encoding='utf-8')
+        self.figures = os.path.join(os.path.dirname(os.path.abspath(path)), 'figures')
+        self.seen = {}
+
+    def _text(self, text):
+        return _MD_SPECIAL.sub(r'\\\1', text)
+
+    def _line(self, text):
+        text = self._text(text)
+        return '\\' + text if _MD_BLOCK.match(text) else text
+
+    def _block(self, text):
+        self.f.write(text + '\n\n')
+
+    def write(self, op):
+        kind = op[0]
+        if kind == 'heading':
+            self._block('#' * op[2] + ' ' + self._text(op[1]))
+            slug(op[1], self.seen)
+        elif kind == 'paragraph':
+            self._block(self._line(op[1]))
+        elif kind == 'bold':
+            self._block(f'**{self._text(op[1])}**')
+        elif kind == 'keywords':
+            self._block(f'**{self._text(op[1].strip())}** {self._text(op[2].strip())}')
+        elif kind == 'list_item':
+            # The number is part of the text, so the list keeps the report's numbering
+            self._block(self._text(op[1]))
+        elif kind == 'block':
+            _, style, text, run_style = op
+            lines = '<br>'.join(html.escape(line, quote=False) for line in text.strip('\n').split('\n'))
+            if run_style in (KEYWORD, TITLE_STRONG):
+                lines = f'<strong>{lines}</strong>'
+            self._block(f'<p align="{_ALIGN.get(style, "right")}">{lines}</p>')
+        elif kind == 'page_break':
+            self._block('---')
+        elif kind == 'toc':
+            entries = [e for e in op[1] or () if e[1] <= TOC_DEPTH]
+            items = [f"{'  ' * (level - 1)}- [{self._text(title)}](#{anchor})"
+                     for (title, level, _), anchor in zip(entries, _toc_slugs(entries, self.seen))]
+            if items:
+                self._block('\n'.join(items))
+        elif kind == 'table':
+            _, caption, header, rows, _ = op
+            cells = lambda row: '| ' + ' | '.join(self._text(c).replace('|', '\\|').replace('\n', '<br>')
+                                                  for c in row) + ' |'
+            table = [cells(header), '|' + '---|' * len(header), *(cells(row) for row in rows)]
+            if caption:
+                self._block(self._line(caption))
+            self._block('\n'.join(table))
+        elif kind == 'code':
+            _, caption, language, text = op
+            # The fence must be longer than any run of backticks in the code
+            fence = '`' * max([3] + [len(run) + 1 for run in _BACKTICKS.findall(text)])
+            if caption:
+                self._block(self._line(caption))
+            self._block(f'{fence}{language or "text"}\n{text}\n{fence}')
+        elif kind == 'figure':
+            _, key, _, _, caption = op
+            name = f'diagram-{key[:16]}.svg'
+            os.makedirs(self.figures, exist_ok=True)
+            with open(os.path.join(self.figures, name), 'wb') as f:
+                f.write(figure(key).svg)
+            self._block(f'![{self._text(caption or "")}](figures/{name})')
+            if caption:
+                self._block(f'<p align="center">{html.escape(caption, quote=False)}</p>')
+
+    def close(self):
+        self.f.close()
+
+
+def _token_class(style):
+    return style.lower().replace(' ', '-')
+
+
+def _css():
+    font = STYLES['Normal'][2]
+    body = STYLES[BODY][3]
+    tokens = ''.join(
+        f'.{_token_class(name)} {{ color: #{props["color"]}; '
+        + ('font-weight: bold; ' if props.get('bold') else '')
+        + ('font-style: italic; ' if props.get('italic') else '') + '}\n'
+        for name, (_, _, props, _) in STYLES.items() if name.startswith(CODE + ' '))
+    return (
+        f"body {{ font-family: '{FONT_NAME}', serif; font-size: {font['size'].pt:g}pt; "
+        'max-width: 170mm; margin: 2em auto; color: #000; }\n'
+        'p { margin: 0; line-height: 1.5; white-space: pre-wrap; }\n'
+        f"p.body {{ text-align: justify; text-indent: {body['first_line_indent'].inches:g}in; }}\n"
+        'p.list, p.keywords { text-align: justify; }\n'
+        'p.list { margin-left: 0.5in; }\n'
+        'p.spacer { min-height: 1.5em; }\n'
+        'p.center { text-align: center; } p.right { text-align: right; }\n'
+        'p.caption { margin-top: 6pt; }\n'
+        'figure { margin: 6pt 0; text-align: center; } figure svg { max-width: 100%; height: auto; }\n'
+        'figcaption { line-height: 1.5; margin-bottom: 6pt; }\n'
+        f"pre.code {{ font-family: '{CODE_FONT}', monospace; font-size: {STYLES[CODE][2]['size'].pt:g}pt; "
+        'margin: 0 0 6pt; white-space: pre-wrap; }\n'
+        'h1 { font-size: 16pt; text-align: center; } h2, h3 { font-size: 14pt; }\n'
+        'nav ul { list-style: none; padding-left: 0; } nav ul ul { padding-left: 0.3in; }\n'
+        'table { border-collapse: collapse; width: 100%; font-size: 12pt; table-layout: fixed; }\n'
+        'th, td { border: 1px solid #000; padding: 0 0.08in; text-align: left; vertical-align: top; }\n'
+        'hr.page-break { border: 0; border-top: 1px dashed #999; margin: 2em 0; }\n'
+        '@media print { hr.page-break { border: 0; break-after: page; } }\n'
+    ) + tokens
+
+
+class HtmlWriter:
+    """Writes a standalone HTML page for review"""
+
+    def __init__(self, path, title='Курсова робота'):
+        self.f = open(path, 'w', encoding='utf-8')
+        self.seen = {}
+        self.f.write(f'<!DOCTYPE html>\n<html lang="uk">\n<head>\n<meta charset="utf-8">\n'
+                     f'<title>{html.escape(title)}</title>\n<style>\n{_css()}</style>\n</head>\n<body>\n')
+
+    def write(self, op):
+        kind, e = op[0], html.escape
+        if kind == 'heading':
+            level = op[2]
+            self.f.write(f'<h{level} id="{e(slug(op[1], self.seen))}">{e(op[1])}</h{level}>\n')
+        elif kind == 'spacer':
+            self.f.write('<p class="spacer"></p>\n')
+        elif kind == 'paragraph':
+            self.f.write(f'<p class="body">{e(op[1])}</p>\n')
+        elif kind == 'bold':
+            self.f.write(f'<p class="body"><strong>{e(op[1])}</strong></p>\n')
+        elif kind == 'keywords':
+            self.f.write(f'<p class="keywords"><strong>{e(op[1])}</strong>{e(op[2])}</p>\n')
+        elif kind == 'list_item':
+            self.f.write(f'<p class="list">{e(op[1])}</p>\n')
+        elif kind == 'block':
+            _, style, text, run_style = op
+            inner = '<br>'.join(e(line) for line in text.split('\n'))
+            if run_style == TITLE_STRONG:
+                inner = f'<strong style="font-size: 16pt">{inner}</strong>'
+            elif run_style == KEYWORD:
+                inner = f'<strong>{inner}</strong>'
+            self.f.write(f'<p class="{_ALIGN.get(style, "right")}">{inner}</p>\n')
+        elif kind == 'page_break':
+            self.f.write('<hr class="page-break">\n')
+        elif kind == 'toc':
+            self._toc([entry for entry in op[1] or () if entry[1] <= TOC_DEPTH])
+        elif kind == 'table':
+            _, caption, header, rows, weights = op
+            if caption:
+                self.f.write(f'<p class="caption">{e(caption)}</p>\n')
+            cols = ''.join(f'<col style="width: {100 * w / sum(weights):.2f}%">' for w in weights)
+            cell = lambda tag, text: f'<{tag}>' + '<br>'.join(e(line) for line in text.split('\n')) + f'</{tag}>'
+            self.f.write(f'<table><colgroup>{cols}</colgroup>\n<thead><tr>'
+                         + ''.join(cell('th', text) for text in header) + '</tr></thead>\n<tbody>\n')
+            for row in rows:
+                self.f.write('<tr>' + ''.join(cell('td', text) for text in row) + '</tr>\n')
+            self.f.write('</tbody></table>\n')
+        elif kind == 'code':
+            _, caption, language, text = op
+            if caption:
+                self.f.write(f'<p class="caption">{e(caption)}</p>\n')
+            code = ''.join(f'<span class="{_token_class(style)}">{e(chunk)}</span>' if style else e(chunk)
+                           for chunk, style in tokenize(text, language))
+            self.f.write(f'<pre class="code"><code>{code}</code></pre>\n')
+        elif kind == 'figure':
+            _, key, _, _, caption = op
+            self.f.write(f"<figure>{figure(key).svg.decode('utf-8')}\n")
+            if caption:
+                self.f.write(f'<figcaption>{e(caption)}</figcaption>\n')
+            self.f.write('</figure>\n')
+
+    def _toc(self, entries):
+        self.f.write('<nav>\n')
+        depth = 0
+        for (title, level, page), anchor in zip(entries, _toc_slugs(entries, self.seen)):
+            while depth < level:
+                self.f.write('<ul>\n')
+                depth += 1
+            while depth > level:
+                self.f.write('</ul>\n')
+                depth -= 1
+            self.f.write(f'<li><a href="#{html.escape(anchor)}">{html.escape(title)}</a></li>\n')
+        self.f.write('</ul>\n' * depth + '</nav>\n')
+
+    def close(self):
+        if self.f.closed:
+            return
+        self.f.write('</body>\n</html>\n')
+        self.f.close()
+
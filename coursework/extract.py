@@ -0,0 +1,266 @@
+"""Content spec reconstructed from an existing .docx report.
+
+word/document.xml is read with lxml's iterparse and every paragraph is
+turned into one spec line as soon as it ends, then discarded, so memory does
+not grow with the report (a table is held until its last row). The spec
+format is the one coursework.spec compiles:
+
+    heading styles (outline level 1-3)  -> # / ## / ###
+    empty paragraph                     -> empty line
+    page break                          -> ---
+    TOC field and toc N entries         -> ::: toc block
+    centred / right-aligned paragraph   -> ::: center / ::: right block
+    numbered list item ("N. text")      -> + text
+    bold label followed by plain text   -> **label**text
+    bold paragraph                      -> **text**
+    table (with the caption before it)  -> ::: table block
+    code listing (and its caption)      -> ::: code block
+    picture and its figure caption      -> <!-- figure: caption --> comment
+
+Formatting is resolved through the style chain with coursework.validate's
+StyleSheet, so reports written with direct formatting (set_font() on every
+run) extract the same way as those written with the style registry. A
+report generated from a spec extracts back to a spec that compiles to the
+same operations, with ::: java blocks expanded into their tables and
+listings; figures cannot be recovered from their pictures and are only
+marked, and listings come back without their highlighting language.
+"""
+
+import math
+import re
+import zipfile
+from functools import reduce
+
+from docx.shared import Twips
+from lxml import etree
+
+from coursework.spec import table_line
+from coursework.styles import CODE, FIGURE_CAPTION, LIST_ITEM, TABLE_CAPTION, TITLE_STRONG
+from coursework.tables import column_widths
+from coursework.validate import W, StyleSheet, _paragraph_props, _run_props
+
+_P, _R, _TBL, _TR, _TC = W + 'p', W + 'r', W + 'tbl', W + 'tr', W + 'tc'
+_DOC_PR = '{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}docPr'
+_PPR, _RPR = W + 'pPr', W + 'rPr'
+
+_LIST_NUMBER = re.compile(r'^(\d+)\. ')
+_HEADING_NAME = re.compile(r'^heading (\d)$')
+_CAPTION_TEXT = re.compile(r'^Таблиця\s+\S+')
+# Lines the spec compiler would not read as a plain paragraph
+_MARKERS = re.compile(r'^(#{1,3} |\+ |---$|\\|:::|<!--|\*\*.+?\*\*)')
+STRONG_SIZE = 16
+# Largest total of column weights tried before falling back to the widths' common divisor
+MAX_WEIGHTS = 100
+
+
+class _Paragraph:
+    """Text and formatting of one paragraph, as far as the spec can express it"""
+
+    __slots__ = ('style', 'level', 'align', 'runs', 'page_break', 'numbered', 'pictures')
+
+    def text(self):
+        return ''.join(text for text, _ in self.runs)
+
+
+def _read_paragraph(p, styles):
+    pPr = _paragraph_props(p.find(_PPR))
+    style_id = pPr.get('style', styles.default_paragraph)
+    style_pPr, style_rPr = styles.resolve(style_id)
+    props = {**styles.paragraph_defaults, **style_pPr, **pPr}
+    para = _Paragraph()
+    para.style = styles.name(style_id)
+    match = _HEADING_NAME.match(para.style.lower())
+    para.level = props['outline'] + 1 if 'outline' in props else int(match.group(1)) if match else None
+    para.align = props.get('jc', 'left')
+    para.numbered = bool(props.get('numbered'))
+    para.page_break = False
+    para.runs = []
+    # Descriptions of the pictures, which carry the figure captions
+    para.pictures = [el.get('descr') or '' for el in p.iter(_DOC_PR)]
+    for r in p.iter(_R):
+        rPr = _run_props(r.find(_RPR))
+        char_style = rPr.get('style')
+        run = {**styles.run_defaults, **style_rPr, **(styles.resolve(char_style)[1] if char_style else {}), **rPr}
+        emphasis = None
+        if run.get('b'):
+            strong = char_style and styles.name(char_style) == TITLE_STRONG
+            emphasis = 'strong' if strong or run.get('size', 0) >= STRONG_SIZE else 'bold'
+        parts = []
+        for el in r:
+            if el.tag == W + 't':
+                parts.append(el.text or '')
+            elif el.tag == W + 'tab':
+                parts.append('\t')
+            elif el.tag in (W + 'br', W + 'cr'):
+                if el.get(W + 'type') == 'page':
+                    para.page_break = True
+                else:
+                    parts.append('\n')
+        if parts:
+            para.runs.append((''.join(parts), emphasis))
+    return para
+
+
+def _escape(text):
+    """Spec line for a plain paragraph"""
+    text = text.replace('\n', ' ')
+    if _MARKERS.match(text) or not text.strip():
+        return '\\' + text
+    return text
+
+
+def _weights(widths):
+    """Smallest column weights that column_widths() turns into these widths in twips"""
+    total = sum(widths)
+    # The last column takes the rounding remainder, so the ratios are only approximate
+    for scale in range(len(widths), MAX_WEIGHTS + 1):
+        weights = [round(w * scale / total) for w in widths]
+        if min(weights) >= 1 and column_widths(weights, Twips(total)) == widths:
+            return weights
+    unit = reduce(math.gcd, widths)
+    return [w // unit for w in widths]
+
+
+class Extractor:
+    """Turns the paragraphs of one document into spec lines"""
+
+    def __init__(self, styles):
+        self.styles = styles
+        self.list_number = 0
+        self.in_toc = False
+        self.caption = None
+
+    def paragraph(self, para):
+        """Spec lines for one body paragraph"""
+        if para.style == CODE:
+            # The caption before a listing is its first line, as for tables
+            caption, self.caption = self.caption or '', None
+            self.list_number = 0
+            self.in_toc = False
+            return ['::: code', caption, *para.text().split('\n'), ':::']
+        lines = [] if self.caption is None else self._flush_caption()
+        text = para.text()
+        if para.style.lower().startswith('toc'):
+            if not self.in_toc:
+                self.in_toc = True
+                lines += ['::: toc', ':::']
+            return lines
+        self.in_toc = False
+        if para.pictures:
+            self.list_number = 0
+            return lines + [f'<!-- figure: {descr} -->' if descr else '<!-- figure -->' for descr in para.pictures]
+        if para.style == FIGURE_CAPTION:
+            return lines
+        if para.style == TABLE_CAPTION or _CAPTION_TEXT.match(text) and para.align != 'both':
+            self.caption = text
+            return lines
+        lines += self._content(para, text)
+        if para.page_break:
+            self.list_number = 0
+            lines.append('---')
+        return lines
+
+    def _flush_caption(self):
+        caption, self.caption = self.caption, None
+        self.list_number = 0
+        return [_escape(caption)]
+
+    def _content(self, para, text):
+        list_number, self.list_number = self.list_number, 0
+        if not text.strip():
+            return [] if para.page_break else ['']
+        if para.level is not None:
+            return ['#' * min(para.level, 3) + ' ' + text.strip()]
+        if para.align in ('center', 'right'):
+            emphases = {emphasis for run_text, emphasis in para.runs if run_text.strip()}
+            option = f' {emphases.pop()}' if len(emphases) == 1 and None not in emphases else ''
+            return [f'::: {para.align}{option}', *text.split('\n'), ':::']
+        match = _LIST_NUMBER.match(text)
+        if match and (para.style == LIST_ITEM or para.numbered) and int(match.group(1)) == list_number + 1:
+            self.list_number = list_number + 1
+            return ['+ ' + text[match.end():].replace('\n', ' ')]
+        bold = [emphasis is not None for _, emphasis in para.runs]
+        if all(bold):
+            return [f'**{text}**'.replace('\n', ' ')]
+        if bold[0]:
+            split = bold.index(False)
+            label = ''.join(text for text, _ in para.runs[:split])
+            if not any(bold[split:]) and label.strip():
+                return [f'**{label}**{text[len(label):]}'.replace('\n', ' ')]
+        return [_escape(text)]
+
+    def table(self, rows, widths):
+        """::: table block for the rows of a table and its column widths in twips"""
+        caption, self.caption = self.caption or '', None
+        self.list_number = 0
+        self.in_toc = False
+        weights = ''
+        if widths and len(widths) == len(rows[0]):
+            weights = ' ' + ','.join(map(str, _weights(widths)))
+        return [f'::: table{weights}', caption, *(table_line(row) for row in rows), ':::']
+
+    def finish(self):
+        return self._flush_caption() if self.caption is not None else []
+
+
+def extract(path, write):
+    """Call write(line) for every spec line of a .docx; returns the number of body paragraphs read"""
+    with zipfile.ZipFile(path) as package:
+        with package.open('word/styles.xml') as f:
+            styles = StyleSheet(f)
+        extractor = Extractor(styles)
+        paragraphs = 0
+        tables, rows, row, widths = 0, [], [], []
+        with package.open('word/document.xml') as f:
+            for event, el in etree.iterparse(f, events=('start', 'end')):
+                if el.tag == _TBL:
+                    tables += 1 if event == 'start' else -1
+                    if event == 'start' and tables == 1:
+                        rows, widths = [], []
+                if event != 'end':
+                    continue
+                if el.tag == W + 'gridCol' and tables == 1:
+                    widths.append(int(el.get(W + 'w') or 0))
+                elif el.tag == _TC and tables == 1:
+                    row.append('\n'.join(_read_paragraph(p, styles).text() for p in el.iter(_P)))
+                elif el.tag == _TR and tables == 1:
+                    rows.append(tuple(row))
+                    row = []
+                elif el.tag == _TBL and tables == 0:
+                    for line in extractor.table(rows, [w for w in widths if w]):
+                        write(line)
+                elif el.tag == _P and tables == 0:
+                    paragraphs += 1
+                    for line in extractor.paragraph(_read_paragraph(el, styles)):
+                        write(line)
+                else:
+                    continue
+                if tables == 0:
+                    # Drop everything already converted, keeping memory flat
+                    parent = el.getparent()
+                    el.clear()
+                    while el.getprevious() is not None:
+                        del parent[0]
+        for line in extractor.finish():
+            write(line)
+    return paragraphs
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    import time
+
+    parser = argparse.ArgumentParser(description='Reconstruct the content spec of a .docx report')
+    parser.add_argument('path')
+    parser.add_argument('-o', '--output', help='spec file to write (default: standard output)')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        count = extract(args.path, lambda line: out.write(line + '\n'))
+    finally:
+        if args.output:
+            out.close()
+    if args.output:
+        print(f'{count} paragraphs extracted to {args.output} in {time.perf_counter() - start:.3f} s')
@@ -0,0 +1,325 @@
+"""Searchable index over the methodical guidelines in `met`.
+
+The guidelines are a plain UTF-8 dump, one printed line per line. The file
+is memory-mapped and indexed once: every word is lower-cased, stemmed with
+a light Ukrainian suffix stripper and recorded by its position in the token
+stream, so phrase lookups match across the original line wraps. Headings
+("1.6 Зміст курсової роботи", "Б.1 Загальні вимоги", "Додаток Б") form the
+section list. The index is pickled under .cache/met/ and reused until the
+file's content changes; lines are read back from the mapping on demand.
+
+On top of the lookups sit the extractors the generator needs: the required
+structure of the explanatory note, the formatting rules and the page limits.
+"""
+
+import hashlib
+import mmap
+import os
+import pickle
+import re
+from array import array
+from collections import namedtuple
+
+from coursework.spec import CACHE_DIR
+
+MET_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'met')
+
+# Bump whenever tokenization, stemming or the index layout changes
+INDEX_VERSION = 1
+
+Section = namedtuple('Section', 'number title level lineno')
+
+_WORD = re.compile(r"[^\W_]+(?:['’ʼ][^\W_]+)*")
+_APOSTROPHES = str.maketrans({'’': "'", 'ʼ': "'"})
+_HEADING = re.compile(r'^((?:\d+|[А-ЯІЇЄҐ])(?:\.\d+)*) ([А-ЯІЇЄҐA-Z].*)$')
+_APPENDIX = re.compile(r'^Додаток ([А-ЯІЇЄҐ])$')
+
+_REFLEXIVE = ('ся', 'сь')
+# Inflectional endings, longest first; a stem keeps at least three letters
+_ENDINGS = tuple(sorted((
+    'ування', 'ювання', 'ення', 'ання', 'іння', 'ість', 'ості', 'істю',
+    'ами', 'ями', 'ові', 'еві', 'ого', 'ому', 'ими', 'іми', 'ної', 'ний', 'ною', 'них', 'ним',
+    'ій', 'ий', 'ої', 'ою', 'ею', 'єю', 'их', 'іх', 'ах', 'ях', 'ом', 'ем', 'ям', 'ам', 'ів', 'їв',
+    'ти', 'ть', 'ють', 'ать', 'ять', 'ить', 'ено', 'ано', 'ла', 'ло', 'ли',
+    'а', 'я', 'о', 'е', 'є', 'и', 'і', 'ї', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True))
+_MIN_STEM = 3
+
+_NUMERALS = {'одному': 1, 'двом': 2, 'трьом': 3, 'чотирьом': 4, "п'яти": 5, 'шести': 6}
+
+
+def stem(word):
+    """Strip the reflexive particle and one inflectional ending from a lower-case word"""
+    for suffix in _REFLEXIVE:
+        if word.endswith(suffix) and len(word) - len(suffix) >= _MIN_STEM:
+            word = word[:-len(suffix)]
+            break
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    """Lower-case words of text with apostrophes normalized"""
+    return [word.translate(_APOSTROPHES) for word in _WORD.findall(text.lower())]
+
+
+def terms(text):
+    """Stemmed index terms of text"""
+    return [stem(word) for word in tokenize(text)]
+
+
+def _heading(line):
+    """Section for a heading line, or None (contents entries and table rows are not headings)"""
+    line = line.strip()
+    if not line or len(line) > 120 or '....' in line or '\t' in line:
+        return None
+    match = _APPENDIX.match(line)
+    if match:
+        return Section(match.group(1), line, 1, None)
+    match = _HEADING.match(line)
+    if match is None or line[-1].isdigit() or line[-1] in '-–,;.':
+        return None
+    number, title = match.groups()
+    if '.' not in number and (not number.isdigit() or title != title.upper()):
+        # Chapter headings are printed in capitals; numbered table rows are not
+        return None
+    return Section(number, title.strip(), number.count('.') + 1, None)
+
+
+def _fingerprint(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _digest(mm):
+    return hashlib.sha256(mm).hexdigest()
+
+
+class GuidelineIndex:
+    """Inverted index of the guidelines file with phrase and section lookup"""
+
+    def __init__(self, path, mm, data):
+        self.path = path
+        self._mm = mm
+        self._offsets = data['offsets']
+        self._token_lines = data['token_lines']
+        self._postings = data['postings']
+        self.sections = [Section(*section) for section in data['sections']]
+        self._sets = {}
+
+    @classmethod
+    def open(cls, path=MET_PATH, cache_dir=CACHE_DIR):
+        """Map the guidelines file and load its index, rebuilding it if the file changed"""
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        cached = os.path.join(cache_dir, 'met', 'index.pickle') if cache_dir else None
+        fingerprint = _fingerprint(path)
+        data = None
+        if cached and os.path.exists(cached):
+            with open(cached, 'rb') as f:
+                data = pickle.load(f)
+            if data['version'] != INDEX_VERSION:
+                data = None
+            elif data['fingerprint'] != fingerprint:
+                # Touched but not necessarily changed: compare the content hash
+                if data['digest'] == _digest(mm):
+                    data['fingerprint'] = fingerprint
+                    cls._store(cached, data)
+                else:
+                    data = None
+        if data is None:
+            data = cls._build(mm)
+            data['fingerprint'] = fingerprint
+            if cached:
+                cls._store(cached, data)
+        return cls(path, mm, data)
+
+    @staticmethod
+    def _build(mm):
+        offsets = array('Q')
+        token_lines = array('I')
+        postings = {}
+        sections = []
+        position = 0
+        for lineno, raw in enumerate(iter(mm.readline, b'')):
+            offsets.append(mm.tell() - len(raw))
+            line = raw.decode('utf-8')
+            section = _heading(line)
+            if section is not None:
+                sections.append(tuple(section._replace(lineno=lineno)))
+            for term in terms(line):
+                postings.setdefault(term, array('I')).append(position)
+                token_lines.append(lineno)
+                position += 1
+        offsets.append(len(mm))
+        return {
+            'version': INDEX_VERSION,
+            'digest': _digest(mm),
+            'offsets': offsets,
+            'token_lines': token_lines,
+            'postings': postings,
+            'sections': sections,
+        }
+
+    @staticmethod
+    def _store(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def line(self, lineno):
+        """Text of a line (0-based), read from the mapping"""
+        return self._mm[self._offsets[lineno]:self._offsets[lineno + 1]].decode('utf-8').rstrip('\n')
+
+    def lines(self, start, stop):
+        return [self.line(n) for n in range(start, min(stop, len(self)))]
+
+    def _positions(self, term):
+        positions = self._sets.get(term)
+        if positions is None:
+            positions = self._sets[term] = frozenset(self._postings.get(term, ()))
+        return positions
+
+    def search(self, query):
+        """Line numbers containing every word of the query (in any form)"""
+        query = terms(query)
+        if not query:
+            return []
+        rarest = min(query, key=lambda term: len(self._postings.get(term, ())))
+        candidates = {self._token_lines[p] for p in self._postings.get(rarest, ())}
+        for term in query:
+            if term != rarest:
+                candidates &= {self._token_lines[p] for p in self._postings.get(term, ())}
+        return sorted(candidates)
+
+    def phrase(self, text):
+        """Line numbers where the words of text occur in sequence (across line wraps)"""
+        query = terms(text)
+        if not query:
+            return []
+        starts = self._postings.get(query[0], ())
+        for offset, term in enumerate(query[1:], 1):
+            positions = self._positions(term)
+            starts = [p for p in starts if p + offset in positions]
+        return sorted({self._token_lines[p] for p in starts})
+
+    def section(self, key):
+        """First section whose number equals key or whose title starts with it"""
+        lowered = key.lower()
+        for section in self.sections:
+            if section.number == key:
+                return section
+        for section in self.sections:
+            if section.title.lower().startswith(lowered):
+                return section
+        raise KeyError(key)
+
+    def section_text(self, key):
+        """Lines of a section up to the next heading of the same or a higher level"""
+        section = self.section(key)
+        index = self.sections.index(section)
+        end = len(self)
+        for following in self.sections[index + 1:]:
+            if following.level <= section.level:
+                end = following.lineno
+                break
+        return [line.strip() for line in self.lines(section.lineno + 1, end)]
+
+    def _window(self, text, before=0, after=2):
+        """Joined lines around the first occurrence of a phrase"""
+        found = self.phrase(text)
+        if not found:
+            raise LookupError(f'phrase not found in guidelines: {text!r}')
+        start = max(found[0] - before, 0)
+        return ' '.join(line.strip() for line in self.lines(start, found[0] + after + 1))
+
+    def required_sections(self):
+        """Structural elements the explanatory note must contain, in order"""
+        start = self.phrase('структура пояснювальної записки')[0]
+        items = []
+        for n in range(start + 1, len(self)):
+            line = self.line(n).strip()
+            if not line.startswith('–'):
+                break
+            items.append(line.lstrip('– ').rstrip(';.'))
+        return items
+
+    def page_limits(self):
+        """(min, max) sheets of the main text"""
+        match = re.search(r'(\d+)\s*[-–]\s*(\d+)\s+аркуш', self._window('обсяг основного тексту'))
+        return int(match.group(1)), int(match.group(2))
+
+    def formatting_rules(self):
+        """Page format, font size, line spacing, margins and paragraph indent"""
+        general = self._window('виконується на аркушах формату', after=6)
+        page_format = re.search(r'формату\s+(\w+)', general).group(1)
+        font_size = int(re.search(r'(\d+)\s+шрифтом', general).group(1))
+        spacing = float(re.search(r'через\s+([\d,]+)\s+інтервал', general).group(1).replace(',', '.'))
+        margins = re.search(r'верхнє, ліве і нижнє\s*[–-]\s*не менше\s+(\d+)\s*мм,\s*праве\s*[–-]\s*'
+                            r'не менше(?: ніж)?\s+(\d+)\s*мм', general)
+        side, right = int(margins.group(1)), int(margins.group(2))
+        indent = re.search(r'дорівнювати\s+(\S+)\s+знак', self._window('абзацний відступ'))
+        return {
+            'page_format': page_format.replace('А', 'A'),
+            'font_size': font_size,
+            'line_spacing': spacing,
+            'margins_mm': {'top': side, 'left': side, 'bottom': side, 'right': right},
+            'indent_chars': _NUMERALS.get(indent.group(1).translate(_APOSTROPHES)),
+        }
+
+
+_index = None
+
+
+def guidelines():
+    """Shared index of the repository's `met` file"""
+    global _index
+    if _index is None:
+        _index = GuidelineIndex.open()
+    return _index
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Query the methodical guidelines')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('search', help='lines containing all words').add_argument('query')
+    sub.add_parser('phrase', help='lines where the words occur in sequence').add_argument('text')
+    sub.add_parser('section', help='text of a section by number or title').add_argument('key')
+    sub.add_parser('sections', help='list the section headings')
+    sub.add_parser('rules', help='required structure, formatting rules and page limits')
+    args = parser.parse_args()
+    index = guidelines()
+    if args.command in ('search', 'phrase'):
+        found = index.search(args.query) if args.command == 'search' else index.phrase(args.text)
+        for lineno in found:
+            print(f'{lineno + 1:>5}: {index.line(lineno).strip()}')
+    elif args.command == 'section':
+        print('\n'.join(index.section_text(args.key)))
+    elif args.command == 'sections':
+        for section in index.sections:
+            print(f"{section.lineno + 1:>5}: {'  ' * (section.level - 1)}{section.number} {section.title}")
+    else:
+        print(json.dumps({
+            'required_sections': index.required_sections(),
+            'formatting': index.formatting_rules(),
+            'page_limits': index.page_limits(),
+        }, ensure_ascii=False, indent=2))
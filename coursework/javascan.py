@@ -0,0 +1,494 @@
+"""Scanner for the Spring Boot backend sources.
+
+Every .java file under backend/src/main/java is reduced to its top-level
+type: package, kind, name, annotations, fields, methods (with their own
+annotations) and enum constants. Parsing is regex based on a copy of the
+source with comments removed and string literals masked, which is enough
+for the declarations this codebase uses.
+
+Results are cached per file in .cache/javascan/ by (size, mtime): on an
+unchanged tree a rescan costs one stat() per file. A file whose stamp
+changed is hashed first and only re-parsed when its content differs. When
+many files need parsing they are spread over a process pool.
+
+resolve_sources() expands the spec's ::: java directives into ordinary
+operations: the package tree and the source of a type as code listings,
+the REST endpoints as a table, the fields of every @Document entity as one
+table per collection, and the collections with their references and the
+packages with their dependencies as diagrams (see coursework.diagrams).
+"""
+
+import hashlib
+import os
+import pickle
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from coursework.listings import listing_text
+from coursework.spec import CACHE_DIR, SpecError
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_ROOT = os.path.join(REPO_DIR, 'backend', 'src', 'main', 'java')
+
+# Bump whenever the parse result format changes to invalidate the cache
+SCAN_VERSION = 2
+
+# Below this many files to parse, a process pool costs more than it saves
+PARALLEL_THRESHOLD = 32
+
+Annotation = namedtuple('Annotation', 'name args')
+Member = namedtuple('Member', 'kind name type annotations')
+JavaType = namedtuple('JavaType', 'path package kind name annotations extends members constants enums')
+Endpoint = namedtuple('Endpoint', 'controller method path handler')
+Field = namedtuple('Field', 'name bson reference constants')
+
+_UNCHANGED = 'unchanged'
+
+HTTP_MAPPINGS = {
+    'GetMapping': 'GET',
+    'PostMapping': 'POST',
+    'PutMapping': 'PUT',
+    'PatchMapping': 'PATCH',
+    'DeleteMapping': 'DELETE',
+}
+
+_LEXEME = re.compile(r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'', re.S)
+_STRING_REF = re.compile(r'"(\d+)"')
+_PACKAGE = re.compile(r'^\s*package\s+([\w.]+)\s*;', re.M)
+_ANNOTATION = re.compile(r'@(\w+(?:\.\w+)*)\s*(\((?:[^()]|\([^()]*\))*\))?')
+_TYPE = re.compile(
+    r'((?:@\w+(?:\.\w+)*\s*(?:\((?:[^()]|\([^()]*\))*\))?\s*)*)'
+    r'(?:(?:public|protected|private|abstract|final|static|sealed|strictfp)\s+)*'
+    r'(class|interface|enum|record|@interface)\s+(\w+)([^{]*)\{')
+_INNER_BLOCK = re.compile(r'\{[^{}]*\}')
+_MODIFIERS = re.compile(r'^(?:(?:public|protected|private|static|final|abstract|transient|'
+                        r'volatile|synchronized|native|default)\s+)*')
+_FIELD = re.compile(r'^(.+?)\s+(\w+)\s*(?:=.*)?$', re.S)
+_NESTED_ENUM = re.compile(r'\benum\s+(\w+)\s*\{([^{}]*)\}')
+_CONSTANT = re.compile(r'\s*(?:@\w+\s*)*(\w+)')
+_METHOD = re.compile(r'^(?:<[^>]*>\s*)?(?:(.+?)\s+)?(\w+)\s*\(', re.S)
+
+
+def _mask(source):
+    """Drop comments and replace string literals by numbered placeholders"""
+    strings = []
+
+    def replace(match):
+        text = match.group(0)
+        if text.startswith('/'):
+            return ' '
+        strings.append(text)
+        return f'"{len(strings) - 1}"'
+
+    return _LEXEME.sub(replace, source), strings
+
+
+def _annotations(text, strings):
+    restore = lambda args: _STRING_REF.sub(lambda m: strings[int(m.group(1))], args)
+    return tuple(Annotation(name.rsplit('.', 1)[-1], restore(args[1:-1]) if args else '')
+                 for name, args in _ANNOTATION.findall(text))
+
+
+def _constants(declarations):
+    """Names of the comma-separated enum constants"""
+    return tuple(match.group(1) for match in map(_CONSTANT.match, declarations.split(',')) if match)
+
+
+def _members(body, strings, kind):
+    """Fields, methods and enum constants declared directly in a type body"""
+    while _INNER_BLOCK.search(body):
+        body = _INNER_BLOCK.sub(';', body)
+    constants = ()
+    if kind == 'enum':
+        head, _, body = body.partition(';')
+        constants = _constants(head)
+    members = []
+    for declaration in body.split(';'):
+        declaration = declaration.strip()
+        if not declaration:
+            continue
+        annotations = _annotations(declaration, strings)
+        rest = _MODIFIERS.sub('', _ANNOTATION.sub('', declaration).strip())
+        if '(' in rest:
+            match = _METHOD.match(rest)
+            if match:
+                members.append(Member('method', match.group(2), (match.group(1) or '').strip(), annotations))
+        elif rest and not rest.startswith(('class ', 'interface ', 'enum ', 'record ')):
+            match = _FIELD.match(rest)
+            if match:
+                members.append(Member('field', match.group(2), ' '.join(match.group(1).split()), annotations))
+    return tuple(members), constants
+
+
+def parse_source(path, source):
+    """Top-level type declared in a Java source, or None"""
+    masked, strings = _mask(source)
+    package = _PACKAGE.search(masked)
+    match = _TYPE.search(masked)
+    if match is None:
+        return None
+    prefix, kind, name, tail = match.groups()
+    depth, end = 1, match.end()
+    while depth and end < len(masked):
+        depth += {'{': 1, '}': -1}.get(masked[end], 0)
+        end += 1
+    extends = re.search(r'\bextends\s+([\w.<>, ]+?)(?:\s+implements\b|$)', tail.strip())
+    body = masked[match.end():end - 1]
+    members, constants = _members(body, strings, kind)
+    enums = tuple((nested.group(1), _constants(nested.group(2))) for nested in _NESTED_ENUM.finditer(body))
+    return JavaType(path, package.group(1) if package else '', kind, name,
+                    _annotations(prefix, strings),
+                    ' '.join(extends.group(1).split()) if extends else '',
+                    members, constants, enums)
+
+
+def _parse_file(args):
+    """(digest, parsed type) of a file, parsed only if its digest is not the known one"""
+    path, full, known = args
+    with open(full, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if digest == known:
+        return digest, _UNCHANGED
+    return digest, parse_source(path, data.decode('utf-8'))
+
+
+def _walk(root):
+    """(relative path, full path, stat) of every .java file under root"""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith('.java'):
+                    yield os.path.relpath(entry.path, root), entry.path, entry.stat()
+
+
+def scan(root=SOURCE_ROOT, cache_dir=CACHE_DIR, jobs=None):
+    """Parsed top-level types of every source file under root, sorted by path"""
+    cached = os.path.join(cache_dir, 'javascan', 'index.pickle') if cache_dir else None
+    index = {}
+    if cached and os.path.exists(cached):
+        with open(cached, 'rb') as f:
+            try:
+                stored = pickle.load(f)
+            except (pickle.UnpicklingError, AttributeError, EOFError, TypeError):
+                # Written by an older scanner whose tuples no longer load
+                stored = {}
+        if stored.get('version') == SCAN_VERSION and stored.get('root') == root:
+            index = stored['files']
+    files = {}
+    stale = []
+    for path, full, st in _walk(root):
+        stamp = (st.st_size, st.st_mtime_ns)
+        entry = index.get(path)
+        if entry is not None and entry[0] == stamp:
+            files[path] = entry
+        else:
+            stale.append((path, full, stamp))
+    jobs = jobs or os.cpu_count() or 1
+    work = [(path, full, index[path][1] if path in index else None) for path, full, _ in stale]
+    if jobs > 1 and len(work) >= PARALLEL_THRESHOLD:
+        with ProcessPoolExecutor(min(jobs, len(work))) as pool:
+            results = list(pool.map(_parse_file, work, chunksize=8))
+    else:
+        results = [_parse_file(args) for args in work]
+    for (path, _, stamp), (digest, parsed) in zip(stale, results):
+        if parsed == _UNCHANGED:
+            parsed = index[path][2]
+        files[path] = (stamp, digest, parsed)
+    if cached and (stale or len(files) != len(index)):
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        tmp = cached + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump({'version': SCAN_VERSION, 'root': root, 'files': files}, f,
+                        pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cached)
+    return [files[path][2] for path in sorted(files) if files[path][2] is not None]
+
+
+def annotation(item, name):
+    """First annotation called name on a type or member, or None"""
+    for found in item.annotations:
+        if found.name == name:
+            return found
+    return None
+
+
+def literal(args, key='value'):
+    """String value of an annotation argument (positional or key=...), or None"""
+    match = re.search(rf'(?:^|,)\s*(?:{key}\s*=\s*)?"((?:\\.|[^"\\])*)"', args)
+    if match is None and key == 'value':
+        return literal(args, 'path') if 'path' in args else None
+    return match.group(1) if match else None
+
+
+def _join(base, path):
+    return '/' + '/'.join(part.strip('/') for part in (base, path) if part.strip('/'))
+
+
+def endpoints(types):
+    """REST endpoints of every @RestController, in source order"""
+    found = []
+    for item in types:
+        if annotation(item, 'RestController') is None and annotation(item, 'Controller') is None:
+            continue
+        mapping = annotation(item, 'RequestMapping')
+        base = (literal(mapping.args) or '') if mapping else ''
+        for member in item.members:
+            if member.kind != 'method':
+                continue
+            for found_annotation in member.annotations:
+                method = HTTP_MAPPINGS.get(found_annotation.name)
+                if method is None and found_annotation.name == 'RequestMapping':
+                    verb = re.search(r'RequestMethod\.(\w+)', found_annotation.args)
+                    method = verb.group(1) if verb else 'ANY'
+                if method is not None:
+                    path = literal(found_annotation.args) or ''
+                    found.append(Endpoint(item.name, method, _join(base, path), member.name))
+    return found
+
+
+def _stereotype(item):
+    """Short note on what a type is, shown next to it in the package tree"""
+    document = annotation(item, 'Document')
+    if document is not None:
+        return f"@Document({literal(document.args, 'collection') or literal(document.args)})"
+    if annotation(item, 'RestController') is not None:
+        mapping = annotation(item, 'RequestMapping')
+        return f"@RestController {literal(mapping.args) if mapping else '/'}"
+    for name in ('Service', 'Configuration', 'Component', 'RestControllerAdvice', 'SpringBootApplication'):
+        if annotation(item, name) is not None:
+            return f'@{name}'
+    if item.kind == 'interface' and 'Repository' in item.extends:
+        return item.extends
+    if item.kind != 'class':
+        return item.kind
+    return ''
+
+
+def package_tree(types, root=SOURCE_ROOT):
+    """Lines of a box-drawing tree of the source packages with a note per type"""
+    if not types:
+        return []
+    base = os.path.commonpath([os.path.dirname(item.path) or '.' for item in types])
+    children = {}
+    for item in types:
+        parts = os.path.relpath(item.path, base).split(os.sep)
+        node = children
+        for part in parts[:-1]:
+            node = node.setdefault(part + '/', {})
+        node[parts[-1]] = item
+
+    lines = [os.path.relpath(os.path.join(root, base), REPO_DIR).replace(os.sep, '/') + '/']
+
+    def walk(node, indent):
+        # Files first, then sub-packages, each alphabetically
+        names = sorted(node, key=lambda name: (name.endswith('/'), name))
+        for i, name in enumerate(names):
+            last = i == len(names) - 1
+            value = node[name]
+            if isinstance(value, dict):
+                lines.append(f"{indent}{'└── ' if last else '├── '}{name}")
+                walk(value, indent + ('    ' if last else '│   '))
+            else:
+                note = _stereotype(value)
+                lines.append(f"{indent}{'└── ' if last else '├── '}{name}" + (f'  # {note}' if note else ''))
+
+    walk(children, '')
+    return lines
+
+
+ENDPOINT_HEADER = ('Контролер', 'Метод', 'Шлях', 'Обробник')
+ENDPOINT_WIDTHS = (3, 1, 3, 3)
+
+
+BSON_TYPES = {
+    'String': 'String',
+    'boolean': 'Boolean', 'Boolean': 'Boolean',
+    'int': 'Int32', 'Integer': 'Int32',
+    'long': 'Int64', 'Long': 'Int64',
+    'double': 'Double', 'Double': 'Double', 'float': 'Double', 'Float': 'Double',
+    'BigDecimal': 'Decimal128',
+    'LocalDate': 'Date', 'LocalDateTime': 'Date', 'Instant': 'Date', 'Date': 'Date',
+    'ObjectId': 'ObjectId',
+}
+# Reference fields whose prefix is not the referenced class name
+REFERENCE_ALIASES = {'owner': 'User', 'author': 'User'}
+
+ENTITY_HEADER = ('Поле', 'Тип Java', 'Тип BSON', 'Опис')
+ENTITY_WIDTHS = (3, 3, 2, 4)
+
+
+def _bson_type(java_type, enums):
+    base = java_type.split('<', 1)[0]
+    if base in enums:
+        return 'String'
+    if base in ('List', 'Set', 'Collection') or java_type.endswith('[]'):
+        return 'Array'
+    if base == 'Map':
+        return 'Object'
+    return BSON_TYPES.get(base, 'Object')
+
+
+def _collections(types):
+    """Collection name of every @Document class, by class name"""
+    collections = {}
+    for item in types:
+        document = annotation(item, 'Document')
+        if document is not None:
+            collections[item.name] = (literal(document.args, 'collection') or literal(document.args)
+                                      or item.name[0].lower() + item.name[1:])
+    return collections
+
+
+def _reference(member, collections):
+    """Collection a String ...Id field refers to by naming convention, or None"""
+    if not member.name.endswith('Id') or member.type != 'String' or annotation(member, 'Id') is not None:
+        return None
+    prefix = member.name[:-2]
+    return collections.get(REFERENCE_ALIASES.get(prefix, prefix[:1].upper() + prefix[1:]))
+
+
+def _fields(item):
+    return [member for member in item.members
+            if member.kind == 'field' and 'static' not in member.type.split()]
+
+
+def entities(types):
+    """(entity, collection, rows) for every @Document class, rows as ENTITY_HEADER"""
+    enums = {item.name: item.constants for item in types if item.kind == 'enum'}
+    collections = _collections(types)
+    found = []
+    for item in types:
+        if item.name not in collections:
+            continue
+        known = dict(enums, **dict(item.enums))
+        rows = []
+        for member in _fields(item):
+            notes = []
+            reference = _reference(member, collections)
+            if annotation(member, 'Id') is not None:
+                notes.append('Ідентифікатор документа (_id)')
+            elif reference is not None:
+                notes.append(f'Посилання на колекцію «{reference}»')
+            base = member.type.split('<', 1)[0]
+            if base in known:
+                notes.append('Перелік: ' + ', '.join(known[base]))
+            indexed = annotation(member, 'Indexed')
+            if indexed is not None:
+                notes.append('Унікальний індекс' if re.search(r'unique\s*=\s*true', indexed.args) else 'Індекс')
+            bson = 'ObjectId' if annotation(member, 'Id') is not None else _bson_type(member.type, known)
+            rows.append((member.name, member.type, bson, '; '.join(notes) or '—'))
+        found.append((item.name, collections[item.name], tuple(rows)))
+    return found
+
+
+def schemas(types):
+    """Fields of every collection as Field tuples, by collection name
+
+    A field's constants are those of its enum type, empty for other types;
+    its reference is the collection a ...Id field points to, or ''.
+    """
+    enums = {item.name: item.constants for item in types if item.kind == 'enum'}
+    collections = _collections(types)
+    found = {}
+    for item in types:
+        if item.name in collections:
+            known = dict(enums, **dict(item.enums))
+            found[collections[item.name]] = tuple(
+                Field(member.name,
+                      'ObjectId' if annotation(member, 'Id') is not None else _bson_type(member.type, known),
+                      _reference(member, collections) or '',
+                      tuple(known.get(member.type.split('<', 1)[0], ())))
+                for member in _fields(item))
+    return found
+
+
+def er_model(types):
+    """ER diagram definition: every collection with its (field, BSON type, referenced collection)"""
+    return tuple((collection, tuple(field[:3] for field in fields))
+                 for collection, fields in schemas(types).items())
+
+
+_WORD = re.compile(r'\w+')
+
+
+def package_dependencies(types):
+    """Package diagram definition: every package with its types and the packages they use
+
+    A type uses another when its name appears in a field type, a method's
+    return type or the extends clause. Packages are named relative to the
+    common root package, which keeps its own last segment.
+    """
+    if not types:
+        return ()
+    root = os.path.commonprefix([item.package.split('.') for item in types])
+
+    def short(package):
+        parts = package.split('.')
+        return '.'.join(parts[len(root):]) or parts[-1]
+
+    home = {item.name: short(item.package) for item in types}
+    members = {}
+    uses = {}
+    for item in types:
+        package = home[item.name]
+        members.setdefault(package, []).append(item.name)
+        used = uses.setdefault(package, set())
+        words = _WORD.findall(' '.join([item.extends] + [member.type for member in item.members]))
+        used.update(home[word] for word in words if word in home and home[word] != package)
+    return tuple((package, tuple(sorted(members[package])), tuple(sorted(uses[package])))
+                 for package in sorted(members))
+
+
+def _table_ops(templates, header, rows, widths, **fields):
+    """Introductory paragraphs and the table of one ::: java block"""
+    *intro, caption = [template.format(**fields) for template in templates] or [None]
+    return [('paragraph', text) for text in intro] + [('table', caption, header, rows, widths)]
+
+
+# ::: java directive -> (diagram kind, definition of the scanned types)
+DIAGRAMS = {'er': ('er', er_model), 'packages': ('packages', package_dependencies)}
+
+
+def _source_ops(types, root, templates, name, highlight=None):
+    """Introductory paragraphs and the listing of the file declaring type name"""
+    found = [item for item in types if item.name == name]
+    if len(found) != 1:
+        raise SpecError(f'java source: {len(found) or "no"} types named {name!r} under {root}')
+    with open(os.path.join(root, found[0].path), encoding='utf-8') as f:
+        text = listing_text(f.read())
+    *intro, caption = templates or (None,)
+    return [('paragraph', line) for line in intro] + [('code', caption, 'java' if highlight else None, text)]
+
+
+def resolve_sources(ops, root=SOURCE_ROOT, cache_dir=CACHE_DIR):
+    """Expand ('java', what, templates, options) operations from the scanned backend sources"""
+    if not any(op[0] == 'java' for op in ops):
+        return ops
+    types = scan(root, cache_dir)
+    resolved = []
+    for op in ops:
+        if op[0] != 'java':
+            resolved.append(op)
+        elif op[1] == 'tree':
+            *intro, caption = op[2] or (None,)
+            resolved.extend(('paragraph', text) for text in intro)
+            resolved.append(('code', caption, None, '\n'.join(package_tree(types, root))))
+        elif op[1] == 'endpoints':
+            rows = tuple((e.controller, e.method, e.path, e.handler) for e in endpoints(types))
+            resolved.extend(_table_ops(op[2], ENDPOINT_HEADER, rows, ENDPOINT_WIDTHS))
+        elif op[1] == 'entities':
+            for n, (entity, collection, rows) in enumerate(entities(types), 1):
+                resolved.extend(_table_ops(op[2], ENTITY_HEADER, rows, ENTITY_WIDTHS,
+                                           n=n, collection=collection, entity=entity))
+        elif op[1] in DIAGRAMS:
+            *intro, caption = op[2] or (None,)
+            resolved.extend(('paragraph', text) for text in intro)
+            resolved.append(('diagram', DIAGRAMS[op[1]][0], caption, DIAGRAMS[op[1]][1](types)))
+        elif op[1] == 'source':
+            resolved.extend(_source_ops(types, root, op[2], *op[3]))
+    return resolved
@@ -0,0 +1,312 @@
+"""Offline pagination estimate for compiled specs.
+
+Lays the compiled operations out line by line with Times New Roman advance
+widths, so page numbers are known before the document is rendered and
+without reading it back. Paragraph metrics (size, bold, indents, spacing,
+line spacing) are resolved from the style registry applied to the default
+template, and the page geometry comes from the template's section.
+
+Justified text breaks into the same lines as left-aligned text, so
+alignment does not affect the estimate. Widow/orphan control and kerning
+are ignored; headings are kept with the next line.
+"""
+
+from functools import lru_cache
+
+from docx import Document
+from docx.enum.text import WD_LINE_SPACING
+from docx.oxml.ns import qn
+from docx.shared import Length, Pt
+
+from coursework.styles import (
+    BODY, CODE, CODE_FONT, FIGURE, FIGURE_CAPTION, FONT_NAME, KEYWORD, KEYWORDS, LIST_ITEM, TABLE_CAPTION,
+    TABLE_TEXT, TITLE_STRONG, TOC_LEVELS, apply_styles,
+)
+from coursework.tables import column_widths
+
+# Default left plus right cell margin of a table cell (2 x 0.08")
+CELL_PADDING = 2 * 0.08 * 72
+
+# Single line height of Times New Roman as a multiple of the font size
+# ((ascender + descender + line gap) / units per em)
+LINE_HEIGHT = 2355 / 2048
+
+DEFAULT_WIDTH = 500
+# Every character of the monospace code font advances 0.6 em
+MONOSPACE_WIDTH = 600
+
+
+def _table(*groups):
+    widths = {}
+    for chars, values in groups:
+        assert len(chars) == len(values), chars
+        widths.update(zip(chars, values))
+    return widths
+
+
+# Advance widths in 1/1000 em. Latin from the Times metrics, Cyrillic
+# approximated from Times New Roman; anything else counts as DEFAULT_WIDTH
+_WIDTHS = {
+    (FONT_NAME, False): _table(
+        (' !"#$%&\'()*+,-./', (250, 333, 408, 500, 500, 833, 778, 180, 333, 333, 500, 564, 250, 333, 250, 278)),
+        ('0123456789:;<=>?@', (500,) * 10 + (278, 278, 564, 564, 564, 444, 921)),
+        ('ABCDEFGHIJKLMNOPQRSTUVWXYZ', (722, 667, 667, 722, 611, 556, 722, 722, 333, 389, 722, 611, 889,
+                                        722, 722, 556, 722, 667, 556, 611, 722, 722, 944, 722, 722, 611)),
+        ('[\\]^_`', (333, 278, 333, 469, 500, 333)),
+        ('abcdefghijklmnopqrstuvwxyz', (444, 500, 444, 500, 444, 333, 500, 500, 278, 278, 500, 278, 778,
+                                        500, 500, 500, 500, 333, 389, 278, 500, 500, 722, 500, 500, 444)),
+        ('{|}~«»—–’‘“”№…', (480, 200, 480, 541, 500, 500, 1000, 500, 333, 333, 444, 444, 1000, 1000)),
+        ('АБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯЄІЇҐЁ', (722, 574, 667, 578, 682, 611, 896, 501, 722, 722, 667, 678,
+                                                 889, 722, 722, 722, 556, 667, 611, 700, 790, 722, 722, 643,
+                                                 1004, 1008, 713, 872, 574, 667, 1015, 660, 667, 333, 333, 578, 611)),
+        ('абвгдежзийклмнопрстуфхцчшщъыьэюяєіїґё', (444, 509, 472, 410, 509, 444, 691, 395, 535, 535, 486, 499,
+                                                 633, 535, 500, 535, 500, 444, 437, 500, 648, 500, 535, 503,
+                                                 770, 770, 517, 672, 456, 429, 747, 460, 429, 278, 278, 410, 444)),
+    ),
+    (FONT_NAME, True): _table(
+        (' !"#$%&\'()*+,-./', (250, 333, 555, 500, 500, 1000, 833, 278, 333, 333, 500, 570, 250, 333, 250, 278)),
+        ('0123456789:;<=>?@', (500,) * 10 + (333, 333, 570, 570, 570, 500, 930)),
+        ('ABCDEFGHIJKLMNOPQRSTUVWXYZ', (722, 667, 722, 722, 667, 611, 778, 778, 389, 500, 778, 667, 944,
+                                        722, 778, 611, 778, 722, 556, 667, 722, 722, 1000, 722, 722, 667)),
+        ('[\\]^_`', (333, 278, 333, 581, 500, 333)),
+        ('abcdefghijklmnopqrstuvwxyz', (500, 556, 444, 556, 444, 333, 500, 556, 278, 333, 556, 278, 833,
+                                        556, 500, 556, 556, 444, 389, 333, 556, 500, 722, 500, 500, 444)),
+        ('{|}~«»—–’‘“”№…', (394, 220, 394, 520, 500, 500, 1000, 500, 333, 333, 500, 500, 1000, 1000)),
+        ('АБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯЄІЇҐЁ', (722, 667, 667, 611, 715, 667, 1000, 556, 778, 778, 778, 722,
+                                                 944, 778, 778, 778, 611, 722, 667, 722, 860, 722, 778, 722,
+                                                 1080, 1090, 775, 970, 667, 722, 1120, 722, 722, 389, 389, 611, 667)),
+        ('абвгдежзийклмнопрстуфхцчшщъыьэюяєіїґё', (500, 500, 537, 439, 557, 444, 862, 453, 556, 556, 556, 537,
+                                                 700, 556, 500, 556, 556, 444, 500, 500, 700, 500, 556, 556,
+                                                 830, 830, 620, 770, 537, 444, 780, 540, 444, 278, 278, 439, 444)),
+    ),
+}
+
+
+@lru_cache(maxsize=None)
+def _metrics(font, size, bold):
+    """Per-character advance widths in points for one (font, size, bold)"""
+    if font == CODE_FONT:
+        return {}, MONOSPACE_WIDTH * size / 1000
+    table = _WIDTHS.get((font, bold), _WIDTHS[(FONT_NAME, bold)])
+    return {char: width * size / 1000 for char, width in table.items()}, DEFAULT_WIDTH * size / 1000
+
+
+@lru_cache(maxsize=1 << 16)
+def word_width(word, font=FONT_NAME, size=14, bold=False):
+    """Width of a word in points"""
+    widths, default = _metrics(font, size, bold)
+    return sum(widths.get(char, default) for char in word)
+
+
+@lru_cache(maxsize=None)
+def _template():
+    return apply_styles(Document())
+
+
+def _twips(value):
+    return Pt(value / 20)
+
+
+@lru_cache(maxsize=None)
+def page_geometry():
+    """(text width, text height) in points of the template's first section"""
+    section = _template().sections[0]
+    width = section.page_width - section.left_margin - section.right_margin
+    height = section.page_height - section.top_margin - section.bottom_margin
+    return Length(width).pt, Length(height).pt
+
+
+def _defaults():
+    """Paragraph spacing from the styles part's docDefaults"""
+    spacing = _template().styles.element.find(qn('w:docDefaults') + '/' + qn('w:pPrDefault')
+                                              + '/' + qn('w:pPr') + '/' + qn('w:spacing'))
+    if spacing is None:
+        return 0.0, 0.0, 1.0
+    before = _twips(int(spacing.get(qn('w:before'), 0))).pt
+    after = _twips(int(spacing.get(qn('w:after'), 0))).pt
+    line = int(spacing.get(qn('w:line'), 240)) / 240
+    return before, after, line
+
+
+def _inherited(style, get):
+    while style is not None:
+        value = get(style)
+        if value is not None:
+            return value
+        style = style.base_style
+    return None
+
+
+@lru_cache(maxsize=None)
+def paragraph_metrics(style_name):
+    """Resolved (size, bold, first line, left indent, before, after, line height) in points"""
+    style = _template().styles[style_name]
+    size = _inherited(style, lambda s: s.font.size)
+    bold = bool(_inherited(style, lambda s: s.font.bold))
+    size = size.pt if size is not None else 11.0
+    first_line = _inherited(style, lambda s: s.paragraph_format.first_line_indent)
+    left = _inherited(style, lambda s: s.paragraph_format.left_indent)
+    before, after, line = _defaults()
+    space_before = _inherited(style, lambda s: s.paragraph_format.space_before)
+    space_after = _inherited(style, lambda s: s.paragraph_format.space_after)
+    rule = _inherited(style, lambda s: s.paragraph_format.line_spacing_rule)
+    spacing = _inherited(style, lambda s: s.paragraph_format.line_spacing)
+    if rule in (WD_LINE_SPACING.EXACTLY, WD_LINE_SPACING.AT_LEAST):
+        line_height = spacing.pt
+    else:
+        line_height = size * LINE_HEIGHT * (spacing if spacing is not None else line)
+    return (size, bold,
+            first_line.pt if first_line is not None else 0.0,
+            left.pt if left is not None else 0.0,
+            space_before.pt if space_before is not None else before,
+            space_after.pt if space_after is not None else after,
+            line_height)
+
+
+def count_lines(segments, width, first_line=0.0, left=0.0, font=FONT_NAME):
+    """Number of lines a paragraph of (text, size, bold) segments breaks into"""
+    lines = 1
+    available = width - left - first_line
+    x = 0.0
+    for text, size, bold in segments:
+        space = word_width(' ', font, size, bold)
+        for n, part in enumerate(text.split('\n')):
+            if n:
+                lines, available, x = lines + 1, width - left, 0.0
+            for word in part.split(' '):
+                w = word_width(word, font, size, bold)
+                if x and x + space + w > available:
+                    lines, available, x = lines + 1, width - left, w
+                else:
+                    x += (space if x else 0.0) + w
+    return lines
+
+
+def _segments(op, size, bold):
+    """Text segments (text, size, bold) and paragraph style of a text operation"""
+    kind = op[0]
+    if kind == 'heading':
+        return [(op[1], size, bold)]
+    if kind == 'keywords':
+        return [(op[1], size, True), (op[2], size, bold)]
+    if kind == 'bold':
+        return [(op[1], size, True)]
+    if kind == 'block':
+        if op[3] == TITLE_STRONG:
+            return [(op[2], 16.0, True)]
+        return [(op[2], size, bold or op[3] == KEYWORD)]
+    return [(op[1], size, bold)]
+
+
+def _style_of(op):
+    kind = op[0]
+    if kind == 'heading':
+        return f'Heading {op[2]}'
+    if kind == 'spacer':
+        return 'Normal'
+    if kind == 'keywords':
+        return KEYWORDS
+    if kind == 'list_item':
+        return LIST_ITEM
+    if kind == 'block':
+        return op[1]
+    return BODY
+
+
+def _blocks(op, width):
+    """Yield (before, line count, line height, after, keep with next) for each paragraph of op"""
+    if op[0] == 'toc':
+        for title, level, page in op[1] or (('', 1, ''),):
+            size, bold, first, left, before, after, line = paragraph_metrics(TOC_LEVELS[level - 1])
+            # The page number sits behind the dot leader on the last line
+            lines = count_lines([(f'{title} {page}', size, bold)], width, first, left)
+            yield before, lines, line, after, False
+        return
+    if op[0] == 'table':
+        yield from _table_blocks(op, width)
+        return
+    if op[0] == 'figure':
+        yield from _figure_blocks(op, width)
+        return
+    if op[0] == 'code':
+        yield from _code_blocks(op, width)
+        return
+    size, bold, first, left, before, after, line = paragraph_metrics(_style_of(op))
+    if op[0] == 'spacer':
+        yield before, 1, line, after, False
+        return
+    lines = count_lines(_segments(op, size, bold), width, first, left)
+    yield before, lines, line, after, op[0] == 'heading'
+
+
+def _table_blocks(op, width):
+    """Caption and one block per table row; a row is as tall as its fullest cell"""
+    _, caption, header, rows, weights = op
+    if caption:
+        size, bold, first, left, before, after, line = paragraph_metrics(TABLE_CAPTION)
+        yield before, count_lines([(caption, size, bold)], width, first, left), line, after, True
+    size, bold, first, left, before, after, line = paragraph_metrics(TABLE_TEXT)
+    columns = [twips / 20 - CELL_PADDING for twips in column_widths(weights)]
+    for row, row_bold in ([(header, True)] if header else []) + [(row, bold) for row in rows]:
+        lines = max(count_lines([(text, size, row_bold)], column, first, left)
+                    for text, column in zip(row, columns))
+        yield before, lines, line, after, False
+
+
+def _figure_blocks(op, width):
+    """The picture, one line as tall as the image, and its caption"""
+    _, _, _, image_height, caption = op
+    before, after = paragraph_metrics(FIGURE)[4:6]
+    yield before, 1, image_height, after, bool(caption)
+    if caption:
+        size, bold, first, left, before, after, line = paragraph_metrics(FIGURE_CAPTION)
+        yield before, count_lines([(caption, size, bold)], width, first, left), line, after, False
+
+
+def _code_blocks(op, width):
+    """Caption and the listing, one paragraph whose lines may wrap"""
+    _, caption, _, text = op
+    if caption:
+        size, bold, first, left, before, after, line = paragraph_metrics(TABLE_CAPTION)
+        yield before, count_lines([(caption, size, bold)], width, first, left), line, after, True
+    size, bold, first, left, before, after, line = paragraph_metrics(CODE)
+    yield before, count_lines([(text, size, bold)], width, first, left, CODE_FONT), line, after, False
+
+
+def paginate(ops):
+    """Return the estimated page each operation starts on and the total page count"""
+    width, height = page_geometry()
+    _, _, _, _, _, break_after, break_line = paragraph_metrics('Normal')
+    pages = []
+    page, y = 1, 0.0
+    for op in ops:
+        if op[0] == 'page_break':
+            pages.append(page)
+            # The paragraph mark after the break starts the next page
+            page, y = page + 1, break_line + break_after
+            continue
+        start = None
+        for before, lines, line, after, keep in _blocks(op, width):
+            if y:
+                y += before
+            if keep and y + (lines + 1) * line > height:
+                page, y = page + 1, 0.0
+            for _ in range(lines):
+                if y + line > height:
+                    page, y = page + 1, 0.0
+                if start is None:
+                    start = page
+                y += line
+            y += after
+        pages.append(start if start is not None else page)
+    return pages, page
+
+
+def heading_pages(ops, pages=None):
+    """(title, level, page) for every heading of the compiled operations
+
+    pages is the first result of paginate(ops) when it is already known.
+    """
+    if pages is None:
+        pages, _ = paginate(ops)
+    return [(op[1], op[2], page) for op, page in zip(ops, pages) if op[0] == 'heading']
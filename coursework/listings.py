@@ -0,0 +1,87 @@
+"""Code listings as single monospace paragraphs.
+
+A listing operation is ('code', caption, language, text). The caption
+becomes a paragraph kept with the listing, like a table's. The code itself
+is one CW Code paragraph: its lines are joined by w:br inside the runs and
+the text keeps its indentation (xml:space="preserve"), so a whole class
+costs a paragraph and a handful of runs instead of one formatted paragraph
+per line.
+
+With a language the text is split by a regex lexer and keywords, strings,
+comments, annotations and numbers get the CW Code * character styles; runs
+of plain text between them stay merged. Without one the listing is a single
+run. Tokenized listings are memoised, so a listing rendered again (another
+document of a batch, a rebuilt section) is not lexed twice.
+"""
+
+import re
+from functools import lru_cache
+
+from coursework.styles import (
+    CODE, CODE_ANNOTATION, CODE_COMMENT, CODE_KEYWORD, CODE_NUMBER, CODE_STRING, TABLE_CAPTION,
+)
+
+TAB_SIZE = 4
+
+_JAVA_KEYWORDS = (
+    'abstract assert boolean break byte case catch char class const continue default do double else enum '
+    'extends final finally float for goto if implements import instanceof int interface long native new '
+    'package private protected public record return short static strictfp super switch synchronized this '
+    'throw throws transient try var void volatile while true false null'
+)
+
+# language -> (character style, pattern) in order of precedence
+LEXERS = {
+    'java': (
+        (CODE_COMMENT, r'//[^\n]*|/\*.*?\*/'),
+        (CODE_STRING, r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\''),
+        (CODE_ANNOTATION, r'@(?!interface\b)\w+(?:\.\w+)*'),
+        (CODE_KEYWORD, r'\b(?:' + '|'.join(_JAVA_KEYWORDS.split()) + r')\b'),
+        (CODE_NUMBER, r'\b(?:0[xX][\da-fA-F_]+|\d[\d_]*(?:\.\d+)?(?:[eE][+-]?\d+)?)[lLfFdD]?\b'),
+    ),
+}
+
+
+@lru_cache(maxsize=None)
+def _lexer(language):
+    """Combined pattern of a language and the style of each of its groups"""
+    rules = LEXERS[language]
+    pattern = '|'.join(f'({rule})' for _, rule in rules)
+    return re.compile(pattern, re.S), [style for style, _ in rules]
+
+
+@lru_cache(maxsize=256)
+def tokenize(text, language=None):
+    """(text, character style or None) spans of a listing, plain text between tokens merged"""
+    if language is None:
+        return ((text, None),)
+    pattern, styles = _lexer(language)
+    spans, start = [], 0
+    for match in pattern.finditer(text):
+        if match.start() > start:
+            spans.append((text[start:match.start()], None))
+        spans.append((match.group(0), styles[match.lastindex - 1]))
+        start = match.end()
+    if start < len(text):
+        spans.append((text[start:], None))
+    return tuple(spans)
+
+
+def listing_text(source):
+    """Text of a source file as a listing: tabs expanded, no trailing blank lines"""
+    lines = [line.rstrip() for line in source.expandtabs(TAB_SIZE).splitlines()]
+    while lines and not lines[-1]:
+        lines.pop()
+    while lines and not lines[0]:
+        lines.pop(0)
+    return '\n'.join(lines)
+
+
+def add_listing(doc, caption, language, text):
+    """Add an optional caption paragraph and the listing paragraph to a document"""
+    if caption:
+        doc.add_paragraph(caption, TABLE_CAPTION)
+    p = doc.add_paragraph(style=CODE)
+    for chunk, style in tokenize(text, language):
+        p.add_run(chunk, style)
+    return p
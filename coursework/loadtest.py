@@ -0,0 +1,1020 @@
+"""Load tests of the backend REST API and their results table for the report.
+
+Virtual users replay what the frontend does: sign up or log in, renew the
+access token, create, edit and delete goals, log progress and read its
+history, browse groups and their activity feed, check the achievements.
+Each user is one asyncio
+task; requests go over a pool of keep-alive HTTP/1.1 connections written
+against asyncio streams, so the standard library is enough and one process
+drives a few hundred users.
+
+Two workload models are supported. In the closed one every user runs
+scenarios back to back with an exponentially distributed think time
+between them. In the open one scenarios arrive at a fixed mean rate
+(Poisson arrivals) and are handed to idle users; an arrival that has to
+wait for a user is timed from its scheduled start, so a saturated server
+shows up in the latencies instead of silently slowing the arrivals down.
+
+Latencies are kept per operation (the endpoint template, e.g. "GET
+/goals/{id}") in HDR-style histograms: log-linear buckets in microseconds
+with three significant digits, so percentiles stay exact to 0.1% at any
+scale and histograms merge by adding counts. Results are saved as JSON with
+the histograms themselves, not just the summary, and the spec's
+::: loadtest block turns them into the table of section 5.3.
+
+StubApi is an in-memory imitation of the same endpoints with a random
+service time, so the whole test runs offline:
+
+    python -m coursework.loadtest --stub -u 100 -d 30 -o
+    python -m coursework.loadtest --url http://localhost:8080 --rate 50
+    python -m coursework.loadtest --smoke
+"""
+
+import asyncio
+import datetime
+import http
+import itertools
+import json
+import math
+import os
+import random
+import re
+import time
+import urllib.parse
+from collections import Counter, defaultdict, deque
+
+from coursework.spec import LOADTEST_RESULTS, SpecError
+
+# Saved results the ::: loadtest block reads
+RESULTS = LOADTEST_RESULTS
+
+DEFAULT_URL = 'http://localhost:8080'
+# NFR1.1 and NFR1.2 of the report
+P95_TARGET_MS = 500
+USERS = 100
+
+DURATION = 30.0
+THINK = 1.0
+RAMP = 5.0
+TIMEOUT = 10.0
+# Mean service time of the stub, in ms
+STUB_DELAY = 5.0
+# Access token lifetime of the stub, as app.jwt.expiration in application.yml
+TOKEN_TTL = 86400.0
+
+# A user keeps at most this many goals, deleting the oldest
+MAX_GOALS = 5
+# Every GROUP_EVERY-th user founds a group, the others join one
+GROUP_EVERY = 10
+FEED_PAGE = 20
+
+RESULTS_VERSION = 1
+
+RESULTS_HEADER = ('Операція', 'Запитів', 'Помилок', 'p50, мс', 'p95, мс', 'p99, мс', 'Макс., мс')
+RESULTS_WIDTHS = (5, 2, 2, 2, 2, 2, 2)
+TOTAL = 'Усього'
+# NFR verdict of a run against the stub
+NOT_ASSESSED = 'не оцінено'
+
+# Table rows in the order a user meets the operations
+OPERATIONS = (
+    'POST /auth/signup', 'POST /auth/login', 'POST /auth/refresh',
+    'GET /goals', 'POST /goals', 'GET /goals/{id}', 'PUT /goals/{id}', 'DELETE /goals/{id}',
+    'POST /progress', 'GET /progress/goal/{goalId}',
+    'GET /groups', 'POST /groups', 'POST /groups/{id}/join', 'GET /activities/group/{groupId}',
+    'GET /activities/me', 'GET /achievements', 'GET /achievements/me',
+)
+
+# Achievements the backend's DataSeeder creates: name, rule type, rule value
+ACHIEVEMENTS = (
+    ('First Steps', 'TOTAL_CHECKINS', 1),
+    ('Week Warrior', 'STREAK_DAYS', 7),
+    ('Dedicated', 'TOTAL_CHECKINS', 10),
+    ('Goal Master', 'GOAL_COMPLETED', 1),
+)
+
+
+class Histogram:
+    """Counts of values (microseconds) in log-linear buckets, three significant digits
+
+    Values below 2048 have a bucket each; above that every power of two is
+    split into 1024 buckets, so a bucket is never wider than 1/1024 of the
+    values in it.
+    """
+
+    SUB_BITS = 11
+    _SUB = 1 << SUB_BITS
+    _HALF = _SUB >> 1
+
+    def __init__(self):
+        self.counts = []
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    @classmethod
+    def index(cls, value):
+        if value < cls._SUB:
+            return value
+        shift = value.bit_length() - cls.SUB_BITS
+        return cls._SUB + (shift - 1) * cls._HALF + (value >> shift) - cls._HALF
+
+    @classmethod
+    def highest(cls, index):
+        """Largest value that falls into bucket index"""
+        if index < cls._SUB:
+            return index
+        shift, sub = divmod(index - cls._SUB, cls._HALF)
+        return ((sub + cls._HALF + 1) << (shift + 1)) - 1
+
+    def record(self, value, count=1):
+        value = max(0, int(value))
+        i = self.index(value)
+        if i >= len(self.counts):
+            self.counts.extend([0] * (i + 1 - len(self.counts)))
+        self.counts[i] += count
+        self.total += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.total += other.total
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, p):
+        """Value at or below which p percent of the recorded values lie"""
+        if not self.total:
+            return 0
+        rank = max(1, math.ceil(p / 100 * self.total))
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.highest(i), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.sum / self.total if self.total else 0
+
+    def to_json(self):
+        return {'total': self.total, 'sum': self.sum, 'min': self.min, 'max': self.max,
+                'buckets': [[i, count] for i, count in enumerate(self.counts) if count]}
+
+    @classmethod
+    def from_json(cls, data):
+        histogram = cls()
+        buckets = data['buckets']
+        if buckets:
+            histogram.counts = [0] * (buckets[-1][0] + 1)
+            for i, count in buckets:
+                histogram.counts[i] = count
+        histogram.total, histogram.sum = data['total'], data['sum']
+        histogram.min, histogram.max = data['min'], data['max']
+        return histogram
+
+
+class OperationStats:
+    """Latency histogram and error counts of one operation"""
+
+    def __init__(self):
+        self.histogram = Histogram()
+        self.errors = Counter()
+
+    def to_json(self):
+        return {'histogram': self.histogram.to_json(), 'errors': dict(sorted(self.errors.items()))}
+
+    @classmethod
+    def from_json(cls, data):
+        stats = cls()
+        stats.histogram = Histogram.from_json(data['histogram'])
+        stats.errors.update(data['errors'])
+        return stats
+
+
+async def _read_headers(reader):
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise asyncio.IncompleteReadError(b'', None)
+        if line in (b'\r\n', b'\n'):
+            return headers
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+
+async def _read_body(reader, headers):
+    if 'content-length' in headers:
+        return await reader.readexactly(int(headers['content-length']))
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if not size:
+                await _read_headers(reader)
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+    return await reader.read()
+
+
+class HttpPool:
+    """Keep-alive HTTP/1.1 connections to one server, at most size open at a time"""
+
+    def __init__(self, url, size):
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.hostname
+        self.ssl = parts.scheme == 'https'
+        self.port = parts.port or (443 if self.ssl else 80)
+        self.prefix = parts.path.rstrip('/')
+        self._authority = parts.netloc
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+        self.opened = 0
+
+    async def _open(self):
+        self.opened += 1
+        return await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None)
+
+    async def request(self, method, path, body=None, token=None):
+        """Status and decoded JSON payload (None when empty) of one request"""
+        head = [f'{method} {self.prefix}{path} HTTP/1.1', f'Host: {self._authority}', 'Accept: application/json']
+        if token:
+            head.append(f'Authorization: Bearer {token}')
+        data = b''
+        if body is not None:
+            data = json.dumps(body).encode('utf-8')
+            head += ['Content-Type: application/json', f'Content-Length: {len(data)}']
+        message = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + data
+        async with self._slots:
+            # A reused connection may have been closed by the server while idle: retry once on a new one
+            for attempt in range(2):
+                reused = bool(self._idle)
+                reader, writer = self._idle.pop() if reused else await self._open()
+                try:
+                    writer.write(message)
+                    await writer.drain()
+                    status_line = await reader.readline()
+                    if not status_line:
+                        raise asyncio.IncompleteReadError(b'', None)
+                    headers = await _read_headers(reader)
+                    payload = await _read_body(reader, headers)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused and not attempt:
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                if headers.get('connection', '').lower() == 'close':
+                    writer.close()
+                else:
+                    self._idle.append((reader, writer))
+                status = int(status_line.split()[1])
+                return status, json.loads(payload) if payload.strip() else None
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class VirtualUser:
+    """One simulated user: credentials, tokens and the goals and group it works with"""
+
+    def __init__(self, number, client, stats, rng, timeout=TIMEOUT):
+        self.number = number
+        self.client = client
+        self.stats = stats
+        self.rng = rng
+        self.timeout = timeout
+        self.email = f'loadtest-{number}@example.com'
+        self.password = f'loadtest-{number}'
+        self.access = self.refresh = None
+        self.goals = []
+        self.max_goals = MAX_GOALS
+        self.group = None
+        # Scheduled start of the next request when it had to wait for this user
+        self.scheduled = None
+
+    async def _timed(self, name, method, path, body, auth, expect):
+        start = self.scheduled if self.scheduled is not None else time.perf_counter()
+        self.scheduled = None
+        stats = self.stats[name]
+        try:
+            status, payload = await asyncio.wait_for(
+                self.client.request(method, path, body, self.access if auth else None), self.timeout)
+        except asyncio.TimeoutError:
+            stats.errors['timeout'] += 1
+            return None, None
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            stats.errors[type(e).__name__] += 1
+            return None, None
+        stats.histogram.record((time.perf_counter() - start) * 1e6)
+        if status >= 400 and status not in expect:
+            stats.errors[str(status)] += 1
+        return status, payload
+
+    async def call(self, name, method, path, body=None, auth=True, expect=()):
+        """Status and data of a request recorded under name, renewing an expired token once"""
+        status, payload = await self._timed(name, method, path, body, auth, expect)
+        if status == 401 and auth and await self.renew():
+            status, payload = await self._timed(name, method, path, body, auth, expect)
+        return status, (payload or {}).get('data') if isinstance(payload, dict) else None
+
+    def _tokens(self, data):
+        self.access, self.refresh = data['accessToken'], data['refreshToken']
+
+    async def login(self):
+        status, data = await self.call('POST /auth/login', 'POST', '/auth/login',
+                                       {'email': self.email, 'password': self.password}, auth=False)
+        if status == 200 and data:
+            self._tokens(data)
+        return status == 200
+
+    async def renew(self):
+        """Exchange the refresh token for new tokens, logging in again when that fails"""
+        if self.refresh:
+            status, data = await self.call('POST /auth/refresh', 'POST', '/auth/refresh',
+                                           {'refreshToken': self.refresh}, auth=False)
+            if status == 200 and data:
+                self._tokens(data)
+                return True
+        return await self.login()
+
+    async def setup(self):
+        """Sign up (or log in when the account is left from an earlier run), own a goal, join a group"""
+        status, data = await self.call('POST /auth/signup', 'POST', '/auth/signup',
+                                       {'email': self.email, 'password': self.password,
+                                        'displayName': f'Load test user {self.number}'},
+                                       auth=False, expect=(400,))
+        if status == 200 and data:
+            self._tokens(data)
+        elif not await self.login():
+            return False
+        _, goals = await self.call('GET /goals', 'GET', '/goals')
+        self.goals = [goal['id'] for goal in goals or ()]
+        if not self.goals:
+            await self._create_goal()
+        _, page = await self.call('GET /groups', 'GET', f'/groups?visibility=PUBLIC&size={FEED_PAGE}')
+        groups = [group['id'] for group in (page or {}).get('content', ())]
+        if groups and self.number % GROUP_EVERY:
+            self.group = self.rng.choice(groups)
+            # 403 when the account already joined it in an earlier run
+            await self.call('POST /groups/{id}/join', 'POST', f'/groups/{self.group}/join', expect=(403,))
+        else:
+            _, group = await self.call('POST /groups', 'POST', '/groups',
+                                       {'name': f'Load test group {self.number}',
+                                        'description': 'Created by coursework.loadtest', 'visibility': 'PUBLIC'})
+            self.group = group and group['id']
+        return True
+
+    async def _create_goal(self):
+        _, goal = await self.call('POST /goals', 'POST', '/goals', {
+            'title': self.rng.choice(('Ранкова зарядка', 'Читання 30 хвилин', 'Вивчення англійської', '8000 кроків')),
+            'description': 'Created by coursework.loadtest',
+            'frequency': self.rng.choice(('DAILY', 'WEEKLY')),
+            'isPublic': self.rng.random() < 0.3,
+        })
+        if goal:
+            self.goals.append(goal['id'])
+        return goal
+
+
+async def session(user):
+    """Opening the app: log in, then renew the access token"""
+    if await user.login():
+        await user.renew()
+
+
+async def goals(user):
+    """Goal CRUD: create, list, open and edit a goal, drop the oldest beyond user.max_goals"""
+    goal = await user._create_goal()
+    await user.call('GET /goals', 'GET', '/goals')
+    if goal:
+        await user.call('GET /goals/{id}', 'GET', f'/goals/{goal["id"]}')
+        await user.call('PUT /goals/{id}', 'PUT', f'/goals/{goal["id"]}',
+                        {'description': f'Edited by coursework.loadtest at {time.time():.0f}'})
+    while len(user.goals) > user.max_goals:
+        await user.call('DELETE /goals/{id}', 'DELETE', f'/goals/{user.goals.pop(0)}')
+
+
+async def progress(user):
+    """Check in on a goal and open its history"""
+    if not user.goals:
+        return
+    goal = user.rng.choice(user.goals)
+    await user.call('POST /progress', 'POST', '/progress',
+                    {'goalId': goal, 'value': user.rng.choice((0.5, 1.0, 1.0, 1.0)), 'note': 'Виконано'})
+    await user.call('GET /progress/goal/{goalId}', 'GET', f'/progress/goal/{goal}')
+
+
+async def feed(user):
+    """Browse the public groups, the feed of the user's group and the user's own activity"""
+    await user.call('GET /groups', 'GET', f'/groups?visibility=PUBLIC&size={FEED_PAGE}')
+    if user.group:
+        await user.call('GET /activities/group/{groupId}', 'GET',
+                        f'/activities/group/{user.group}?page=0&size={FEED_PAGE}')
+    await user.call('GET /activities/me', 'GET', f'/activities/me?page=0&size={FEED_PAGE}')
+
+
+async def achievements(user):
+    """Open the list of achievements and the ones the user has earned"""
+    await user.call('GET /achievements', 'GET', '/achievements')
+    await user.call('GET /achievements/me', 'GET', '/achievements/me')
+
+
+# name -> (weight, scenario)
+SCENARIOS = {
+    'session': (1, session),
+    'goals': (2, goals),
+    'progress': (5, progress),
+    'feed': (3, feed),
+    'achievements': (1, achievements),
+}
+
+
+async def run(url, users=USERS, duration=DURATION, rate=None, think=THINK, ramp=RAMP, scenarios=None,
+              seed=0, timeout=TIMEOUT):
+    """Load url for duration seconds and return the results as saved by save()
+
+    Users start evenly spread over ramp seconds. Without a rate each one
+    runs scenarios in a loop with think seconds (mean) between them; with a
+    rate, scenarios arrive at that many per second and wait for an idle user.
+    """
+    names = list(scenarios or SCENARIOS)
+    weights = [SCENARIOS[name][0] for name in names]
+    rng = random.Random(seed)
+    client = HttpPool(url, users)
+    stats = defaultdict(OperationStats)
+    population = [VirtualUser(n, client, stats, random.Random(rng.random()), timeout) for n in range(users)]
+    started = time.perf_counter()
+    deadline = started + ramp + duration
+    idle = asyncio.Queue()
+    done = Counter()
+
+    async def scenario(user):
+        name = user.rng.choices(names, weights)[0]
+        await SCENARIOS[name][1](user)
+        done[name] += 1
+
+    async def closed(user):
+        await asyncio.sleep(ramp * user.number / users)
+        if not await user.setup():
+            return
+        while time.perf_counter() < deadline:
+            await scenario(user)
+            await asyncio.sleep(min(user.rng.expovariate(1 / think) if think else 0,
+                                    max(0, deadline - time.perf_counter())))
+
+    async def ready(user):
+        await asyncio.sleep(ramp * user.number / users)
+        if await user.setup():
+            idle.put_nowait(user)
+
+    async def arrival(at):
+        user = await idle.get()
+        user.scheduled = at
+        try:
+            await scenario(user)
+        finally:
+            idle.put_nowait(user)
+
+    try:
+        if rate is None:
+            await asyncio.gather(*(closed(user) for user in population))
+        else:
+            await asyncio.gather(*(ready(user) for user in population))
+            at, tasks = started + ramp, []
+            while True:
+                at += rng.expovariate(rate)
+                if at >= deadline:
+                    break
+                await asyncio.sleep(max(0, at - time.perf_counter()))
+                tasks.append(asyncio.ensure_future(arrival(at)))
+            await asyncio.gather(*tasks)
+    finally:
+        client.close()
+    return {
+        'version': RESULTS_VERSION,
+        'target': url,
+        'users': users,
+        'rate': rate,
+        'think': None if rate is not None else think,
+        'duration': duration,
+        'ramp': ramp,
+        'seed': seed,
+        'elapsed': round(time.perf_counter() - started, 3),
+        'connections': client.opened,
+        'scenarios': dict(sorted(done.items())),
+        'operations': {name: stats[name].to_json() for name in _ordered(stats)},
+    }
+
+
+def _ordered(names):
+    return sorted(names, key=lambda name: (OPERATIONS.index(name) if name in OPERATIONS else len(OPERATIONS), name))
+
+
+async def smoke(url, timeout=TIMEOUT, report=print):
+    """Run every scenario once, reporting each request; True when every operation was reached and succeeded
+
+    Two users take part: the first founds a group, the second joins it.
+    Both keep a single goal, so the goals scenario deletes the older one.
+    """
+    stats = defaultdict(OperationStats)
+    client = HttpPool(url, 1)
+    users = [VirtualUser(number, client, stats, random.Random(number), timeout) for number in (0, 1)]
+    try:
+        for user in users:
+            user.max_goals = 1
+            await user.setup()
+            for name in SCENARIOS:
+                await SCENARIOS[name][1](user)
+    finally:
+        client.close()
+    for name in _ordered(set(stats) | set(OPERATIONS)):
+        histogram, errors = stats[name].histogram, stats[name].errors
+        if not histogram.total and not errors:
+            report(f'✗ {name}: not reached')
+            continue
+        mark = '✗' if errors else '✓'
+        detail = ', '.join(f'{reason} x{count}' for reason, count in errors.items()) or 'ok'
+        report(f'{mark} {name}: {detail}, {histogram.max / 1000:.1f} ms')
+    return all(stats[name].histogram.total for name in OPERATIONS) and not any(stats[name].errors for name in stats)
+
+
+class StubApi:
+    """In-memory imitation of the backend endpoints the scenarios use
+
+    Responses follow the backend's ApiResponse envelope and Spring's Page
+    layout; every request is held for a random service time with mean
+    delay milliseconds (exponentially distributed).
+    """
+
+    def __init__(self, delay=STUB_DELAY, token_ttl=TOKEN_TTL, seed=None):
+        self.delay = delay
+        self.token_ttl = token_ttl
+        self.rng = random.Random(seed)
+        self._ids = itertools.count(1)
+        self.users = {}
+        self.accounts = {}
+        self.access = {}
+        self.refresh = {}
+        self.goals = {}
+        self.progress = defaultdict(list)
+        self.achievements = [{'id': self._id(), 'name': name, 'ruleType': rule, 'ruleValue': value}
+                             for name, rule, value in ACHIEVEMENTS]
+        self.user_achievements = defaultdict(list)
+        self.groups = {}
+        self.members = defaultdict(set)
+        # Newest first, prepending stays O(1) however long a run is
+        self.activities = defaultdict(deque)
+        self.user_activities = defaultdict(deque)
+        self.routes = [
+            ('POST', '/auth/signup', self.signup, False),
+            ('POST', '/auth/login', self.login, False),
+            ('POST', '/auth/refresh', self.refresh_tokens, False),
+            ('GET', '/goals', self.list_goals, True),
+            ('POST', '/goals', self.create_goal, True),
+            ('GET', '/goals/{id}', self.get_goal, True),
+            ('PUT', '/goals/{id}', self.update_goal, True),
+            ('DELETE', '/goals/{id}', self.delete_goal, True),
+            ('POST', '/progress', self.log_progress, True),
+            ('GET', '/progress/goal/{id}', self.goal_progress, True),
+            ('GET', '/groups', self.list_groups, True),
+            ('POST', '/groups', self.create_group, True),
+            ('GET', '/groups/{id}', self.get_group, True),
+            ('POST', '/groups/{id}/join', self.join_group, True),
+            ('GET', '/activities/group/{id}', self.group_activities, True),
+            ('GET', '/activities/me', self.my_activities, True),
+            ('GET', '/achievements', self.list_achievements, True),
+            ('GET', '/achievements/me', self.my_achievements, True),
+        ]
+        self._patterns = [(method, re.compile('^' + re.sub(r'\\\{id\\\}', '([^/]+)', re.escape(path)) + '$'),
+                           handler, auth) for method, path, handler, auth in self.routes]
+
+    def _id(self):
+        return f'{next(self._ids):024x}'
+
+    def _tokens(self, user):
+        access, refresh = f'{self.rng.getrandbits(128):032x}', f'{self.rng.getrandbits(128):032x}'
+        self.access[access] = (user['id'], time.monotonic() + self.token_ttl)
+        self.refresh[refresh] = user['id']
+        return 200, {'accessToken': access, 'refreshToken': refresh,
+                     'user': {key: user[key] for key in ('id', 'email', 'displayName', 'role')}}, None
+
+    def _page(self, items, query):
+        page, size = int(query.get('page', 0)), int(query.get('size', FEED_PAGE))
+        content = list(itertools.islice(items, page * size, (page + 1) * size))
+        return 200, {'content': content, 'number': page, 'size': size,
+                     'totalElements': len(items), 'totalPages': -(-len(items) // size)}, None
+
+    def _activity(self, user_id, kind, refs):
+        activity = {'id': self._id(), 'userId': user_id, 'type': kind, 'refIds': refs, 'visibility': 'GROUP'}
+        self.user_activities[user_id].appendleft(activity)
+        for group, members in self.members.items():
+            if user_id in members:
+                self.activities[group].appendleft(dict(activity, groupId=group))
+
+    def _own_goal(self, user_id, goal_id):
+        goal = self.goals.get(goal_id)
+        if goal is None:
+            return None, (404, None, 'Goal not found')
+        if goal['userId'] != user_id:
+            return None, (403, None, 'Access denied')
+        return goal, None
+
+    def signup(self, _, body, query, *args):
+        if body.get('email') in self.accounts:
+            return 400, None, 'Email already exists'
+        user = {'id': self._id(), 'email': body.get('email'), 'password': body.get('password'),
+                'displayName': body.get('displayName'), 'role': 'USER'}
+        self.users[user['id']] = self.accounts[user['email']] = user
+        return self._tokens(user)
+
+    def login(self, _, body, query, *args):
+        user = self.accounts.get(body.get('email'))
+        if user is None:
+            return 401, None, 'User not found'
+        if user['password'] != body.get('password'):
+            return 401, None, 'Invalid password'
+        return self._tokens(user)
+
+    def refresh_tokens(self, _, body, query, *args):
+        user_id = self.refresh.pop(body.get('refreshToken'), None)
+        if user_id is None:
+            return 401, None, 'Invalid refresh token'
+        return self._tokens(self.users[user_id])
+
+    def list_goals(self, user_id, body, query, *args):
+        return 200, [goal for goal in self.goals.values() if goal['userId'] == user_id], None
+
+    def create_goal(self, user_id, body, query, *args):
+        goal = {'id': self._id(), 'userId': user_id, 'title': body.get('title'),
+                'description': body.get('description'), 'frequency': body.get('frequency'),
+                'isPublic': bool(body.get('isPublic')), 'status': 'ACTIVE'}
+        self.goals[goal['id']] = goal
+        self._activity(user_id, 'GOAL_CREATED', {'goalId': goal['id']})
+        return 200, goal, 'Goal created'
+
+    def get_goal(self, user_id, body, query, goal_id):
+        goal, error = self._own_goal(user_id, goal_id)
+        return error or (200, goal, None)
+
+    def update_goal(self, user_id, body, query, goal_id):
+        goal, error = self._own_goal(user_id, goal_id)
+        if error:
+            return error
+        goal.update((key, value) for key, value in body.items() if value is not None and key not in ('id', 'userId'))
+        return 200, goal, 'Goal updated'
+
+    def delete_goal(self, user_id, body, query, goal_id):
+        _, error = self._own_goal(user_id, goal_id)
+        if error:
+            return error
+        del self.goals[goal_id]
+        self.progress.pop(goal_id, None)
+        return 200, None, 'Goal deleted'
+
+    def log_progress(self, user_id, body, query, *args):
+        _, error = self._own_goal(user_id, body.get('goalId'))
+        if error:
+            return error
+        log = {'id': self._id(), 'goalId': body['goalId'], 'userId': user_id, 'value': body.get('value'),
+               'note': body.get('note'), 'date': datetime.date.today().isoformat()}
+        self.progress[body['goalId']].append(log)
+        self._activity(user_id, 'PROGRESS_LOGGED', {'goalId': body['goalId'], 'progressId': log['id']})
+        self._award(user_id, body['goalId'])
+        return 200, log, 'Progress logged'
+
+    def _award(self, user_id, goal_id):
+        """Award the achievements a new check-in earns, by the rules of the backend's AchievementService"""
+        earned = {award['achievementId'] for award in self.user_achievements[user_id]}
+        logs = self.progress[goal_id]
+        days = {log['date'] for log in logs}
+        today = datetime.date.today()
+        for achievement in self.achievements:
+            rule, value = achievement['ruleType'], achievement['ruleValue']
+            if achievement['id'] in earned:
+                continue
+            if (rule == 'TOTAL_CHECKINS' and len(logs) >= value
+                    or rule == 'STREAK_DAYS' and all((today - datetime.timedelta(days=i)).isoformat() in days
+                                                     for i in range(value))
+                    or rule == 'GOAL_COMPLETED'):
+                self.user_achievements[user_id].append({'id': self._id(), 'userId': user_id, 'goalId': goal_id,
+                                                        'achievementId': achievement['id'],
+                                                        'earnedAt': datetime.datetime.now().isoformat()})
+
+    def goal_progress(self, user_id, body, query, goal_id):
+        _, error = self._own_goal(user_id, goal_id)
+        return error or (200, self.progress[goal_id], None)
+
+    def list_groups(self, user_id, body, query, *args):
+        groups = [group for group in self.groups.values()
+                  if query.get('visibility') in (None, group['visibility'])]
+        return self._page(groups, query)
+
+    def create_group(self, user_id, body, query, *args):
+        if not body.get('name') or not body.get('visibility'):
+            return 400, None, 'Name and visibility are required'
+        group = {'id': self._id(), 'name': body['name'], 'description': body.get('description'),
+                 'visibility': body['visibility'], 'ownerId': user_id}
+        self.groups[group['id']] = group
+        self.members[group['id']].add(user_id)
+        return 200, group, 'Group created'
+
+    def get_group(self, user_id, body, query, group_id):
+        group = self.groups.get(group_id)
+        return (200, group, None) if group else (404, None, 'Group not found')
+
+    def join_group(self, user_id, body, query, group_id):
+        if group_id not in self.groups:
+            return 404, None, 'Group not found'
+        if user_id in self.members[group_id]:
+            return 403, None, 'Already a member or request pending'
+        self.members[group_id].add(user_id)
+        self._activity(user_id, 'GROUP_JOINED', {'groupId': group_id})
+        return 200, None, 'Joined group'
+
+    def group_activities(self, user_id, body, query, group_id):
+        return self._page(self.activities[group_id], query)
+
+    def my_activities(self, user_id, body, query, *args):
+        return self._page(self.user_activities[user_id], query)
+
+    def list_achievements(self, user_id, body, query, *args):
+        return 200, self.achievements, None
+
+    def my_achievements(self, user_id, body, query, *args):
+        return 200, self.user_achievements[user_id], None
+
+    async def handle(self, method, target, headers, body):
+        """Status and ApiResponse envelope of one request"""
+        path, _, query = target.partition('?')
+        query = dict(urllib.parse.parse_qsl(query))
+        if self.delay:
+            await asyncio.sleep(self.rng.expovariate(1000 / self.delay))
+        for route_method, pattern, handler, auth in self._patterns:
+            match = pattern.match(path)
+            if match and route_method == method:
+                break
+        else:
+            return 404, {'success': False, 'message': f'No endpoint {method} {path}', 'data': None}
+        user_id = None
+        if auth:
+            scheme, _, token = headers.get('authorization', '').partition(' ')
+            user_id, expires = self.access.get(token, (None, 0)) if scheme == 'Bearer' else (None, 0)
+            if user_id is None or expires < time.monotonic():
+                return 401, {'success': False, 'message': 'Unauthorized', 'data': None}
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            return 400, {'success': False, 'message': 'Malformed JSON', 'data': None}
+        status, data, message = handler(user_id, data, query, *match.groups())
+        return status, {'success': status < 400, 'message': message, 'data': data}
+
+    async def connection(self, reader, writer):
+        """Serve keep-alive requests on one connection until the client closes it"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, _ = line.decode('latin-1').split(' ', 2)
+                headers = await _read_headers(reader)
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                status, payload = await self.handle(method, target, headers, body)
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                writer.write(f'HTTP/1.1 {status} {http.HTTPStatus(status).phrase}\r\n'
+                             f'Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n'
+                             .encode('latin-1') + data)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host='127.0.0.1', port=0, delay=STUB_DELAY, token_ttl=TOKEN_TTL, seed=None):
+    """A started asyncio server running a fresh StubApi"""
+    api = StubApi(delay, token_ttl, seed)
+    return await asyncio.start_server(api.connection, host, port, backlog=1024)
+
+
+def _stub_process(pipe, delay, token_ttl, seed):
+    async def main():
+        server = await serve(delay=delay, token_ttl=token_ttl, seed=seed)
+        pipe.send(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def start_stub(delay=STUB_DELAY, token_ttl=TOKEN_TTL, seed=None):
+    """Run a stub server in a child process, so it does not share the load generator's event loop
+
+    Returns the process and the server's URL; terminate the process when done.
+    """
+    import multiprocessing
+
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_stub_process, args=(child, delay, token_ttl, seed), daemon=True)
+    process.start()
+    return process, f'http://127.0.0.1:{parent.recv()}'
+
+
+def save(results, path=RESULTS):
+    """Write results as returned by run() for resolve_results()"""
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        # One line per operation, the histograms' buckets are not worth reading
+        operations = results['operations']
+        head = json.dumps(dict(results, operations=None), ensure_ascii=False, indent=1)
+        body = ',\n'.join(f'  {json.dumps(name)}: {json.dumps(operations[name], separators=(",", ":"))}'
+                           for name in operations)
+        f.write(head.replace('"operations": null', '"operations": {\n' + body + '\n }') + '\n')
+    os.replace(tmp, path)
+
+
+def decode(results):
+    """Results as returned by run(), with OperationStats instead of their JSON form"""
+    return dict(results, operations={name: OperationStats.from_json(data)
+                                     for name, data in results['operations'].items()})
+
+
+def load(path=RESULTS):
+    """Saved results, decoded"""
+    with open(path, encoding='utf-8') as f:
+        results = json.load(f)
+    if results.get('version') != RESULTS_VERSION:
+        raise ValueError(f'{path}: unsupported load test results version {results.get("version")}')
+    return decode(results)
+
+
+def _ms(microseconds):
+    return f'{microseconds / 1000:.1f}'.replace('.', ',')
+
+
+def _row(name, stats):
+    h = stats.histogram
+    return (name, str(h.total), str(sum(stats.errors.values())),
+            _ms(h.percentile(50)), _ms(h.percentile(95)), _ms(h.percentile(99)), _ms(h.max))
+
+
+def summary(results):
+    """Table rows per operation and the total, plus the figures the report's text refers to"""
+    total = OperationStats()
+    rows = []
+    for name, stats in results['operations'].items():
+        total.histogram.merge(stats.histogram)
+        total.errors.update(stats.errors)
+        rows.append(_row(name, stats))
+    rows.append(_row(TOTAL, total))
+    h = total.histogram
+    errors = sum(total.errors.values())
+    p95 = h.percentile(95)
+    stub = results['target'].startswith('stub')
+    # Stub latencies measure the harness, not the backend, so they get no verdict
+    nfr1_1 = NOT_ASSESSED if stub else 'виконано' if p95 < P95_TARGET_MS * 1000 else 'не виконано'
+    nfr1_2 = NOT_ASSESSED if stub else 'виконано' if results['users'] >= USERS and not errors else 'не виконано'
+    if stub:
+        verdict = (f'95-й процентиль часу відповіді заглушки становить {_ms(p95)} мс. Ці значення характеризують '
+                   'лише генератор навантаження: заглушка не виконує обробку запитів у Spring Boot і MongoDB, '
+                   'тому висновок щодо вимог NFR1.1 і NFR1.2 робиться тільки за прогоном на розгорнутому backend.')
+    else:
+        verdict = (f'95-й процентиль часу відповіді становить {_ms(p95)} мс за вимоги до {P95_TARGET_MS} мс, '
+                   f'отже вимогу NFR1.1 {nfr1_1}. Вимогу NFR1.2 щодо {USERS} одночасних користувачів {nfr1_2}.')
+    fields = {
+        'users': results['users'],
+        'duration': f'{results["duration"]:g}',
+        'rate': f'{results["rate"]:g}'.replace('.', ',') if results['rate'] is not None else '',
+        'requests': h.total,
+        'errors': errors,
+        'rps': f'{h.total / results["elapsed"]:.0f}',
+        'p50': _ms(h.percentile(50)),
+        'p95': _ms(p95),
+        'p99': _ms(h.percentile(99)),
+        'max': _ms(h.max),
+        'target': 'локальній заглушці API' if stub else results['target'],
+        'nfr1_1': nfr1_1,
+        'nfr1_2': nfr1_2,
+        'verdict': verdict,
+    }
+    return tuple(rows), fields
+
+
+# Table rows and fields of the results files read so far, by path, with their (size, mtime)
+_summaries = {}
+
+
+def _summary(path):
+    """summary() of a results file, decoded again only when the file changes"""
+    st = os.stat(path)
+    stamp = (st.st_size, st.st_mtime_ns)
+    if _summaries.get(path, (None,))[0] != stamp:
+        _summaries[path] = stamp, summary(load(path))
+    return _summaries[path][1]
+
+
+def resolve_results(ops, path=RESULTS):
+    """Expand ('loadtest', templates) operations into paragraphs and the results table"""
+    if not any(op[0] == 'loadtest' for op in ops):
+        return ops
+    try:
+        rows, fields = _summary(path)
+    except FileNotFoundError:
+        raise SpecError(f'no load test results in {path}, run python -m coursework.loadtest -o') from None
+    resolved = []
+    for op in ops:
+        if op[0] != 'loadtest':
+            resolved.append(op)
+            continue
+        try:
+            *intro, caption = [template.format(**fields) for template in op[1]] or [None]
+        except KeyError as e:
+            raise SpecError(f'loadtest: unknown field {e}, expected one of {", ".join(fields)}') from None
+        resolved.extend(('paragraph', text) for text in intro)
+        resolved.append(('table', caption, RESULTS_HEADER, rows, RESULTS_WIDTHS))
+    return resolved
+
+
+def format_table(rows, header=RESULTS_HEADER):
+    """Rows as aligned plain text for the terminal"""
+    widths = [max(len(row[i]) for row in (header, *rows)) for i in range(len(header))]
+    lines = [header, *rows]
+    return '\n'.join('  '.join(cell.ljust(w) if i == 0 else cell.rjust(w) for i, (cell, w) in enumerate(zip(row, widths)))
+                     for row in lines)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Load test the backend API and save the results for section 5.3')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', default=DEFAULT_URL, help='backend base URL (default: %(default)s)')
+    target.add_argument('--stub', action='store_true', help='test a local stub of the API instead of the backend')
+    target.add_argument('--serve', metavar='PORT', type=int, help='only run the stub API on PORT')
+    parser.add_argument('--smoke', action='store_true', help='run every scenario once and report each request')
+    parser.add_argument('-u', '--users', type=int, default=USERS, help='virtual users (default: %(default)s)')
+    parser.add_argument('-d', '--duration', type=float, default=DURATION,
+                        help='seconds of load after the ramp-up (default: %(default)g)')
+    parser.add_argument('--rate', type=float, help='scenarios per second (open model); by default users loop')
+    parser.add_argument('--think', type=float, default=THINK,
+                        help='mean think time between a user\'s scenarios, in s (default: %(default)g)')
+    parser.add_argument('--ramp', type=float, default=RAMP, help='seconds over which users start (default: %(default)g)')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='run only these scenarios (repeatable)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the users\' choices (default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=TIMEOUT, help='request timeout in s (default: %(default)g)')
+    parser.add_argument('--stub-delay', type=float, default=STUB_DELAY,
+                        help='mean service time of the stub in ms (default: %(default)g)')
+    parser.add_argument('-o', '--output', metavar='FILE', nargs='?', const=RESULTS,
+                        help=f'save the results for the report (default: {os.path.relpath(RESULTS)})')
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        async def main():
+            server = await serve('0.0.0.0', args.serve, args.stub_delay)
+            print(f'Stub API on http://127.0.0.1:{server.sockets[0].getsockname()[1]}, Ctrl+C to stop')
+            await server.serve_forever()
+
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            pass
+        raise SystemExit
+
+    stub = None
+    url = args.url
+    if args.stub:
+        stub, url = start_stub(args.stub_delay, seed=args.seed)
+    try:
+        if args.smoke:
+            raise SystemExit(0 if asyncio.run(smoke(url, args.timeout)) else 1)
+        results = asyncio.run(run(url, args.users, args.duration, args.rate, args.think, args.ramp,
+                                  args.scenario, args.seed, args.timeout))
+    finally:
+        if stub is not None:
+            stub.terminate()
+    if args.stub:
+        results['target'] = f'stub (mean service time {args.stub_delay:g} ms)'
+    rows, fields = summary(decode(results))
+    print(format_table(rows))
+    print(f'{fields["requests"]} requests in {results["elapsed"]:.1f} s ({fields["rps"]}/s) over '
+          f'{results["connections"]} connections, p95 {fields["p95"]} ms: NFR1.1 {fields["nfr1_1"]}')
+    if args.output:
+        save(results, args.output)
+        print(f'Results saved: {args.output}')
@@ -0,0 +1,569 @@
+"""Size optimizer for generated .docx packages.
+
+Reports written with direct formatting (set_font() on every run, bare
+doc.add_paragraph() spacers between blocks) repeat the same w:rPr and w:pPr
+hundreds of times. optimize() rewrites word/document.xml and
+word/styles.xml in five passes:
+
+1. direct properties that the styles already give are dropped;
+2. empty spacer paragraphs between two paragraphs become space after the
+   first one, as tall as the spacer line plus its own spacing;
+3. adjacent runs with identical properties are merged;
+4. direct paragraph and run properties repeated at least min_repeat times
+   are hoisted into new styles based on the original ones;
+5. the package is recompressed at the requested zip level.
+
+Every pass works on the same formatting model: properties resolved from
+the document defaults, the paragraph style chain, the character style chain
+(toggle properties such as bold are XORed between the two, as Word does)
+and the direct properties. Before anything is written, verify() compares
+the text and the effective formatting of every paragraph and run in both
+packages, together with the vertical space between consecutive paragraphs
+(spacer lines are measured with the line height of coursework.layout). Any
+difference raises OptimizeError and the output is left untouched.
+"""
+
+import io
+import os
+import zipfile
+from collections import namedtuple
+
+from lxml import etree
+
+from coursework.layout import LINE_HEIGHT
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+DOCUMENT_PART = 'word/document.xml'
+STYLES_PART = 'word/styles.xml'
+
+# Properties repeated this many times are moved into a style
+MIN_REPEAT = 3
+
+Stats = namedtuple('Stats', 'package_bytes document_bytes styles_bytes elements paragraphs runs')
+
+_P, _R, _T, _TBL, _BODY = W + 'p', W + 'r', W + 't', W + 'tbl', W + 'body'
+_PPR, _RPR, _SECTPR = W + 'pPr', W + 'rPr', W + 'sectPr'
+
+# Run properties Word XORs between the paragraph and the character style
+_TOGGLES = {'b', 'bCs', 'i', 'iCs', 'caps', 'smallCaps', 'strike', 'dstrike',
+            'outline', 'shadow', 'emboss', 'imprint', 'vanish', 'webHidden'}
+# Properties whose attributes are inherited one by one
+_ATTRIBUTE_MERGED = {'rFonts', 'spacing', 'ind', 'lang'}
+# Children of pPr/rPr that are not formatting and always stay in place
+_STRUCTURAL = {'pStyle', 'rStyle', 'rPr', 'sectPr', 'pPrChange', 'rPrChange', 'numPr'}
+# Schema order of the pPr children
+_PPR_ORDER = ('pStyle', 'keepNext', 'keepLines', 'pageBreakBefore', 'framePr', 'widowControl', 'numPr',
+              'suppressLineNumbers', 'pBdr', 'shd', 'tabs', 'suppressAutoHyphens', 'kinsoku', 'wordWrap',
+              'overflowPunct', 'topLinePunct', 'autoSpaceDE', 'autoSpaceDN', 'bidi', 'adjustRightInd',
+              'snapToGrid', 'spacing', 'ind', 'contextualSpacing', 'mirrorIndents', 'suppressOverlap', 'jc',
+              'textDirection', 'textAlignment', 'textboxTightWrap', 'outlineLvl', 'divId', 'cnfStyle',
+              'rPr', 'sectPr', 'pPrChange')
+# Run content that merged runs may carry, with its text in the comparison
+_MERGEABLE = {W + 't', W + 'tab', W + 'br', W + 'cr', W + 'noBreakHyphen', W + 'softHyphen'}
+# Anything that makes an empty-looking paragraph more than a spacer
+_CONTENT = {W + tag for tag in ('t', 'tab', 'br', 'cr', 'sym', 'ptab', 'drawing', 'pict', 'object', 'fldChar',
+                                'instrText', 'fldSimple', 'bookmarkStart', 'commentRangeStart',
+                                'footnoteReference', 'endnoteReference', 'sectPr', 'numPr',
+                                'lastRenderedPageBreak')}
+_SPACING_UNSAFE = ('beforeLines', 'afterLines', 'beforeAutospacing', 'afterAutospacing')
+
+
+class OptimizeError(Exception):
+    """Raised when the optimized package would render differently"""
+
+
+def _local(el):
+    return etree.QName(el).localname
+
+
+def _canon(el):
+    """Context-independent value of a property element"""
+    name = _local(el)
+    if name in _TOGGLES:
+        return el.get(W + 'val') not in ('0', 'false', 'off')
+    if name in _ATTRIBUTE_MERGED:
+        return dict(el.attrib)
+    if len(el) == 0:
+        return tuple(sorted(el.attrib.items()))
+    return etree.tostring(el, method='c14n', exclusive=True, with_comments=False)
+
+
+def _props(pr):
+    """Formatting properties of a pPr or rPr element, keyed by local name"""
+    if pr is None:
+        return {}
+    return {_local(el): _canon(el) for el in pr if isinstance(el.tag, str) and _local(el) not in _STRUCTURAL}
+
+
+def _merge(base, props):
+    merged = dict(base)
+    for key, value in props.items():
+        merged[key] = {**merged.get(key, {}), **value} if key in _ATTRIBUTE_MERGED else value
+    return merged
+
+
+def _freeze(props):
+    return tuple(sorted((key, tuple(sorted(value.items())) if isinstance(value, dict) else value)
+                        for key, value in props.items()))
+
+
+def _style_ref(pr, tag):
+    ref = pr.find(tag) if pr is not None else None
+    return ref.get(W + 'val') if ref is not None else None
+
+
+class StyleModel:
+    """Styles part with paragraph and character chains resolved along basedOn"""
+
+    def __init__(self, root):
+        self.root = root
+        self._styles = {}
+        self._cache = {}
+        self.default_paragraph = None
+        defaults = root.find(W + 'docDefaults')
+        self.defaults_pPr = _props(defaults.find(f'{W}pPrDefault/{_PPR}')) if defaults is not None else {}
+        self.defaults_rPr = _props(defaults.find(f'{W}rPrDefault/{_RPR}')) if defaults is not None else {}
+        for style in root.iter(W + 'style'):
+            self.add(style)
+
+    def add(self, style):
+        style_id = style.get(W + 'styleId')
+        based = style.find(W + 'basedOn')
+        self._styles[style_id] = (based.get(W + 'val') if based is not None else None,
+                                  _props(style.find(_PPR)), _props(style.find(_RPR)))
+        if style.get(W + 'type') == 'paragraph' and style.get(W + 'default') in ('1', 'true'):
+            self.default_paragraph = style_id
+        self._cache.clear()
+
+    def remove(self, style):
+        self.root.remove(style)
+        del self._styles[style.get(W + 'styleId')]
+        self._cache.clear()
+
+    def __contains__(self, style_id):
+        return style_id in self._styles
+
+    def chain(self, style_id):
+        """(pPr, rPr) properties of a style merged along its basedOn chain"""
+        if style_id not in self._styles:
+            return {}, {}
+        if style_id not in self._cache:
+            based, pPr, rPr = self._styles[style_id]
+            self._cache[style_id] = ({}, {})  # guards against basedOn cycles
+            base_pPr, base_rPr = self.chain(based) if based else ({}, {})
+            self._cache[style_id] = _merge(base_pPr, pPr), _merge(base_rPr, rPr)
+        return self._cache[style_id]
+
+    def paragraph_style(self, pPr):
+        return _style_ref(pPr, W + 'pStyle') or self.default_paragraph
+
+    def paragraph(self, pPr, direct=True):
+        """Effective paragraph properties of a paragraph (without its own pPr when direct is False)"""
+        props = _merge(self.defaults_pPr, self.chain(self.paragraph_style(pPr))[0])
+        return _merge(props, _props(pPr)) if direct else props
+
+    def run(self, pPr, rPr, direct=True):
+        """Effective run properties of a run inside a paragraph"""
+        props = _merge(self.defaults_rPr, self.chain(self.paragraph_style(pPr))[1])
+        char_style = _style_ref(rPr, W + 'rStyle')
+        if char_style:
+            for key, value in self.chain(char_style)[1].items():
+                if key in _TOGGLES:
+                    props[key] = props.get(key, False) != value
+                else:
+                    props = _merge(props, {key: value})
+        if direct:
+            props = _merge(props, _props(rPr))
+        # A toggle that is off is the same as one never set
+        return {key: value for key, value in props.items() if value is not False}
+
+    def mark(self, pPr):
+        """Effective properties of the paragraph mark, which sizes an empty paragraph"""
+        return self.run(pPr, pPr.find(_RPR) if pPr is not None else None)
+
+
+def _child(parent, name, order):
+    """Child element by local name, inserted in schema order when missing"""
+    el = parent.find(W + name)
+    if el is not None:
+        return el
+    el = etree.Element(W + name)
+    rank = order.index(name)
+    for i, existing in enumerate(parent):
+        if isinstance(existing.tag, str) and _local(existing) in order and order.index(_local(existing)) > rank:
+            parent.insert(i, el)
+            return el
+    parent.append(el)
+    return el
+
+
+def _pPr(p):
+    pPr = p.find(_PPR)
+    if pPr is None:
+        pPr = etree.Element(_PPR)
+        p.insert(0, pPr)
+    return pPr
+
+
+def _remove_if_empty(el):
+    if el is not None and len(el) == 0 and not el.attrib:
+        el.getparent().remove(el)
+
+
+def _drop_redundant(styles, body):
+    """Remove direct properties equal to what the styles already give"""
+    dropped = 0
+    for p in body.iter(_P):
+        pPr = p.find(_PPR)
+        if pPr is not None:
+            inherited = styles.paragraph(pPr, direct=False)
+            effective = styles.paragraph(pPr)
+            for el in list(pPr):
+                key = _local(el) if isinstance(el.tag, str) else None
+                if key and key not in _STRUCTURAL and effective.get(key) == inherited.get(key):
+                    pPr.remove(el)
+                    dropped += 1
+        for r in p.iter(_R):
+            rPr = r.find(_RPR)
+            if rPr is None:
+                continue
+            inherited = styles.run(pPr, rPr, direct=False)
+            effective = styles.run(pPr, rPr)
+            for el in list(rPr):
+                key = _local(el) if isinstance(el.tag, str) else None
+                if key and key not in _STRUCTURAL and effective.get(key) == inherited.get(key):
+                    rPr.remove(el)
+                    dropped += 1
+            _remove_if_empty(rPr)
+        _remove_if_empty(pPr)
+    return dropped
+
+
+def _is_spacer(p):
+    return p.tag == _P and not any(el.tag in _CONTENT for el in p.iter())
+
+
+def _twips(value):
+    return int(value) if value is not None else 0
+
+
+def _spacer_height(styles, pPr):
+    """Vertical space an empty paragraph takes, in twips"""
+    spacing = styles.paragraph(pPr).get('spacing', {})
+    # Half-points; Word falls back to 10pt when no level sets a size
+    size = int(dict(styles.mark(pPr).get('sz', ())).get(W + 'val', 20)) / 2
+    line, rule = spacing.get(W + 'line'), spacing.get(W + 'lineRule', 'auto')
+    single = size * 20 * LINE_HEIGHT
+    if line is None:
+        height = single
+    elif rule == 'auto':
+        height = single * int(line) / 240
+    elif rule == 'exact':
+        height = int(line)
+    else:
+        height = max(int(line), single)
+    return _twips(spacing.get(W + 'before')) + round(height) + _twips(spacing.get(W + 'after'))
+
+
+def _breaks_page(p):
+    return any(el.tag == W + 'br' and el.get(W + 'type') == 'page' for el in p.iter(W + 'br')) or \
+        p.find(f'{_PPR}/{_SECTPR}') is not None
+
+
+def _fold_spacers(styles, body):
+    """Replace empty paragraphs after a paragraph by space after that paragraph"""
+    folded = 0
+    previous = None
+    for el in list(body):
+        if el.tag != _P:
+            previous = None
+            continue
+        if not _is_spacer(el) or previous is None:
+            previous = el
+            continue
+        own = styles.paragraph(el.find(_PPR))
+        before = styles.paragraph(previous.find(_PPR))
+        if _breaks_page(previous) or 'contextualSpacing' in own or 'contextualSpacing' in before or \
+                any(attr in own.get('spacing', {}) or attr in before.get('spacing', {})
+                    for attr in (W + name for name in _SPACING_UNSAFE)):
+            previous = el
+            continue
+        after = _twips(before.get('spacing', {}).get(W + 'after')) + _spacer_height(styles, el.find(_PPR))
+        pPr = _pPr(previous)
+        _child(pPr, 'spacing', _PPR_ORDER).set(W + 'after', str(after))
+        body.remove(el)
+        folded += 1
+    return folded
+
+
+def _mergeable(r):
+    return all(el.tag in _MERGEABLE for el in r if el.tag != _RPR)
+
+
+def _rpr_key(r):
+    rPr = r.find(_RPR)
+    return (tuple(sorted(r.attrib.items())),
+            etree.tostring(rPr, method='c14n', exclusive=True) if rPr is not None else b'')
+
+
+def _merge_runs(body):
+    """Merge adjacent runs with identical properties and plain content"""
+    merged = 0
+    for p in body.iter(_P):
+        previous = None
+        for r in list(p):
+            if r.tag != _R or not _mergeable(r):
+                previous = None
+                continue
+            if previous is not None and _rpr_key(previous) == _rpr_key(r):
+                for el in list(r):
+                    if el.tag != _RPR:
+                        previous.append(el)
+                p.remove(r)
+                merged += 1
+            else:
+                previous = r
+        for r in p.iter(_R):
+            last = None
+            for el in list(r):
+                if el.tag == _T and last is not None and last.tag == _T:
+                    last.text = (last.text or '') + (el.text or '')
+                    r.remove(el)
+                    text = last.text
+                    if text != text.strip() or '  ' in text:
+                        last.set(XML_SPACE, 'preserve')
+                else:
+                    last = el
+    return merged
+
+
+def _copy_into(parent, el):
+    """Copy el under parent, taking namespace prefixes from the new context"""
+    copy = etree.SubElement(parent, el.tag, dict(el.attrib))
+    copy.text = el.text
+    for child in el:
+        if isinstance(child.tag, str):
+            _copy_into(copy, child)
+    return copy
+
+
+def _new_style(root, styles, kind, based, pr_tag, elements):
+    """Append a custom style of kind holding copies of elements"""
+    prefix = 'Paragraph' if kind == 'paragraph' else 'Run'
+    n = 1
+    while f'CWAuto{prefix}{n}' in styles:
+        n += 1
+    style_id = f'CWAuto{prefix}{n}'
+    style = etree.SubElement(root, W + 'style')
+    style.set(W + 'type', kind)
+    style.set(W + 'customStyle', '1')
+    style.set(W + 'styleId', style_id)
+    etree.SubElement(style, W + 'name').set(W + 'val', f'CW Auto {prefix} {n}')
+    if based:
+        etree.SubElement(style, W + 'basedOn').set(W + 'val', based)
+    pr = etree.SubElement(style, pr_tag)
+    for el in elements:
+        _copy_into(pr, el)
+    styles.add(style)
+    return style
+
+
+def _hoist(styles, body, min_repeat):
+    """Move repeated direct properties into new paragraph and character styles"""
+    hoisted = 0
+    groups = {}
+    for p in body.iter(_P):
+        pPr = p.find(_PPR)
+        movable = [el for el in pPr if _local(el) not in _STRUCTURAL] if pPr is not None else []
+        if movable:
+            key = ('paragraph', styles.paragraph_style(pPr),
+                   b''.join(etree.tostring(el, method='c14n', exclusive=True) for el in movable))
+            groups.setdefault(key, []).append(p)
+    for r in body.iter(_R):
+        rPr = r.find(_RPR)
+        if rPr is None or any(_local(el) in _STRUCTURAL - {'rStyle'} for el in rPr):
+            continue
+        movable = [el for el in rPr if _local(el) != 'rStyle']
+        if movable:
+            key = ('character', _style_ref(rPr, W + 'rStyle'),
+                   b''.join(etree.tostring(el, method='c14n', exclusive=True) for el in movable))
+            groups.setdefault(key, []).append(r)
+    for (kind, based, _), members in groups.items():
+        if len(members) < min_repeat:
+            continue
+        if kind == 'paragraph':
+            before = [_paragraph_rendition(styles, p) for p in members]
+            pPr = members[0].find(_PPR)
+            style_id = _new_style(styles.root, styles, 'paragraph', based, _PPR,
+                                  [el for el in pPr if _local(el) not in _STRUCTURAL]).get(W + 'styleId')
+            for p in members:
+                pPr = p.find(_PPR)
+                for el in [el for el in pPr if _local(el) not in _STRUCTURAL]:
+                    pPr.remove(el)
+                _child(pPr, 'pStyle', _PPR_ORDER).set(W + 'val', style_id)
+            if [_paragraph_rendition(styles, p) for p in members] != before:
+                raise OptimizeError(f'hoisting paragraph properties into {style_id} changes formatting')
+        else:
+            pPrs = [r.getparent().find(_PPR) if r.getparent().tag == _P else None for r in members]
+            before = [styles.run(pPr, r.find(_RPR)) for pPr, r in zip(pPrs, members)]
+            rPr = members[0].find(_RPR)
+            style = _new_style(styles.root, styles, 'character', based, _RPR,
+                               [el for el in rPr if _local(el) != 'rStyle'])
+            candidate = style.get(W + 'styleId')
+            after = []
+            for pPr, r in zip(pPrs, members):
+                trial = etree.Element(_RPR)
+                etree.SubElement(trial, W + 'rStyle').set(W + 'val', candidate)
+                after.append(styles.run(pPr, trial))
+            if after != before:
+                # A toggle in the paragraph style would flip: keep these runs direct
+                styles.remove(style)
+                continue
+            for r in members:
+                rPr = r.find(_RPR)
+                for el in list(rPr):
+                    rPr.remove(el)
+                etree.SubElement(rPr, W + 'rStyle').set(W + 'val', candidate)
+        hoisted += len(members)
+    return hoisted
+
+
+def _run_text(r):
+    parts = []
+    for el in r.iter():
+        if el.tag == _T or el.tag == W + 'instrText':
+            parts.append(el.text or '')
+        elif el.tag in (W + 'tab', W + 'ptab'):
+            parts.append('\t')
+        elif el.tag in (W + 'br', W + 'cr'):
+            parts.append('\f' if el.get(W + 'type') == 'page' else '\n')
+        elif el.tag == W + 'fldChar':
+            parts.append(f"\x01{el.get(W + 'fldCharType')}")
+        elif el.tag in (W + 'drawing', W + 'pict', W + 'object', W + 'sym'):
+            # Pictures compare by their markup, so a changed image or size is seen
+            parts.append('\x02' + etree.tostring(el, method='c14n').decode('utf-8'))
+    return ''.join(parts)
+
+
+def _paragraph_rendition(styles, p):
+    """Effective paragraph properties (spacing aside) and runs as (text, formatting) spans"""
+    pPr = p.find(_PPR)
+    props = styles.paragraph(pPr)
+    spacing = props.pop('spacing', {})
+    props['line'] = (spacing.get(W + 'line'), spacing.get(W + 'lineRule'))
+    spans = []
+    for r in p.iter(_R):
+        text = _run_text(r)
+        if not text:
+            continue
+        formatting = _freeze(styles.run(pPr, r.find(_RPR)))
+        if spans and spans[-1][1] == formatting:
+            spans[-1] = (spans[-1][0] + text, formatting)
+        else:
+            spans.append((text, formatting))
+    return _freeze(props), tuple(spans)
+
+
+def rendition(document, styles):
+    """Paragraph renditions in document order with the vertical gap before body paragraphs"""
+    body = document.find(_BODY)
+    result = []
+    previous, gap = None, 0
+    for el in body:
+        if el.tag != _P:
+            for p in el.iter(_P):
+                result.append((_paragraph_rendition(styles, p), None))
+            previous, gap = None, 0
+            continue
+        if _is_spacer(el) and previous is not None:
+            gap += _spacer_height(styles, el.find(_PPR))
+            continue
+        spacing = styles.paragraph(el.find(_PPR)).get('spacing', {})
+        if previous is not None:
+            gap += _twips(previous.get(W + 'after')) + _twips(spacing.get(W + 'before'))
+        result.append((_paragraph_rendition(styles, el), gap if previous is not None else None))
+        previous, gap = spacing, 0
+    return result
+
+
+def verify(before, after):
+    """Differences between two (document, styles) roots, as readable strings"""
+    old, new = rendition(before[0], StyleModel(before[1])), rendition(after[0], StyleModel(after[1]))
+    problems = []
+    if len(old) != len(new):
+        problems.append(f'{len(old)} paragraphs before, {len(new)} after')
+    for n, (a, b) in enumerate(zip(old, new), 1):
+        if a[0][1] != b[0][1]:
+            problems.append(f'paragraph {n}: text or run formatting differs')
+        elif a[0][0] != b[0][0]:
+            problems.append(f'paragraph {n}: paragraph formatting differs')
+        elif a[1] != b[1]:
+            problems.append(f'paragraph {n}: space before is {b[1]} twips instead of {a[1]}')
+    return problems
+
+
+def stats(path):
+    """Sizes and element counts of a package"""
+    with zipfile.ZipFile(path) as package:
+        document = package.read(DOCUMENT_PART)
+        styles = package.getinfo(STYLES_PART).file_size
+    root = etree.fromstring(document)
+    return Stats(os.path.getsize(path), len(document), styles, sum(1 for _ in root.iter()),
+                 sum(1 for _ in root.iter(_P)), sum(1 for _ in root.iter(_R)))
+
+
+def optimize(source, output, level=9, min_repeat=MIN_REPEAT):
+    """Write an optimized copy of source to output and return the counts of each pass"""
+    with zipfile.ZipFile(source) as package:
+        parts = [(info.filename, package.read(info)) for info in package.infolist()]
+    data = dict(parts)
+    parser = etree.XMLParser(remove_blank_text=False)
+    original = etree.fromstring(data[DOCUMENT_PART], parser), etree.fromstring(data[STYLES_PART], parser)
+    document, styles_root = (etree.fromstring(data[DOCUMENT_PART], parser),
+                             etree.fromstring(data[STYLES_PART], parser))
+    styles = StyleModel(styles_root)
+    body = document.find(_BODY)
+    counts = {
+        'redundant properties': _drop_redundant(styles, body),
+        'spacers folded': _fold_spacers(styles, body),
+        'runs merged': _merge_runs(body),
+    }
+    counts['elements hoisted'] = _hoist(styles, body, min_repeat)
+    problems = verify(original, (document, styles_root))
+    if problems:
+        raise OptimizeError('; '.join(problems[:5]))
+    data[DOCUMENT_PART] = etree.tostring(document, xml_declaration=True, encoding='UTF-8', standalone=True)
+    data[STYLES_PART] = etree.tostring(styles_root, xml_declaration=True, encoding='UTF-8', standalone=True)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED, compresslevel=level) as dst:
+        for name, _ in parts:
+            dst.writestr(zipfile.ZipInfo(name), data[name], zipfile.ZIP_DEFLATED, level)
+    tmp = output + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(buf.getvalue())
+    os.replace(tmp, output)
+    return counts
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Shrink a generated .docx without changing how it renders')
+    parser.add_argument('path')
+    parser.add_argument('-o', '--output', help='optimized file (default: <name>.optimized.docx)')
+    parser.add_argument('-l', '--level', type=int, default=9, choices=range(10), metavar='0-9',
+                        help='zip compression level (default: %(default)s)')
+    parser.add_argument('--min-repeat', type=int, default=MIN_REPEAT,
+                        help='hoist properties repeated at least this often (default: %(default)s)')
+    args = parser.parse_args()
+    output = args.output or os.path.splitext(args.path)[0] + '.optimized.docx'
+    before = stats(args.path)
+    counts = optimize(args.path, output, args.level, args.min_repeat)
+    after = stats(output)
+    print(', '.join(f'{name}: {n}' for name, n in counts.items()))
+    print(f"{'':<16} {'before':>10} {'after':>10}")
+    for field in Stats._fields:
+        print(f"{field:<16} {getattr(before, field):>10} {getattr(after, field):>10}")
+    print(f"Optimized package written: {output} (text and formatting verified unchanged)")
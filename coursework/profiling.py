@@ -0,0 +1,147 @@
+"""Build instrumentation: timed spans, helper call statistics and traces.
+
+A Tracer is activated around a build (``with Tracer() as tracer:``). While
+it is active, span() records timed regions (compile, each section, save)
+and every helper decorated with @traced records its calls. The result can
+be exported as a Chrome trace (chrome://tracing, Perfetto) or printed as a
+summary table. When no tracer is active both cost a single global lookup.
+"""
+
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import pstats
+import time
+
+_active = None
+
+
+class Span:
+    """Arguments attached to a timed region, filled in while it runs"""
+
+    def __init__(self, args):
+        self.args = args
+
+    def update(self, **args):
+        self.args.update(args)
+
+
+class _NullSpan:
+    """Stand-in for Span while no tracer is active"""
+
+    def update(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Collects spans and helper calls of one build"""
+
+    def __init__(self):
+        self.events = []
+        self.helpers = {}
+        self._t0 = time.perf_counter()
+
+    def __enter__(self):
+        global _active
+        self._previous, _active = _active, self
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        _active = self._previous
+
+    @contextlib.contextmanager
+    def span(self, name, cat='build', **args):
+        span = Span(args)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            self.events.append((name, cat, start - self._t0, time.perf_counter() - start, span.args))
+
+    def record_helper(self, name, start, duration):
+        stats = self.helpers.setdefault(name, [0, 0.0])
+        stats[0] += 1
+        stats[1] += duration
+        self.events.append((name, 'helper', start - self._t0, duration, {}))
+
+    def chrome_trace(self):
+        """Trace Event Format dict with one complete event per span and helper call"""
+        pid = os.getpid()
+        return {
+            'displayTimeUnit': 'ms',
+            'traceEvents': [
+                {'name': name, 'cat': cat, 'ph': 'X', 'pid': pid, 'tid': 0,
+                 'ts': round(start * 1e6, 3), 'dur': round(duration * 1e6, 3), 'args': args}
+                for name, cat, start, duration, args in sorted(self.events, key=lambda e: e[2])
+            ],
+        }
+
+    def export_chrome(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+
+    def summary(self):
+        """Text table of sections (time, paragraphs, runs, bytes, estimated page) and helper totals"""
+        lines = [f"{'section':<48} {'ms':>8} {'paras':>6} {'runs':>6} {'bytes':>8} {'page':>5}  cache"]
+        for name, cat, _, duration, args in self.events:
+            if cat != 'section':
+                continue
+            lines.append(f"{name[:48]:<48} {duration * 1e3:>8.2f} {args.get('paragraphs', 0):>6} "
+                         f"{args.get('runs', 0):>6} {args.get('bytes', 0):>8} {args.get('page', ''):>5}  "
+                         f"{'hit' if args.get('cached') else 'miss'}")
+        lines.append('')
+        lines.append(f"{'stage':<48} {'ms':>8}")
+        for name, cat, _, duration, _ in self.events:
+            if cat == 'build':
+                lines.append(f"{name[:48]:<48} {duration * 1e3:>8.2f}")
+        if self.helpers:
+            lines.append('')
+            lines.append(f"{'helper':<48} {'calls':>8} {'ms':>8}")
+            for name, (calls, seconds) in sorted(self.helpers.items(), key=lambda h: -h[1][1]):
+                lines.append(f"{name:<48} {calls:>8} {seconds * 1e3:>8.2f}")
+        return '\n'.join(lines)
+
+
+def span(name, cat='build', **args):
+    """Timed region on the active tracer (a no-op context without one)"""
+    if _active is None:
+        return contextlib.nullcontext(_NULL_SPAN)
+    return _active.span(name, cat, **args)
+
+
+def traced(fn):
+    """Record calls of a document helper on the active tracer"""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        tracer = _active
+        if tracer is None:
+            return fn(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            tracer.record_helper(name, start, time.perf_counter() - start)
+    return wrapper
+
+
+@contextlib.contextmanager
+def cprofile(path=None, sort='cumulative', limit=25):
+    """Run the block under cProfile, dumping stats to path or printing the top entries"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
+        else:
+            pstats.Stats(profiler).sort_stats(sort).print_stats(limit)
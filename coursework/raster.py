@@ -0,0 +1,194 @@
+"""Pure-Python raster backend for the diagrams.
+
+Draws the same shape list coursework.diagrams turns into SVG onto an 8-bit
+grayscale canvas and encodes it as PNG with zlib. Word shows the SVG; the
+PNG is the fallback picture every .docx image needs, so it aims at legible
+rather than pretty: no anti-aliasing, lines stamped with a square pen.
+
+Text is drawn with a small built-in stroke font (Latin, Ukrainian Cyrillic,
+digits and common punctuation) on a grid four units wide and six units to
+the baseline, stretched to the width Times New Roman gives the same text so
+it sits where the SVG puts it. Unknown characters are drawn as boxes.
+"""
+
+import math
+import struct
+import zlib
+
+# Each glyph is a list of strokes; a stroke is a run of points, two digits
+# (x, y) per point, y growing downwards with the baseline at 6. A single
+# point is a dot.
+_GLYPHS = {
+    'A': '062046 1434', 'B': '06003041423303 3344453606', 'C': '4130100105163645',
+    'D': '06002041452606', 'E': '40000646 0333', 'F': '400006 0333',
+    'G': '41301001051636454323', 'H': '0006 4046 0343', 'I': '2026 1030 1636',
+    'J': '4045361605', 'K': '0006 4004 1346', 'L': '000646', 'M': '0600234046',
+    'N': '06004640', 'O': '103041453616050110', 'P': '06003041423303',
+    'Q': '103041453616050110 2446', 'R': '06003041423303 2346',
+    'S': '413010010213334445361605', 'T': '0040 2026', 'U': '000516364540',
+    'V': '002640', 'W': '0016223640', 'X': '0046 4006', 'Y': '002340 2326',
+    'Z': '00400646',
+    'a': '12223336 341405162635', 'b': '0006 0312223335261605', 'c': '3322120305162635',
+    'd': '3036 3322120305162635', 'e': '043433221203051626', 'f': '30201116 0222',
+    'g': '3237281807 3322120305162635', 'h': '0006 0312223336', 'i': '1216 10',
+    'j': '22271807 20', 'k': '0006 3205 1436', 'l': '101526', 'm': '0206 03122326 23324346',
+    'n': '0206 0312223336', 'o': '122233352616050312', 'p': '0208 0312223335261605',
+    'q': '3238 3322120305162635', 'r': '0206 042232', 's': '33221203142435261605',
+    't': '10152636 0232', 'u': '0205162635 3236', 'v': '022642', 'w': '0216233642',
+    'x': '0236 3206', 'y': '0226 421808', 'z': '02320636',
+    '0': '103041453616050110', '1': '112026 1636', '2': '01103041420646',
+    '3': '01103041423313 334445361605', '4': '36300444', '5': '4000023243453606',
+    '6': '30100105163645443303', '7': '004016', '8': '130201103041423313 1304051636454433',
+    '9': '43130201103041453616',
+    '.': '06', ',': '1607', ':': '02 06', ';': '02 1607', '-': '0424', '–': '0444',
+    '—': '0464', '(': '20111526', ')': '00111506', '[': '20101727', ']': '00101707',
+    '/': '0630', '\\': '0036', '_': '0747', "'": '0001', '’': '0001', '"': '0001 2021',
+    '“': '0001 2021', '”': '0001 2021', '«': '130415 332435', '»': '031405 233425',
+    '<': '320436', '>': '023406', '!': '0004 06', '?': '011030414224 26',
+    '#': '1016 3036 0242 0444', '%': '0640 01 45', '+': '2226 0444', '*': '2125 0224 0422',
+    '=': '0333 0535', '|': '0007', '{': '201114031526', '}': '001134131506',
+    'Б': '4000063645443303', 'Г': '400006', 'Ґ': '06014140', 'Д': '07064647 06104046',
+    'Є': '4130100105163645 0333', 'Ж': '3036 003306 603366', 'З': '01103041423313 334445361605',
+    'И': '00064046', 'Й': '01064146 1030', 'Ї': '2126 1636 10 30', 'Л': '0616204046',
+    'П': '06004046', 'У': '0024 401606', 'Ф': '2026 113142443515040211',
+    'Ц': '00064647 4046', 'Ч': '00021343 4046', 'Ш': '00064640 2026',
+    'Щ': '00064640 2026 4657', 'Ь': '00063645443303', 'Ю': '0006 0323 304051554636252130',
+    'Я': '46401001021343 2306',
+    'б': '3011030516263534231304', 'в': '020626352404 02223324', 'г': '320206',
+    'ґ': '31320206', 'д': '07064647 06124246', 'є': '3322120305162635 0323',
+    'ж': '3236 023406 623466', 'з': '031222332414 2435261605', 'и': '02063236',
+    'й': '02063236 1020', 'ї': '1216 00 20', 'к': '0206 3205 1436', 'л': '06123236',
+    'м': '0602254246', 'н': '0206 3236 0434', 'п': '06023236', 'т': '0242 2226',
+    'ф': '2028 123243453616050312', 'ц': '02063647 3236', 'ч': '02031434 3236',
+    'ш': '02064642 2226', 'щ': '02064642 2226 4657', 'ь': '020626352404',
+    'ю': '0206 0424 324253554636252332', 'я': '363212031434 1406',
+}
+# Cyrillic letters drawn like their Latin look-alikes
+_GLYPHS.update({cyr: _GLYPHS[lat] for cyr, lat in zip('АВЕКМНОРСТХІаеорсухі', 'ABEKMHOPCTXIaeopcyxi')})
+_BOX = '0006464000'
+_SPACE = 3
+# Cap height of Times New Roman as a fraction of the font size
+CAP_HEIGHT = 0.662
+
+
+def _parse(strokes):
+    return [[(int(stroke[i]), int(stroke[i + 1])) for i in range(0, len(stroke), 2)]
+            for stroke in strokes.split()]
+
+
+_STROKES = {char: _parse(strokes) for char, strokes in _GLYPHS.items()}
+_BOX_STROKES = _parse(_BOX)
+
+
+def _advance(strokes):
+    return max(x for stroke in strokes for x, _ in stroke) + 2
+
+
+def text_strokes(text):
+    """Polylines of text in font units and the total advance"""
+    lines, x = [], 0
+    for char in text:
+        if char == ' ':
+            x += _SPACE
+            continue
+        strokes = _STROKES.get(char, _BOX_STROKES)
+        lines.extend([(x + px, py) for px, py in stroke] for stroke in strokes)
+        x += _advance(strokes)
+    return lines, max(x - 2, 1)
+
+
+class Canvas:
+    """Grayscale image drawn in points, scale pixels per point"""
+
+    def __init__(self, width, height, scale):
+        self.scale = scale
+        self.width = max(1, math.ceil(width * scale))
+        self.height = max(1, math.ceil(height * scale))
+        self.pixels = bytearray(b'\xff' * (self.width * self.height))
+
+    def _span(self, y, x0, x1, value):
+        if 0 <= y < self.height:
+            x0, x1 = max(0, x0), min(self.width, x1)
+            if x0 < x1:
+                start = y * self.width
+                self.pixels[start + x0:start + x1] = bytes([value]) * (x1 - x0)
+
+    def fill_rect(self, x, y, w, h, value):
+        s = self.scale
+        x0, x1 = round(x * s), round((x + w) * s)
+        for row in range(round(y * s), round((y + h) * s)):
+            self._span(row, x0, x1, value)
+
+    def line(self, x0, y0, x1, y1, pen=1.0, dash=None):
+        """Line between two points with a square pen of pen points, optionally dashed"""
+        s = self.scale
+        half = max(1, round(pen * s)) // 2
+        size = max(1, round(pen * s))
+        ax, ay, bx, by = x0 * s, y0 * s, x1 * s, y1 * s
+        steps = max(1, math.ceil(max(abs(bx - ax), abs(by - ay))))
+        period = (dash[0] + dash[1]) * s if dash else 0
+        length = math.hypot(bx - ax, by - ay)
+        for i in range(steps + 1):
+            t = i / steps
+            if period and (t * length) % period >= dash[0] * s:
+                continue
+            px, py = round(ax + (bx - ax) * t) - half, round(ay + (by - ay) * t) - half
+            for row in range(py, py + size):
+                self._span(row, px, px + size, 0)
+
+    def polyline(self, points, pen=1.0, dash=None):
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            self.line(x0, y0, x1, y1, pen, dash)
+
+    def ellipse(self, cx, cy, rx, ry, pen=1.0, fill=None):
+        n = max(16, round(math.pi * (rx + ry) * self.scale / 3))
+        points = [(cx + rx * math.cos(2 * math.pi * i / n), cy + ry * math.sin(2 * math.pi * i / n))
+                  for i in range(n + 1)]
+        if fill is not None:
+            self.polygon(points[:-1], fill)
+        self.polyline(points, pen)
+
+    def polygon(self, points, value=0):
+        """Filled polygon (even-odd scanline fill)"""
+        s = self.scale
+        pts = [(x * s, y * s) for x, y in points]
+        top = max(0, math.floor(min(y for _, y in pts)))
+        bottom = min(self.height, math.ceil(max(y for _, y in pts)))
+        edges = list(zip(pts, pts[1:] + pts[:1]))
+        for row in range(top, bottom):
+            yc = row + 0.5
+            xs = sorted(x0 + (yc - y0) * (x1 - x0) / (y1 - y0)
+                        for (x0, y0), (x1, y1) in edges if (y0 <= yc) != (y1 <= yc))
+            for a, b in zip(xs[::2], xs[1::2]):
+                self._span(row, round(a), round(b), value)
+
+    def text(self, x, y, text, size, width, anchor='start', bold=False):
+        """Text on baseline y, stretched to width points (the layout's measure of it)"""
+        strokes, advance = text_strokes(text)
+        unit = size * CAP_HEIGHT / 6
+        stretch = min(1.4, max(0.6, width / (advance * unit))) if width else 1.0
+        ux = unit * stretch
+        left = x - {'start': 0, 'middle': advance * ux / 2, 'end': advance * ux}[anchor]
+        pen = size / (8 if bold else 12)
+        for stroke in strokes:
+            points = [(left + px * ux, y + (py - 6) * unit) for px, py in stroke]
+            if len(points) == 1:
+                px, py = points[0]
+                self.fill_rect(px - pen / 2, py - pen / 2, pen, pen, 0)
+            else:
+                self.polyline(points, pen)
+
+    def png(self):
+        """The canvas encoded as an 8-bit grayscale PNG, with its resolution recorded"""
+        w = self.width
+        raw = b''.join(b'\x00' + self.pixels[row * w:(row + 1) * w] for row in range(self.height))
+        dots_per_metre = round(self.scale * 72 / 0.0254)
+
+        def chunk(kind, data):
+            return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+        return (b'\x89PNG\r\n\x1a\n'
+                + chunk(b'IHDR', struct.pack('>IIBBBBB', w, self.height, 8, 0, 0, 0, 0))
+                + chunk(b'pHYs', struct.pack('>IIB', dots_per_metre, dots_per_metre, 1))
+                + chunk(b'IDAT', zlib.compress(raw, 9))
+                + chunk(b'IEND', b''))
@@ -0,0 +1,110 @@
+"""Single-pass renderer for compiled content specs."""
+
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+
+from coursework.listings import add_listing
+from coursework.tables import add_table
+from coursework.styles import (
+    FIGURE, FIGURE_CAPTION, TOC_LEVELS,
+    add_heading, add_paragraph, add_para, add_list_item, add_keywords,
+)
+
+
+def _heading(doc, text, level):
+    add_heading(doc, text, level)
+
+
+def _spacer(doc):
+    doc.add_paragraph()
+
+
+def _page_break(doc):
+    doc.add_page_break()
+
+
+def _paragraph(doc, text):
+    add_paragraph(doc, text)
+
+
+def _bold(doc, text):
+    add_para(doc, text, bold=True)
+
+
+def _keywords(doc, label, text):
+    add_keywords(doc, label, text)
+
+
+def _list_item(doc, text):
+    add_list_item(doc, text)
+
+
+def _block(doc, style, text, run_style):
+    doc.add_paragraph(style=style).add_run(text, run_style)
+
+
+def _table(doc, caption, header, rows, widths):
+    add_table(doc, caption, header, rows, widths)
+
+
+def _code(doc, caption, language, text):
+    add_listing(doc, caption, language, text)
+
+
+def _figure(doc, key, width, height, caption):
+    from coursework.diagrams import drawing
+
+    # The picture's parts are added to the package when it is saved
+    doc.add_paragraph(style=FIGURE).add_run()._r.append(drawing(key, width, height, caption))
+    if caption:
+        doc.add_paragraph(caption, style=FIGURE_CAPTION)
+
+
+TOC_FIELD = ' TOC \\o "1-3" \\h \\z \\u '
+
+
+def _field_char(paragraph, kind):
+    """Append a run holding a complex-field marker (begin, separate or end)"""
+    paragraph.add_run()._r.append(OxmlElement('w:fldChar', {qn('w:fldCharType'): kind}))
+
+
+def _toc(doc, entries):
+    # Entries are the cached result of a real TOC field, so Word can refresh
+    # the page numbers while other viewers show the estimated ones
+    entries = entries or (('', 1, ''),)
+    last = len(entries) - 1
+    for i, (title, level, page) in enumerate(entries):
+        p = doc.add_paragraph(style=TOC_LEVELS[level - 1])
+        if i == 0:
+            _field_char(p, 'begin')
+            instr = OxmlElement('w:instrText', {qn('xml:space'): 'preserve'})
+            instr.text = TOC_FIELD
+            p.add_run()._r.append(instr)
+            _field_char(p, 'separate')
+        if title:
+            p.add_run(f'{title}\t{page}')
+        if i == last:
+            _field_char(p, 'end')
+
+
+HANDLERS = {
+    'heading': _heading,
+    'spacer': _spacer,
+    'page_break': _page_break,
+    'paragraph': _paragraph,
+    'bold': _bold,
+    'keywords': _keywords,
+    'list_item': _list_item,
+    'block': _block,
+    'toc': _toc,
+    'table': _table,
+    'figure': _figure,
+    'code': _code,
+}
+
+
+def render(doc, ops):
+    """Execute compiled spec operations against a document"""
+    for op in ops:
+        HANDLERS[op[0]](doc, *op[1:])
+    return doc
@@ -0,0 +1,188 @@
+"""Long-lived build server on a local Unix socket.
+
+A cold build pays for the interpreter, for importing python-docx, lxml and
+the build modules, for parsing the default template and applying the style
+registry, and for reading every cached fragment and the load test results
+from disk. The server pays for that once: it stays up with the modules
+imported, the styled template (coursework.build.new_document), the scratch
+document, the section fragments and the results table in memory, and runs
+one build per request. `python -m coursework build` sends its arguments
+here whenever a server is listening and builds in its own process otherwise.
+
+The protocol is one JSON line each way. The client sends
+{"args": [...], "cwd": "...", "prog": "..."} with the arguments of
+generate_coursework.py and the server replies {"status": N, "output": "..."}
+with the exit status and everything the build printed. Requests are served
+one at a time, in the client's working directory; {"stop": true} shuts the
+server down.
+
+The build code is imported once, so a server would go on building with old
+code after an edit. A request that arrives after a .py file of the package
+or generate_coursework.py changed gets status None instead, and the server
+exits; the client then builds by itself.
+"""
+
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+import time
+import traceback
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# coursework.spec.CACHE_DIR; spec is not imported so that clients start quickly
+SOCKET = os.path.join(ROOT_DIR, '.cache', 'build.sock')
+# Seconds a client waits for its build
+TIMEOUT = 600
+
+
+class ServerError(Exception):
+    """Raised when a build server cannot be started"""
+
+
+def _send(conn, message):
+    conn.sendall(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+
+
+def _receive(conn):
+    with conn.makefile('rb') as f:
+        line = f.readline()
+    return json.loads(line) if line.strip() else None
+
+
+def _code_stamp():
+    """Modification times of the code a build runs"""
+    package = os.path.dirname(os.path.abspath(__file__))
+    paths = [os.path.join(ROOT_DIR, 'generate_coursework.py')]
+    paths += [os.path.join(package, name) for name in sorted(os.listdir(package)) if name.endswith('.py')]
+    return tuple((path, os.stat(path).st_mtime_ns) for path in paths)
+
+
+def _listen(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX)
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            # Left behind by a server that did not shut down
+            os.remove(path)
+        else:
+            raise ServerError(f'a build server is already listening on {path}')
+        finally:
+            probe.close()
+    sock = socket.socket(socket.AF_UNIX)
+    sock.bind(path)
+    sock.listen()
+    return sock
+
+
+def _warm_up():
+    """Import the build code and prepare what every build reuses, without building"""
+    import generate_coursework
+    from coursework import build, emit, validate  # noqa: F401 (imported by builds on demand)
+    from coursework.guidelines import guidelines
+
+    guidelines().page_limits()
+    build.new_document()
+    build._render_section([])
+    return generate_coursework.main
+
+
+def _run(main, request):
+    """(exit status, printed output) of one build"""
+    output = io.StringIO()
+    cwd, argv = os.getcwd(), sys.argv
+    try:
+        os.chdir(request.get('cwd') or cwd)
+        # Usage and error messages name the client's command
+        sys.argv = [request.get('prog') or argv[0], *request.get('args', [])]
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            status = main(request.get('args', []))
+    except SystemExit as e:
+        # argparse errors and --help
+        status = e.code if isinstance(e.code, int) else 0 if e.code is None else 1
+    except Exception:
+        traceback.print_exc(file=output)
+        status = 1
+    finally:
+        os.chdir(cwd)
+        sys.argv = argv
+    return status, output.getvalue()
+
+
+def serve(path=SOCKET, report=print):
+    """Serve build requests on a Unix socket until stopped or the build code changes"""
+    start = time.perf_counter()
+    main = _warm_up()
+    stamp = _code_stamp()
+    sock = _listen(path)
+    report(f'Build server ready in {time.perf_counter() - start:.2f} s on {path}')
+    try:
+        while True:
+            conn, _ = sock.accept()
+            with conn:
+                request = _receive(conn)
+                if request is None:
+                    continue
+                if request.get('stop'):
+                    _send(conn, {'status': 0, 'output': 'Build server stopped\n'})
+                    return
+                if _code_stamp() != stamp:
+                    _send(conn, {'status': None, 'output': 'Build code changed, build server stopped\n'})
+                    report('Build code changed, stopping')
+                    return
+                start = time.perf_counter()
+                status, output = _run(main, request)
+                with contextlib.suppress(OSError):
+                    _send(conn, {'status': status, 'output': output})
+                args = ' '.join(request.get('args', [])) or '(defaults)'
+                report(f'build {args}: status {status} in {(time.perf_counter() - start) * 1000:.0f} ms')
+    finally:
+        sock.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+
+def request(args=(), path=SOCKET, stop=False, timeout=TIMEOUT):
+    """(status, output) of a build run by the server listening on path
+
+    Raises OSError (FileNotFoundError, ConnectionRefusedError) when no
+    server is listening. status is None when the server stopped instead
+    because its code changed.
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        raise OSError('Unix sockets are not available')
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        _send(sock, {'stop': True} if stop else
+              {'args': list(args), 'cwd': os.getcwd(), 'prog': os.path.basename(sys.argv[0])})
+        reply = _receive(sock)
+    if reply is None:
+        raise ConnectionResetError('the build server closed the connection')
+    return reply['status'], reply['output']
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Keep a warm build server for fast regeneration of the report')
+    parser.add_argument('--socket', default=SOCKET, help='Unix socket to listen on (default: %(default)s)')
+    parser.add_argument('--stop', action='store_true', help='stop the server listening on the socket')
+    args = parser.parse_args()
+    if args.stop:
+        try:
+            _, output = request(path=args.socket, stop=True)
+        except OSError:
+            sys.exit(f'No build server on {args.socket}')
+        print(output, end='')
+        sys.exit(0)
+    try:
+        serve(args.socket, report=lambda line: print(line, flush=True))
+    except ServerError as e:
+        sys.exit(str(e))
+    except KeyboardInterrupt:
+        pass
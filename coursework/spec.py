@@ -0,0 +1,277 @@
+"""Content spec format and its compiler.
+
+The report text lives in Markdown-like files under content/. Every line is
+one paragraph, so the files map one-to-one onto the document:
+
+    # Heading            heading level 1 (## and ### for levels 2 and 3)
+    (empty line)         spacer paragraph
+    ---                  page break
+    plain text           justified body paragraph
+    **text**             bold body paragraph
+    **Label:** text      paragraph with a bold keyword label
+    + text               numbered list item (numbers restart after any other line)
+    \\text               body paragraph taken literally (escapes the markers above)
+    <!-- comment -->     ignored
+
+Any text may contain {{name}} placeholders. They stay in the compiled
+operations and are filled in by substitute(), so one compiled spec serves
+every set of variables (see coursework.batch). Code listings are the
+exception: their text is never substituted.
+
+Multi-line blocks are fenced with ::: lines:
+
+    ::: center [bold|strong]   one centred paragraph, lines joined by line breaks
+    ::: right [bold|strong]    the same, right-aligned
+    ::: toc                    table of contents built from the headings below it
+    ::: java tree              package tree of the backend sources
+    ::: java endpoints         table of the REST endpoints
+    ::: java entities          one table per @Document collection
+    ::: java er                diagram of the collections and their references
+    ::: java packages          diagram of the packages and their dependencies
+    ::: java source Name [highlight]
+                               listing of the source file declaring Name
+    ::: table [3,3,2,4]        a table: caption line (may be empty), header row,
+                               then one row per line, cells separated by |
+                               (a literal | escaped as \\|, a line break as
+                               \\n); the optional column weights set relative
+                               widths (equal by default)
+    ::: diagram usecase System use-case diagram of System: caption line, then
+                               one line per actor, "Actor: use case; use case"
+    ::: code [language]        code listing: caption line (may be empty), then
+                               the code, taken literally; a language (java)
+                               turns on syntax highlighting
+    ::: loadtest               table of the saved load test results
+
+The lines of a ::: java or ::: loadtest block are templates: the last one
+is the caption of each table, diagram or listing, any lines before it become
+paragraphs introducing it. For entities they may use {n} (1-based table
+number), {collection} and {entity}; load test templates the measured
+figures ({users}, {requests}, {p95}, ... see coursework.loadtest.summary()).
+
+compile_spec() turns a file into a flat list of operation tuples that
+coursework.render executes in a single pass (::: java blocks are expanded
+from the scanned sources by coursework.javascan.resolve_sources() first,
+::: loadtest blocks filled in by coursework.loadtest.resolve_results() and
+diagrams drawn by coursework.diagrams.resolve_diagrams()). Compiled specs
+are cached on disk by content hash, so an unchanged spec is never parsed
+twice.
+"""
+
+import hashlib
+import os
+import pickle
+import re
+
+from coursework.listings import LEXERS, listing_text
+from coursework.styles import KEYWORD, TITLE, TITLE_RIGHT, TITLE_STRONG
+
+# Bump whenever the operation format changes to invalidate cached specs
+SPEC_VERSION = 7
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache')
+# Load test results for ::: loadtest blocks, kept here so the watcher need
+# not import coursework.loadtest to know the file
+LOADTEST_RESULTS = os.path.join(os.path.dirname(CACHE_DIR), 'content', 'loadtest.json')
+
+BLOCK_ALIGN = {'center': TITLE, 'right': TITLE_RIGHT}
+BLOCK_EMPHASIS = {'bold': KEYWORD, 'strong': TITLE_STRONG}
+JAVA_DIRECTIVES = ('tree', 'endpoints', 'entities', 'er', 'packages', 'source')
+DIAGRAM_KINDS = ('usecase',)
+
+VARIABLE = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+_HEADING = re.compile(r'^(#{1,3}) (.+)$')
+_BOLD = re.compile(r'^\*\*(.+?)\*\*(.*)$')
+_CELL = re.compile(r'\\(.)|(\|)|([^\\|]+)')
+_CELL_ESCAPES = {'n': '\n', '|': '|', '\\': '\\'}
+
+
+class SpecError(ValueError):
+    """Raised for malformed content specs"""
+
+    def __init__(self, message, lineno=None):
+        super().__init__(f'line {lineno}: {message}' if lineno is not None else message)
+        self.lineno = lineno
+
+
+def table_cells(line):
+    """Cells of a ::: table row"""
+    cells, current = [], []
+    for escaped, separator, text in _CELL.findall(line):
+        if separator:
+            cells.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(_CELL_ESCAPES.get(escaped, escaped) if escaped else text)
+    cells.append(''.join(current).strip())
+    return tuple(cells)
+
+
+def table_line(cells):
+    """::: table row for cells, escaping separators and line breaks"""
+    return ' | '.join(cell.replace('\\', '\\\\').replace('|', '\\|').replace('\n', '\\n') for cell in cells)
+
+
+def _compile_table(args, lines, lineno):
+    if len(lines) < 2:
+        raise SpecError('table block needs a caption line and a header row', lineno)
+    header = table_cells(lines[1])
+    rows = tuple(table_cells(line) for line in lines[2:] if line.strip())
+    for n, row in enumerate(rows, 3):
+        if len(row) != len(header):
+            raise SpecError(f'table row has {len(row)} cells, the header has {len(header)}', lineno + n)
+    try:
+        weights = tuple(int(w) for w in args[0].split(',')) if args else (1,) * len(header)
+    except ValueError:
+        raise SpecError(f'table column weights must be integers: {args[0]!r}', lineno) from None
+    if len(args) > 1 or len(weights) != len(header) or min(weights) < 1:
+        raise SpecError('table expects one positive weight per column', lineno)
+    return [('table', lines[0].strip() or None, header, rows, weights)]
+
+
+def _compile_diagram(args, lines, lineno):
+    if len(args) < 2 or args[0] not in DIAGRAM_KINDS:
+        raise SpecError(f'diagram block expects one of {", ".join(DIAGRAM_KINDS)} and a system name', lineno)
+    lines = [line.strip() for line in lines if line.strip()]
+    if len(lines) < 2:
+        raise SpecError('diagram block needs a caption line and at least one actor', lineno)
+    actors = []
+    for n, line in enumerate(lines[1:], 2):
+        actor, colon, cases = line.partition(':')
+        cases = tuple(case.strip() for case in cases.split(';') if case.strip())
+        if not colon or not actor.strip() or not cases:
+            raise SpecError('diagram actor line expects "Actor: use case; use case"', lineno + n)
+        actors.append((actor.strip(), cases))
+    return [('diagram', args[0], lines[0], (' '.join(args[1:]), tuple(actors)))]
+
+
+def _compile_block(header, lines, lineno):
+    """Compile a fenced ::: block into operations"""
+    args = header.split()
+    kind = args[0] if args else ''
+    if kind == 'toc':
+        if any(line.strip() for line in lines):
+            raise SpecError('toc entries are generated from headings, leave the block empty', lineno)
+        return [('toc', None)]
+    if kind == 'java':
+        if len(args) < 2 or args[1] not in JAVA_DIRECTIVES:
+            raise SpecError(f'java block expects one of {", ".join(JAVA_DIRECTIVES)}', lineno)
+        options = tuple(args[2:])
+        if args[1] == 'source':
+            if not options or options[1:] not in ((), ('highlight',)):
+                raise SpecError('java source expects a type name and optionally highlight', lineno)
+        elif options:
+            raise SpecError(f'java {args[1]} takes no options', lineno)
+        return [('java', args[1], tuple(line.strip() for line in lines if line.strip()), options)]
+    if kind == 'loadtest':
+        if len(args) > 1:
+            raise SpecError('loadtest block takes no options', lineno)
+        return [('loadtest', tuple(line.strip() for line in lines if line.strip()))]
+    if kind == 'code':
+        if len(args) > 2 or args[1:] and args[1] not in LEXERS:
+            raise SpecError(f'code block expects at most one language of {", ".join(LEXERS)}', lineno)
+        if not lines:
+            raise SpecError('code block needs a caption line (may be empty) and the code', lineno)
+        language = args[1] if len(args) > 1 else None
+        return [('code', lines[0].strip() or None, language, listing_text('\n'.join(lines[1:])))]
+    if kind == 'table':
+        return _compile_table(args[1:], lines, lineno)
+    if kind == 'diagram':
+        return _compile_diagram(args[1:], lines, lineno)
+    if kind in BLOCK_ALIGN:
+        run_style = None
+        for arg in args[1:]:
+            if arg not in BLOCK_EMPHASIS:
+                raise SpecError(f'unknown block option {arg!r}', lineno)
+            run_style = BLOCK_EMPHASIS[arg]
+        return [('block', BLOCK_ALIGN[kind], '\n'.join(lines), run_style)]
+    raise SpecError(f'unknown block {kind!r}', lineno)
+
+
+def parse(text):
+    """Compile spec text into a flat list of operation tuples"""
+    ops = []
+    list_number = 0
+    block = None
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.rstrip()
+        if block is not None:
+            if line == ':::':
+                ops.extend(_compile_block(block[0], block[2], block[1]))
+                block = None
+            else:
+                block[2].append(line)
+            continue
+        if line.startswith(':::'):
+            block = (line[3:].strip(), lineno, [])
+            list_number = 0
+            continue
+        if line.startswith('<!--') and line.endswith('-->'):
+            continue
+        if line.startswith('+ '):
+            list_number += 1
+            ops.append(('list_item', f'{list_number}. {line[2:].strip()}'))
+            continue
+        list_number = 0
+        if not line.strip():
+            ops.append(('spacer',))
+        elif line == '---':
+            ops.append(('page_break',))
+        elif line.startswith('\\'):
+            ops.append(('paragraph', line[1:]))
+        elif _HEADING.match(line):
+            marks, title = _HEADING.match(line).groups()
+            ops.append(('heading', title.strip(), len(marks)))
+        elif _BOLD.match(line):
+            label, rest = _BOLD.match(line).groups()
+            if rest:
+                ops.append(('keywords', label, rest))
+            else:
+                ops.append(('bold', label))
+        else:
+            ops.append(('paragraph', line))
+    if block is not None:
+        raise SpecError('unterminated ::: block', block[1])
+    return ops
+
+
+def substitute(ops, variables):
+    """Replace {{name}} placeholders in the text of operations by their values"""
+    missing = set()
+
+    def replace(match):
+        if match.group(1) not in variables:
+            missing.add(match.group(1))
+            return match.group(0)
+        return str(variables[match.group(1)])
+
+    def fill(value):
+        if isinstance(value, str):
+            return VARIABLE.sub(replace, value) if '{{' in value else value
+        if isinstance(value, tuple):
+            return tuple(fill(item) for item in value)
+        return value
+
+    ops = [op if op[0] == 'code' else fill(op) for op in ops]
+    if missing:
+        raise SpecError(f"undefined variables: {', '.join(sorted(missing))}")
+    return ops
+
+
+def compile_spec(path, cache_dir=CACHE_DIR):
+    """Compile a spec file, reusing the cached result when its content is unchanged"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    key = hashlib.sha256(b'%d:' % SPEC_VERSION + data).hexdigest()
+    cached = os.path.join(cache_dir, 'spec', key + '.pickle') if cache_dir else None
+    if cached and os.path.exists(cached):
+        with open(cached, 'rb') as f:
+            return pickle.load(f)
+    ops = parse(data.decode('utf-8'))
+    if cached:
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        tmp = cached + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(ops, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cached)
+    return ops
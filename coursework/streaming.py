@@ -0,0 +1,206 @@
+"""Streaming .docx backend for very large reports.
+
+StreamingDocument accepts the same high-level calls the renderer makes on a
+python-docx Document (add_heading, add_paragraph, Paragraph.add_run,
+add_page_break) but writes every finished paragraph straight into the
+word/document.xml entry of the output zip through lxml's incremental
+xmlfile writer. Nothing accumulates in memory, so peak usage stays flat no
+matter how many pages are emitted. All other package parts (styles with the
+registry applied, settings, theme, ...) are taken from the default template;
+the document relationships and content types are written last, once the
+media parts of any figures are known.
+
+The package is written next to its path and moved over it when the
+document is closed, so the output is never seen half-written; leaving the
+with block on an exception discards it instead.
+"""
+
+import contextlib
+import io
+import os
+import re
+import zipfile
+
+from docx import Document
+from docx.oxml.ns import qn
+from lxml import etree
+
+from coursework.package import CONTENT_TYPES_PART, RELATIONSHIPS_PART, link_media
+from coursework.styles import apply_styles
+
+DOCUMENT_PART = 'word/document.xml'
+
+_SPECIAL = re.compile(r'([\n\t])')
+
+_template = None
+
+
+def _load_template():
+    """Return (parts, root tag, nsmap, root attrs, sectPr, style ids) of the styled template"""
+    global _template
+    if _template is None:
+        doc = Document()
+        apply_styles(doc)
+        buf = io.BytesIO()
+        doc.save(buf)
+        with zipfile.ZipFile(buf) as zf:
+            parts = [(info, zf.read(info)) for info in zf.infolist()
+                     if info.filename != DOCUMENT_PART]
+        root = doc.element
+        style_ids = {style.name: style.style_id for style in doc.styles}
+        _template = (parts, root.tag, dict(root.nsmap), dict(root.attrib),
+                     etree.tostring(root.body[-1]), style_ids)
+    return _template
+
+
+class _StreamRun:
+    """Run handle exposing its w:r element like python-docx's Run._r"""
+
+    def __init__(self, r):
+        self._r = r
+
+
+class _StreamParagraph:
+    """Paragraph element kept until the next block starts, then written out"""
+
+    def __init__(self, style_ids, style_id):
+        self._style_ids = style_ids
+        self._p = etree.Element(qn('w:p'))
+        if style_id:
+            pPr = etree.SubElement(self._p, qn('w:pPr'))
+            etree.SubElement(pPr, qn('w:pStyle')).set(qn('w:val'), style_id)
+
+    def add_run(self, text=None, style=None):
+        style_id = self._style_ids[style] if style is not None else None
+        return _StreamRun(append_run(self._p, text or '', style_id))
+
+
+class StreamingDocument:
+    """Write-only document that streams body XML into the .docx zip as it is produced"""
+
+    def __init__(self, path, compresslevel=None):
+        parts, tag, nsmap, attrib, sectPr, self._style_ids = _load_template()
+        self._sectPr = sectPr
+        self._pending = None
+        self.paragraphs_written = 0
+        self._media = {}
+        self._path = path
+        self._tmp = f'{path}.{os.getpid()}.tmp'
+        self._zip = zipfile.ZipFile(self._tmp, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+        self._linked = [(info, data) for info, data in parts
+                        if info.filename in (RELATIONSHIPS_PART, CONTENT_TYPES_PART)]
+        for info, data in parts:
+            if info.filename not in (RELATIONSHIPS_PART, CONTENT_TYPES_PART):
+                self._zip.writestr(info, data)
+        self._stack = contextlib.ExitStack()
+        stream = self._stack.enter_context(self._zip.open(DOCUMENT_PART, 'w', force_zip64=True))
+        self._xf = self._stack.enter_context(etree.xmlfile(stream, encoding='UTF-8'))
+        self._xf.write_declaration(standalone=True)
+        self._stack.enter_context(self._xf.element(tag, attrib, nsmap=nsmap))
+        self._stack.enter_context(self._xf.element(qn('w:body')))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _style_id(self, name):
+        if name is None:
+            return None
+        return self._style_ids[name]
+
+    def _flush(self):
+        if self._pending is None:
+            return
+        self._xf.write(self._pending._p)
+        self._pending = None
+        self.paragraphs_written += 1
+
+    def add_paragraph(self, text='', style=None):
+        """Start a new paragraph, optionally with text and a registry style name"""
+        self._flush()
+        self._pending = _StreamParagraph(self._style_ids, self._style_id(style))
+        if text:
+            self._pending.add_run(text)
+        return self._pending
+
+    def add_heading(self, text='', level=1):
+        """Start a heading paragraph styled "Heading <level>" """
+        return self.add_paragraph(text, 'Title' if level == 0 else f'Heading {level}')
+
+    def add_element(self, element):
+        """Write a finished body element (e.g. a w:tbl) after the current paragraph"""
+        self._flush()
+        self._xf.write(element)
+
+    def add_media(self, parts):
+        """Add figure media parts (coursework.diagrams.media()) to the package, each once"""
+        for part in parts:
+            self._media.setdefault(part.name, part)
+
+    def add_page_break(self):
+        """Write a paragraph containing only a page break"""
+        self._flush()
+        p = etree.Element(qn('w:p'))
+        br = etree.SubElement(etree.SubElement(p, qn('w:r')), qn('w:br'))
+        br.set(qn('w:type'), 'page')
+        self._xf.write(p)
+        self.paragraphs_written += 1
+
+    def close(self):
+        """Finish the body, write section properties and move the package to its path"""
+        if self._zip is None:
+            return
+        try:
+            self._flush()
+            self._xf.write(etree.fromstring(self._sectPr))
+            self._stack.close()
+            media = list(self._media.values())
+            for part in media:
+                self._zip.writestr(part.name, part.data)
+            for info, data in self._linked:
+                self._zip.writestr(info, link_media(info.filename, data, media))
+            self._zip.close()
+            self._zip = None
+            os.replace(self._tmp, self._path)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self):
+        """Discard the partly written package, leaving any earlier file at the path alone"""
+        if self._zip is None and not os.path.exists(self._tmp):
+            return
+        try:
+            if self._zip is not None:
+                try:
+                    self._stack.close()
+                finally:
+                    self._zip.close()
+        finally:
+            self._zip = None
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._tmp)
+
+
+def append_run(p, text, style_id):
+    """Append a w:r to p, translating newlines and tabs like python-docx does"""
+    r = etree.SubElement(p, qn('w:r'))
+    if style_id:
+        rPr = etree.SubElement(r, qn('w:rPr'))
+        etree.SubElement(rPr, qn('w:rStyle')).set(qn('w:val'), style_id)
+    for chunk in _SPECIAL.split(text):
+        if chunk == '\n':
+            etree.SubElement(r, qn('w:br'))
+        elif chunk == '\t':
+            etree.SubElement(r, qn('w:tab'))
+        elif chunk:
+            t = etree.SubElement(r, qn('w:t'))
+            t.text = chunk
+            if chunk[0].isspace() or chunk[-1].isspace():
+                t.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
+    return r
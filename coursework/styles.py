@@ -0,0 +1,273 @@
+"""Style registry shared by the coursework generators.
+
+Every formatting rule of the report (body text, headings, TOC entries, list
+items, keyword labels, title page, figures, code listings) is declared once
+in STYLES and written into the document's styles part by apply_styles().
+Paragraphs and runs then refer to those styles by name instead of carrying
+their own w:rPr/w:pPr blocks.
+"""
+
+from functools import lru_cache
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING, WD_TAB_ALIGNMENT, WD_TAB_LEADER
+from docx.oxml.ns import qn
+from docx.shared import Inches, Length, Mm, Pt, RGBColor
+
+from coursework.profiling import traced
+
+FONT_NAME = 'Times New Roman'
+CODE_FONT = 'Courier New'
+
+# Paper sizes the guidelines may ask for, (width, height)
+PAPER = {'A4': (Mm(210), Mm(297))}
+# Tab stop position standing for the right edge of the text column
+TEXT_RIGHT = 'text right'
+
+BODY = 'CW Body'
+LIST_ITEM = 'CW List Item'
+KEYWORDS = 'CW Keywords'
+KEYWORD = 'CW Keyword'
+# Word's built-in TOC entry styles, so an updated TOC field keeps this look
+TOC_LEVELS = ('toc 1', 'toc 2', 'toc 3')
+TITLE = 'CW Title'
+TITLE_RIGHT = 'CW Title Right'
+TITLE_STRONG = 'CW Title Strong'
+TABLE_CAPTION = 'CW Table Caption'
+TABLE_TEXT = 'CW Table Text'
+FIGURE = 'CW Figure'
+FIGURE_CAPTION = 'CW Figure Caption'
+CODE = 'CW Code'
+# Character styles of the tokens in highlighted listings
+CODE_KEYWORD = 'CW Code Keyword'
+CODE_STRING = 'CW Code String'
+CODE_COMMENT = 'CW Code Comment'
+CODE_ANNOTATION = 'CW Code Annotation'
+CODE_NUMBER = 'CW Code Number'
+# Built-in table style with single borders on every cell
+TABLE_GRID = 'Table Grid'
+
+# name -> (type, base style, font properties, paragraph properties)
+STYLES = {
+    'Normal': (WD_STYLE_TYPE.PARAGRAPH, None,
+               {'name': FONT_NAME, 'size': Pt(14)}, {}),
+    'Heading 1': (WD_STYLE_TYPE.PARAGRAPH, None,
+                  {'name': FONT_NAME, 'size': Pt(16), 'bold': True, 'color': RGBColor(0, 0, 0)},
+                  {'alignment': WD_ALIGN_PARAGRAPH.CENTER}),
+    'Heading 2': (WD_STYLE_TYPE.PARAGRAPH, None,
+                  {'name': FONT_NAME, 'size': Pt(14), 'bold': True, 'color': RGBColor(0, 0, 0)},
+                  {'alignment': WD_ALIGN_PARAGRAPH.LEFT}),
+    'Heading 3': (WD_STYLE_TYPE.PARAGRAPH, None,
+                  {'name': FONT_NAME, 'size': Pt(14), 'bold': True, 'color': RGBColor(0, 0, 0)},
+                  {'alignment': WD_ALIGN_PARAGRAPH.LEFT}),
+    BODY: (WD_STYLE_TYPE.PARAGRAPH, 'Normal', {},
+           {'alignment': WD_ALIGN_PARAGRAPH.JUSTIFY,
+            'first_line_indent': Inches(0.5),
+            'line_spacing_rule': WD_LINE_SPACING.ONE_POINT_FIVE,
+            'space_before': Pt(0),
+            'space_after': Pt(0)}),
+    LIST_ITEM: (WD_STYLE_TYPE.PARAGRAPH, 'Normal', {},
+                {'alignment': WD_ALIGN_PARAGRAPH.JUSTIFY,
+                 'left_indent': Inches(0.5),
+                 'line_spacing_rule': WD_LINE_SPACING.ONE_POINT_FIVE}),
+    KEYWORDS: (WD_STYLE_TYPE.PARAGRAPH, 'Normal', {},
+               {'alignment': WD_ALIGN_PARAGRAPH.JUSTIFY,
+                'line_spacing_rule': WD_LINE_SPACING.ONE_POINT_FIVE}),
+    **{name: (WD_STYLE_TYPE.PARAGRAPH, 'Normal', {},
+              {'left_indent': Inches(0.3 * level),
+               'line_spacing_rule': WD_LINE_SPACING.ONE_POINT_FIVE,
+               'tab_stops': [(TEXT_RIGHT, WD_TAB_ALIGNMENT.RIGHT, WD_TAB_LEADER.DOTS)]})
+       for level, name in enumerate(TOC_LEVELS)},
+    TITLE: (WD_STYLE_TYPE.PARAGRAPH, 'Normal', {},
+            {'alignment': WD_ALIGN_PARAGRAPH.CENTER}),
+    TITLE_RIGHT: (WD_STYLE_TYPE.PARAGRAPH, 'Normal', {},
+                  {'alignment': WD_ALIGN_PARAGRAPH.RIGHT}),
+    TABLE_CAPTION: (WD_STYLE_TYPE.PARAGRAPH, 'Normal', {},
+                    {'alignment': WD_ALIGN_PARAGRAPH.LEFT,
+                     'keep_with_next': True,
+                     'space_before': Pt(6),
+                     'space_after': Pt(0),
+                     'line_spacing_rule': WD_LINE_SPACING.ONE_POINT_FIVE}),
+    TABLE_TEXT: (WD_STYLE_TYPE.PARAGRAPH, 'Normal', {'size': Pt(12)},
+                 {'alignment': WD_ALIGN_PARAGRAPH.LEFT,
+                  'space_before': Pt(0),
+                  'space_after': Pt(0),
+                  'line_spacing_rule': WD_LINE_SPACING.SINGLE}),
+    FIGURE: (WD_STYLE_TYPE.PARAGRAPH, 'Normal', {},
+             {'alignment': WD_ALIGN_PARAGRAPH.CENTER,
+              'keep_with_next': True,
+              'space_before': Pt(6),
+              'space_after': Pt(0),
+              'line_spacing_rule': WD_LINE_SPACING.SINGLE}),
+    FIGURE_CAPTION: (WD_STYLE_TYPE.PARAGRAPH, 'Normal', {},
+                     {'alignment': WD_ALIGN_PARAGRAPH.CENTER,
+                      'space_before': Pt(0),
+                      'space_after': Pt(6),
+                      'line_spacing_rule': WD_LINE_SPACING.ONE_POINT_FIVE}),
+    CODE: (WD_STYLE_TYPE.PARAGRAPH, 'Normal', {'name': CODE_FONT, 'size': Pt(12)},
+           {'alignment': WD_ALIGN_PARAGRAPH.LEFT,
+            'space_before': Pt(0),
+            'space_after': Pt(6),
+            'line_spacing_rule': WD_LINE_SPACING.SINGLE}),
+    KEYWORD: (WD_STYLE_TYPE.CHARACTER, None, {'bold': True}, {}),
+    TITLE_STRONG: (WD_STYLE_TYPE.CHARACTER, None,
+                   {'size': Pt(16), 'bold': True}, {}),
+    CODE_KEYWORD: (WD_STYLE_TYPE.CHARACTER, None, {'bold': True, 'color': RGBColor(0x00, 0x00, 0x80)}, {}),
+    CODE_STRING: (WD_STYLE_TYPE.CHARACTER, None, {'color': RGBColor(0x06, 0x7D, 0x17)}, {}),
+    CODE_COMMENT: (WD_STYLE_TYPE.CHARACTER, None, {'italic': True, 'color': RGBColor(0x8C, 0x8C, 0x8C)}, {}),
+    CODE_ANNOTATION: (WD_STYLE_TYPE.CHARACTER, None, {'color': RGBColor(0x9E, 0x88, 0x0D)}, {}),
+    CODE_NUMBER: (WD_STYLE_TYPE.CHARACTER, None, {'color': RGBColor(0x17, 0x50, 0xEB)}, {}),
+}
+
+
+def _set_style_font(style, props):
+    """Write font properties into a style's rPr"""
+    for key, value in props.items():
+        if key == 'color':
+            style.font.color.rgb = value
+        else:
+            setattr(style.font, key, value)
+    if 'name' in props:
+        # Theme fonts take precedence over explicit names, drop them so the
+        # style really renders in Times New Roman (Cyrillic included)
+        rFonts = style.element.get_or_add_rPr().get_or_add_rFonts()
+        for attr in ('w:asciiTheme', 'w:hAnsiTheme', 'w:eastAsiaTheme', 'w:cstheme'):
+            rFonts.attrib.pop(qn(attr), None)
+        rFonts.set(qn('w:eastAsia'), props['name'])
+        rFonts.set(qn('w:cs'), props['name'])
+
+
+@lru_cache(maxsize=None)
+def page_setup():
+    """(width, height, {side: margin}) of the page the methodical guidelines require"""
+    # Imported here, the guidelines index depends on the spec which uses these styles
+    from coursework.guidelines import guidelines
+    rules = guidelines().formatting_rules()
+    width, height = PAPER[rules['page_format']]
+    return width, height, {side: Mm(mm) for side, mm in rules['margins_mm'].items()}
+
+
+def text_width():
+    """Width of the text column between the side margins of page_setup()"""
+    width, _, margins = page_setup()
+    return Length(width - margins['left'] - margins['right'])
+
+
+def apply_page(doc):
+    """Give every section of the document the page size and margins of page_setup()"""
+    width, height, margins = page_setup()
+    for section in doc.sections:
+        section.page_width, section.page_height = width, height
+        for side, margin in margins.items():
+            setattr(section, f'{side}_margin', margin)
+    return doc
+
+
+def apply_styles(doc):
+    """Define the registry styles and the page setup in the document (idempotent)"""
+    apply_page(doc)
+    styles = doc.styles
+    for name, (style_type, base, font, paragraph) in STYLES.items():
+        try:
+            style = styles[name]
+        except KeyError:
+            style = styles.add_style(name, style_type, builtin=name in TOC_LEVELS)
+            style.quick_style = True
+        if base is not None:
+            style.base_style = styles[base]
+        _set_style_font(style, font)
+        for key, value in paragraph.items():
+            if key == 'tab_stops':
+                tab_stops = style.paragraph_format.tab_stops
+                tab_stops.clear_all()
+                for position, alignment, leader in value:
+                    if position == TEXT_RIGHT:
+                        position = text_width()
+                    tab_stops.add_tab_stop(position, alignment, leader)
+            else:
+                setattr(style.paragraph_format, key, value)
+    return doc
+
+
+def cache_style_ids(doc):
+    """Memoize the style name lookups of a document whose styles no longer change
+
+    python-docx resolves every style name by scanning styles.xml for it and
+    for the default style, which costs more than building the paragraph.
+    """
+    lookup = doc.part.get_style_id
+    ids = {}
+
+    def get_style_id(style_or_name, style_type):
+        key = (style_or_name if isinstance(style_or_name, str) or style_or_name is None
+               else style_or_name.style_id, style_type)
+        if key not in ids:
+            ids[key] = lookup(style_or_name, style_type)
+        return ids[key]
+
+    doc.part.get_style_id = get_style_id
+    return doc
+
+
+@lru_cache(maxsize=None)
+def _styled_template():
+    return apply_styles(Document())
+
+
+@lru_cache(maxsize=None)
+def style_id(name):
+    """styleId a style name gets in documents prepared by apply_styles()"""
+    return _styled_template().styles[name].style_id
+
+
+@traced
+def set_font(run, name=FONT_NAME, size=14, bold=False, italic=False):
+    """Set font properties for a run (direct formatting, use styles where possible)"""
+    run.font.name = name
+    run.font.size = Pt(size)
+    run.font.bold = bold
+    run.font.italic = italic
+    # Set font for complex scripts (Cyrillic)
+    rFonts = run._element.get_or_add_rPr().get_or_add_rFonts()
+    rFonts.set(qn('w:eastAsia'), name)
+
+
+@traced
+def add_heading(doc, text, level=1):
+    """Add a heading with proper formatting"""
+    return doc.add_heading(text, level)
+
+
+@traced
+def add_paragraph(doc, text, alignment=WD_ALIGN_PARAGRAPH.JUSTIFY, first_line_indent=True):
+    """Add a body paragraph with proper formatting"""
+    p = doc.add_paragraph(text, BODY)
+    if alignment != WD_ALIGN_PARAGRAPH.JUSTIFY:
+        p.alignment = alignment
+    if not first_line_indent:
+        p.paragraph_format.first_line_indent = Inches(0)
+    return p
+
+
+@traced
+def add_para(doc, text, bold=False):
+    """Add a body paragraph, optionally bold"""
+    p = doc.add_paragraph(style=BODY)
+    p.add_run(text, KEYWORD if bold else None)
+    return p
+
+
+@traced
+def add_list_item(doc, text):
+    """Add an indented list item paragraph"""
+    return doc.add_paragraph(text, LIST_ITEM)
+
+
+@traced
+def add_keywords(doc, label, text):
+    """Add a paragraph with a bold keyword label followed by plain text"""
+    p = doc.add_paragraph(style=KEYWORDS)
+    p.add_run(label, KEYWORD)
+    p.add_run(text)
+    return p
@@ -0,0 +1,92 @@
+"""Tables built directly as WordprocessingML.
+
+A table operation carries its caption, header, rows and relative column
+widths. The caption becomes a paragraph kept with the table. The w:tbl is
+written in bulk: the markup of every row is produced from string templates
+with only the cell text escaped, and the whole table is parsed once, so the
+cost grows linearly with the number of cells (python-docx's table.cell()
+walks the grid on every access). The element is appended to either backend,
+a python-docx Document or a StreamingDocument. The header row repeats on
+every page the table spans, as the guidelines require for continued tables.
+"""
+
+import re
+from xml.sax.saxutils import escape
+
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.shared import Length
+
+from coursework.streaming import StreamingDocument
+from coursework.styles import KEYWORD, TABLE_CAPTION, TABLE_GRID, TABLE_TEXT, style_id, text_width
+
+_SPECIAL = re.compile(r'([\n\t])')
+
+
+def column_widths(weights, total=None):
+    """Column widths in twips for relative weights, summing to the text width"""
+    twips = round(Length(text_width() if total is None else total).pt * 20)
+    widths = [twips * weight // sum(weights) for weight in weights]
+    widths[-1] += twips - sum(widths)
+    return widths
+
+
+def _run(text, rPr):
+    """w:r markup for text, translating newlines and tabs like python-docx does"""
+    parts = ['<w:r>', rPr]
+    for chunk in _SPECIAL.split(text):
+        if chunk == '\n':
+            parts.append('<w:br/>')
+        elif chunk == '\t':
+            parts.append('<w:tab/>')
+        elif chunk:
+            space = ' xml:space="preserve"' if chunk[0].isspace() or chunk[-1].isspace() else ''
+            parts.append(f'<w:t{space}>{escape(chunk)}</w:t>')
+    parts.append('</w:r>')
+    return ''.join(parts)
+
+
+def _row_template(widths, text_style, trPr=''):
+    """%-template of a w:tr with one %s slot per cell for its runs"""
+    cells = ''.join(f'<w:tc><w:tcPr><w:tcW w:w="{width}" w:type="dxa"/></w:tcPr>'
+                    f'<w:p><w:pPr><w:pStyle w:val="{text_style}"/></w:pPr>%s</w:p></w:tc>'
+                    for width in widths)
+    return f'<w:tr>{trPr}{cells}</w:tr>'
+
+
+def table_xml(header, rows, weights):
+    """w:tbl markup with a repeated header row and fixed column widths"""
+    widths = column_widths(weights)
+    text_style = style_id(TABLE_TEXT)
+    bold = f'<w:rPr><w:rStyle w:val="{style_id(KEYWORD)}"/></w:rPr>'
+    grid = ''.join(f'<w:gridCol w:w="{width}"/>' for width in widths)
+    parts = [
+        f'<w:tbl {nsdecls("w")}><w:tblPr><w:tblStyle w:val="{style_id(TABLE_GRID)}"/>'
+        f'<w:tblW w:w="{sum(widths)}" w:type="dxa"/><w:tblLayout w:type="fixed"/>'
+        '<w:tblLook w:val="04A0" w:firstRow="1" w:lastRow="0" w:firstColumn="0" w:lastColumn="0" '
+        f'w:noHBand="0" w:noVBand="1"/></w:tblPr><w:tblGrid>{grid}</w:tblGrid>'
+    ]
+    if header:
+        template = _row_template(widths, text_style, '<w:trPr><w:tblHeader/></w:trPr>')
+        parts.append(template % tuple(_run(text, bold) if text else '' for text in header))
+    template = _row_template(widths, text_style)
+    parts.extend(template % tuple(_run(text, '') if text else '' for text in row) for row in rows)
+    parts.append('</w:tbl>')
+    return ''.join(parts)
+
+
+def table_element(header, rows, weights):
+    """Parsed w:tbl element of a table"""
+    return parse_xml(table_xml(header, rows, weights))
+
+
+def add_table(doc, caption, header, rows, weights):
+    """Add an optional caption paragraph and the table to a document"""
+    if caption:
+        doc.add_paragraph(caption, TABLE_CAPTION)
+    tbl = table_element(header, rows, weights)
+    if isinstance(doc, StreamingDocument):
+        doc.add_element(tbl)
+    else:
+        doc.element.body._insert_tbl(tbl)
+    return tbl
@@ -0,0 +1,25 @@
+"""Table of contents generated from the headings of a compiled spec."""
+
+from coursework.layout import heading_pages
+
+TOC_DEPTH = 3
+
+
+def resolve_toc(ops, estimate=heading_pages):
+    """Fill every ('toc', None) operation with (title, level, page) entries
+
+    Entries list the headings that follow the TOC. Page numbers come from
+    the estimate, computed with the entries already in place so the TOC's
+    own length is taken into account.
+    """
+    positions = [i for i, op in enumerate(ops) if op[0] == 'toc']
+    if not positions:
+        return ops
+    ops = list(ops)
+    for pos in positions:
+        before = sum(1 for op in ops[:pos] if op[0] == 'heading')
+        ops[pos] = ('toc', tuple((op[1], op[2], '') for op in ops[pos + 1:]
+                                 if op[0] == 'heading' and op[2] <= TOC_DEPTH))
+        ops[pos] = ('toc', tuple((title, level, str(page)) for title, level, page in estimate(ops)[before:]
+                                 if level <= TOC_DEPTH))
+    return ops
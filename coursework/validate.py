@@ -0,0 +1,337 @@
+"""Streaming checker of a generated .docx against the formatting rules.
+
+The package is read straight from the zip: word/styles.xml and then
+word/document.xml go through lxml's iterparse, and every element is
+discarded once its paragraph has been checked, so memory stays flat and a
+200-page report is checked in a fraction of a second.
+
+Effective formatting is resolved the way Word does it: document defaults,
+then the paragraph style and its basedOn chain, then direct paragraph
+properties, then the character style chain and the run's own properties.
+A theme font anywhere in that chain wins over the explicit names below it,
+which is how a heading added with the default styles ends up in Calibri.
+
+Paragraphs are checked according to their kind: headings, TOC entries,
+table cells, table and figure captions, code listings, title page
+(everything before the first heading) and body text. Each violation names
+the paragraph number, the section it belongs to and the start of its text.
+"""
+
+import zipfile
+from collections import namedtuple
+
+from docx.shared import Length
+from lxml import etree
+
+from coursework.styles import BODY, CODE, FIGURE_CAPTION, FONT_NAME, KEYWORDS, LIST_ITEM, STYLES, TABLE_CAPTION
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+# A4 in twips and the tolerance for rounding in other editors
+A4 = (11906, 16838)
+PAGE_TOLERANCE = 20
+TWIPS_PER_MM = 1440 / 25.4
+# Smallest font allowed in table cells, in points
+TABLE_MIN_SIZE = 12
+
+Violation = namedtuple('Violation', 'paragraph section rule expected actual text')
+
+# Plain paragraphs start with the first-line indent, lists and labelled paragraphs do not
+_INDENTED = {'Normal', BODY}
+_JUSTIFIED = _INDENTED | {LIST_ITEM, KEYWORDS}
+
+_P, _R, _T, _TBL = W + 'p', W + 'r', W + 't', W + 'tbl'
+_PPR, _RPR, _SECTPR = W + 'pPr', W + 'rPr', W + 'sectPr'
+
+
+def rules():
+    """Formatting rules from the methodical guidelines plus the body indent of the style registry"""
+    from coursework.guidelines import guidelines
+
+    formatting = dict(guidelines().formatting_rules())
+    formatting['first_line_indent'] = round(Length(STYLES[BODY][3]['first_line_indent']).pt * 20)
+    return formatting
+
+
+def _val(el, attr='val'):
+    return el.get(W + attr)
+
+
+def _run_props(rPr):
+    """Run properties set directly in a w:rPr element"""
+    props = {}
+    if rPr is None:
+        return props
+    for el in rPr:
+        tag = el.tag[len(W):]
+        if tag == 'rFonts':
+            theme = _val(el, 'asciiTheme')
+            if theme:
+                props['font'] = f'theme:{theme}'
+            elif _val(el, 'ascii'):
+                props['font'] = _val(el, 'ascii')
+        elif tag == 'sz':
+            props['size'] = int(_val(el)) / 2
+        elif tag in ('b', 'i'):
+            props[tag] = _val(el) not in ('0', 'false', 'off')
+        elif tag == 'color':
+            props['color'] = _val(el, 'themeColor') or _val(el)
+        elif tag == 'rStyle':
+            props['style'] = _val(el)
+    return props
+
+
+def _paragraph_props(pPr):
+    """Paragraph properties set directly in a w:pPr element"""
+    props = {}
+    if pPr is None:
+        return props
+    for el in pPr:
+        tag = el.tag[len(W):]
+        if tag == 'pStyle':
+            props['style'] = _val(el)
+        elif tag == 'jc':
+            props['jc'] = {'start': 'left', 'end': 'right'}.get(_val(el), _val(el))
+        elif tag == 'spacing':
+            if _val(el, 'line') is not None:
+                props['line'] = (int(_val(el, 'line')), _val(el, 'lineRule') or 'auto')
+        elif tag == 'ind':
+            for attr, key in (('firstLine', 'first_line'), ('hanging', 'hanging'),
+                              ('left', 'left'), ('start', 'left')):
+                if _val(el, attr) is not None:
+                    props[key] = int(_val(el, attr))
+        elif tag == 'outlineLvl':
+            props['outline'] = int(_val(el))
+        elif tag == 'numPr':
+            props['numbered'] = True
+    return props
+
+
+class StyleSheet:
+    """Styles of a package with their effective properties resolved along basedOn"""
+
+    def __init__(self, source):
+        self.paragraph_defaults, self.run_defaults = {}, {}
+        self._styles = {}
+        self._resolved = {}
+        self.default_paragraph = 'Normal'
+        for _, el in etree.iterparse(source, events=('end',), tag=(W + 'style', W + 'docDefaults')):
+            if el.tag == W + 'docDefaults':
+                self.paragraph_defaults = _paragraph_props(el.find(f'{W}pPrDefault/{_PPR}'))
+                self.run_defaults = _run_props(el.find(f'{W}rPrDefault/{_RPR}'))
+            else:
+                style_id = _val(el, 'styleId')
+                name = el.find(W + 'name')
+                based = el.find(W + 'basedOn')
+                if _val(el, 'type') == 'paragraph' and _val(el, 'default') == '1':
+                    self.default_paragraph = style_id
+                self._styles[style_id] = (
+                    _val(name) if name is not None else style_id,
+                    _val(based) if based is not None else None,
+                    _val(el, 'customStyle') in ('1', 'true'),
+                    _paragraph_props(el.find(_PPR)),
+                    _run_props(el.find(_RPR)),
+                )
+            el.clear()
+
+    def name(self, style_id):
+        """Name of the style, or for custom styles outside the registry (such as those
+        coursework.optimize adds) the name of the style they are based on"""
+        seen = set()
+        while style_id in self._styles and style_id not in seen:
+            seen.add(style_id)
+            name, based, custom = self._styles[style_id][:3]
+            if not custom or name in STYLES or based is None:
+                return name
+            style_id = based
+        return style_id
+
+    def resolve(self, style_id):
+        """(paragraph props, run props) of a style including everything it is based on"""
+        if style_id in self._resolved:
+            return self._resolved[style_id]
+        if style_id not in self._styles:
+            return {}, {}
+        _, based, _, pPr, rPr = self._styles[style_id]
+        self._resolved[style_id] = ({}, {})  # guards against basedOn cycles
+        base_pPr, base_rPr = self.resolve(based) if based else ({}, {})
+        self._resolved[style_id] = {**base_pPr, **pPr}, {**base_rPr, **rPr}
+        return self._resolved[style_id]
+
+
+def _kind(name, props, in_table, seen_heading):
+    lowered = name.lower()
+    if in_table:
+        return 'table'
+    if 'outline' in props or lowered.startswith('heading') or lowered == 'title':
+        return 'heading'
+    if name == CODE:
+        return 'code'
+    if not seen_heading:
+        return 'title page'
+    if lowered.startswith('toc'):
+        return 'toc'
+    if name in (TABLE_CAPTION, FIGURE_CAPTION):
+        return 'caption'
+    return 'body'
+
+
+class Validator:
+    """Checks paragraphs and sections of one package against the rules"""
+
+    def __init__(self, formatting):
+        self.rules = formatting
+        self.line = round(formatting['line_spacing'] * 240)
+        margins = formatting['margins_mm']
+        self.margins = {side: round(mm * TWIPS_PER_MM) for side, mm in margins.items()}
+
+    def validate(self, path):
+        """Violations of a .docx file, in document order"""
+        violations = []
+        with zipfile.ZipFile(path) as package:
+            with package.open('word/styles.xml') as f:
+                styles = StyleSheet(f)
+            with package.open('word/document.xml') as f:
+                self._document(f, styles, violations)
+        return violations
+
+    def _document(self, source, styles, violations):
+        number, section, seen_heading, tables = 0, '', False, 0
+        for event, el in etree.iterparse(source, events=('start', 'end')):
+            if el.tag == _TBL:
+                tables += 1 if event == 'start' else -1
+            if event != 'end':
+                continue
+            if el.tag == _P:
+                number += 1
+                pPr = _paragraph_props(el.find(_PPR))
+                style_id = pPr.get('style', styles.default_paragraph)
+                style_pPr, style_rPr = styles.resolve(style_id)
+                props = {**styles.paragraph_defaults, **style_pPr, **pPr}
+                name = styles.name(style_id)
+                kind = _kind(name, props, tables > 0, seen_heading)
+                runs, text = [], []
+                for r in el.iter(_R):
+                    run_text = ''.join(t.text or '' for t in r.iter(_T))
+                    if run_text.strip():
+                        rPr = _run_props(r.find(_RPR))
+                        char_style = styles.resolve(rPr['style'])[1] if 'style' in rPr else {}
+                        runs.append({**styles.run_defaults, **style_rPr, **char_style, **rPr})
+                    text.append(run_text)
+                text = ''.join(text).strip()
+                if kind == 'heading':
+                    seen_heading, section = True, text
+                for rule, expected, actual in self._paragraph(kind, name, props, runs, text):
+                    violations.append(Violation(number, section, rule, expected, actual, text[:60]))
+                if el.find(f'{_PPR}/{_SECTPR}') is not None:
+                    self._section(el.find(f'{_PPR}/{_SECTPR}'), number, section, violations)
+                parent = el.getparent()
+                el.clear()
+                while el.getprevious() is not None:
+                    del parent[0]
+            elif el.tag == _SECTPR and el.getparent().tag == W + 'body':
+                self._section(el, number, section, violations)
+
+    def _paragraph(self, kind, name, props, runs, text):
+        """(rule, expected, actual) for every broken rule of one paragraph"""
+        size = self.rules['font_size']
+        fonts = {run.get('font') for run in runs} - {FONT_NAME}
+        # Listings are set in the monospace code font, at table sizes
+        if fonts and kind != 'code':
+            yield 'font', FONT_NAME, ', '.join(sorted(map(str, fonts)))
+        colors = {run.get('color') for run in runs} - {None, 'auto', '000000', 'text1'}
+        if colors:
+            yield 'color', 'black', ', '.join(sorted(colors))
+        sizes = {run.get('size') for run in runs}
+        if kind == 'heading':
+            if any(s is None or s < size for s in sizes):
+                yield 'size', f'>= {size}pt', _sizes(sizes)
+            if not all(run.get('b') for run in runs):
+                yield 'bold', 'bold', 'regular'
+            return
+        if kind in ('table', 'code'):
+            if any(s is None or not TABLE_MIN_SIZE <= s <= size for s in sizes):
+                yield 'size', f'{TABLE_MIN_SIZE}-{size}pt', _sizes(sizes)
+            return
+        if kind == 'title page' or not text:
+            return
+        if sizes - {size}:
+            yield 'size', f'{size}pt', _sizes(sizes)
+        line = props.get('line', (240, 'auto'))
+        if line != (self.line, 'auto'):
+            yield 'line spacing', self.rules['line_spacing'], _spacing(line)
+        if kind != 'body':
+            return
+        if name in _JUSTIFIED and props.get('jc', 'left') != 'both':
+            yield 'alignment', 'justified', props.get('jc', 'left')
+        if name in _INDENTED and not props.get('numbered') and \
+                props.get('first_line', 0) != self.rules['first_line_indent']:
+            yield 'first line indent', _inches(self.rules['first_line_indent']), \
+                _inches(props.get('first_line', -props.get('hanging', 0)))
+
+    def _section(self, sectPr, number, section, violations):
+        page, margins = sectPr.find(W + 'pgSz'), sectPr.find(W + 'pgMar')
+        if page is not None and self.rules['page_format'] == 'A4':
+            size = int(_val(page, 'w')), int(_val(page, 'h'))
+            if sorted(size) != sorted(A4) and any(abs(a - b) > PAGE_TOLERANCE
+                                                 for a, b in zip(sorted(size), A4)):
+                violations.append(Violation(number, section, 'page size', 'A4 (210x297 mm)',
+                                            f'{size[0] / TWIPS_PER_MM:.0f}x{size[1] / TWIPS_PER_MM:.0f} mm', ''))
+        if margins is not None:
+            for side, minimum in self.margins.items():
+                value = int(_val(margins, side) or 0)
+                if value < minimum - PAGE_TOLERANCE:
+                    violations.append(Violation(number, section, f'{side} margin',
+                                                f'>= {minimum / TWIPS_PER_MM:.0f} mm',
+                                                f'{value / TWIPS_PER_MM:.0f} mm', ''))
+
+
+def _sizes(sizes):
+    return ', '.join('default' if s is None else f'{s:g}pt' for s in sorted(sizes, key=lambda s: s or 0))
+
+
+def _spacing(line):
+    value, rule = line
+    return f'{value / 240:g}' if rule == 'auto' else f'{rule} {value / 20:g}pt'
+
+
+def _inches(twips):
+    return f'{twips / 1440:g}"'
+
+
+def validate(path, formatting=None):
+    """Violations of the formatting rules (from rules() by default) in a .docx file"""
+    return Validator(formatting or rules()).validate(path)
+
+
+def report(violations, limit=None):
+    """Text listing of violations followed by counts per rule"""
+    lines = []
+    for v in violations[:limit]:
+        where = f'paragraph {v.paragraph}' + (f' [{v.section[:40]}]' if v.section else '')
+        text = f' "{v.text}"' if v.text else ''
+        lines.append(f'{where}: {v.rule} is {v.actual}, expected {v.expected}{text}')
+    if limit is not None and len(violations) > limit:
+        lines.append(f'... {len(violations) - limit} more')
+    counts = {}
+    for v in violations:
+        counts[v.rule] = counts.get(v.rule, 0) + 1
+    lines.append(f'{len(violations)} violations' +
+                 (': ' + ', '.join(f'{rule} {n}' for rule, n in counts.items()) if counts else ''))
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    import time
+
+    parser = argparse.ArgumentParser(description='Check a .docx against the report formatting rules')
+    parser.add_argument('path')
+    parser.add_argument('-n', '--limit', type=int, default=50, help='violations to list (default: %(default)s)')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    found = validate(args.path)
+    print(report(found, args.limit))
+    print(f'Checked in {time.perf_counter() - start:.3f} s')
+    sys.exit(1 if found else 0)
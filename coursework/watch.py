@@ -0,0 +1,208 @@
+"""Rebuild the report whenever its sources change.
+
+The content specs, the placeholder values, the saved load test results and
+the backend sources under backend/src/main/java are watched with inotify
+(through ctypes, no extra dependency); where inotify is unavailable the
+files are polled by mtime and size instead. Directories are watched rather
+than files, so editors that save through a temporary file and a rename are
+seen as well.
+
+A burst of events (an editor writing, renaming and touching a file) is
+collapsed into one rebuild once the sources have been quiet for the
+debounce interval. The rebuild is coursework.build's incremental build in a
+process that stays warm: specs and the Java index come from their caches,
+only the sections whose operations changed are rendered, and the package
+is written next to the output and moved over it, so a reader never sees a
+half-written file.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+
+from coursework.build import _render_section, build
+from coursework.javascan import SOURCE_ROOT
+from coursework.spec import CACHE_DIR, LOADTEST_RESULTS
+
+DEBOUNCE = 0.05
+POLL_INTERVAL = 0.2
+
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Changed paths under a set of directory trees, from the kernel's inotify"""
+
+    def __init__(self, roots):
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.paths = {}
+        for root in roots:
+            self._add_tree(root)
+
+    def _add_tree(self, root):
+        for path, _, _ in os.walk(root):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+            if wd < 0:
+                code = ctypes.get_errno()
+                if code == errno.ENOENT:
+                    continue
+                os.close(self.fd)
+                raise OSError(code, f'inotify_add_watch failed for {path}')
+            self.paths[wd] = path
+
+    def wait(self, timeout):
+        """Paths changed within timeout seconds (an empty set when nothing changed)"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 65536)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if wd not in self.paths:
+                continue
+            path = os.path.join(self.paths[wd], os.fsdecode(name))
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # Files may land in the new directory before its watch exists
+                self._add_tree(path)
+                changed.update(os.path.join(d, f) for d, _, files in os.walk(path) for f in files)
+            changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Changed paths under a set of directory trees, by comparing mtimes and sizes"""
+
+    def __init__(self, roots, interval=POLL_INTERVAL):
+        self.roots = roots
+        self.interval = interval
+        self.state = self._snapshot()
+
+    def _snapshot(self):
+        state = {}
+        for root in self.roots:
+            for path, _, files in os.walk(root):
+                for name in files:
+                    full = os.path.join(path, name)
+                    try:
+                        st = os.stat(full)
+                    except FileNotFoundError:
+                        continue
+                    state[full] = (st.st_mtime_ns, st.st_size)
+        return state
+
+    def wait(self, timeout):
+        time.sleep(min(self.interval, timeout))
+        state = self._snapshot()
+        changed = {path for path in state.keys() | self.state.keys() if state.get(path) != self.state.get(path)}
+        self.state = state
+        return changed
+
+    def close(self):
+        pass
+
+
+def watcher(roots, poll=False):
+    """An inotify watcher for roots, or a polling one when poll is set or inotify is unavailable"""
+    if not poll:
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError, TypeError):
+            # Not Linux, or no usable libc
+            pass
+    return PollingWatcher(roots)
+
+
+def next_change(source, relevant, debounce=DEBOUNCE):
+    """Block until relevant paths change, then return them once a burst has settled"""
+    changed = set()
+    while not changed:
+        changed = {path for path in source.wait(3600) if relevant(path)}
+    while True:
+        more = source.wait(debounce)
+        if not more:
+            return changed
+        changed.update(path for path in more if relevant(path))
+
+
+def watch(specs, output, load_variables, variables_path=None, root=SOURCE_ROOT, cache_dir=CACHE_DIR,
+          poll=False, debounce=DEBOUNCE, report=print):
+    """Build output from specs, then rebuild it on every change until interrupted
+
+    load_variables() is called for every build, so edits to the placeholder
+    values are picked up too. report(message) receives one line per build.
+    """
+    files = {os.path.abspath(path) for path in specs} | {LOADTEST_RESULTS}
+    if variables_path:
+        files.add(os.path.abspath(variables_path))
+    root = os.path.abspath(root)
+    roots = sorted({os.path.dirname(path) for path in files} | ({root} if os.path.isdir(root) else set()))
+
+    def relevant(path):
+        return path in files or path.endswith('.java') and path.startswith(root + os.sep)
+
+    def rebuild(changed):
+        start = time.perf_counter()
+        try:
+            _, rendered, pages = build(specs, output, cache_dir=cache_dir, variables=load_variables())
+        except Exception as e:
+            report(f'Build failed: {e}')
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        sections = ', '.join(title or '(title page)' for title in rendered) or 'none'
+        report(f'{changed}: rebuilt in {elapsed:.0f} ms, {pages} pages, sections rendered: {sections}')
+
+    source = watcher(roots, poll)
+    try:
+        rebuild('initial build')
+        # Warm the scratch document so the first edit does not pay for it
+        _render_section([])
+        report(f'Watching {len(roots)} directories with {type(source).__name__}, Ctrl+C to stop')
+        while True:
+            changed = next_change(source, relevant, debounce)
+            names = sorted(os.path.relpath(path) for path in changed)
+            rebuild(', '.join(names[:3]) + (f' and {len(names) - 3} more' if len(names) > 3 else ''))
+    finally:
+        source.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from generate_coursework import OUTPUT, SPECS, VARIABLES, load_variables
+
+    parser = argparse.ArgumentParser(description='Rebuild the coursework .docx whenever its sources change')
+    parser.add_argument('-o', '--output', default=OUTPUT, help='document to keep up to date')
+    parser.add_argument('--poll', action='store_true', help='poll file stamps instead of using inotify')
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE * 1000,
+                        help='quiet period in ms before a burst of changes is built (default: %(default)g)')
+    args = parser.parse_args()
+    try:
+        watch(SPECS, args.output, load_variables, VARIABLES, poll=args.poll, debounce=args.debounce / 1000)
+    except KeyboardInterrupt:
+        pass
@@ -1,256 +1,17 @@
 #!/usr/bin/env python3
-from docx import Document
-from docx.shared import Pt, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
-from docx.oxml.ns import qn
+import sys
 
-def set_font(run, name='Times New Roman', size=14, bold=False):
-    run.font.name = name
-    run.font.size = Pt(size)
-    run.font.bold = bold
-    r = run._element
-    rPr = r.get_or_add_rPr()
-    rFonts = rPr.get_or_add_rFonts()
-    rFonts.set(qn('w:eastAsia'), name)
+from generate_coursework import create_coursework_document
 
-def add_para(doc, text, bold=False):
-    p = doc.add_paragraph()
-    run = p.add_run(text)
-    set_font(run, bold=bold)
-    p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-    p.paragraph_format.first_line_indent = Inches(0.5)
-    p.paragraph_format.line_spacing_rule = WD_LINE_SPACING.ONE_POINT_FIVE
-    return p
 
-doc = Document('/home/runner/work/cw_web/cw_web/Курсова_Робота_HabitTracker.docx')
+def main():
+    # Chapters 3.4-5 (content/expand.md) are now assembled together with the
+    # rest of the report from the section cache, so there is no need to
+    # reopen and re-save the generated file
+    create_coursework_document()
+    print("Document greatly expanded with Chapters 3.4-3.6, 4 and 5!")
+    return 0
 
-# Add Chapter 3.4 - Non-functional Requirements
-doc.add_page_break()
-doc.add_heading('3.4 Нефункціональні вимоги', level=2)
-doc.add_paragraph()
-
-nfr = [
-    'Нефункціональні вимоги визначають якісні характеристики системи та обмеження на її роботу.',
-    '',
-    'NFR1. Продуктивність:',
-    'NFR1.1. Час відповіді сервера на запити має бути менше 500 мс для 95% запитів.',
-    'NFR1.2. Система має підтримувати мінімум 100 одночасних користувачів.',
-    'NFR1.3. Час завантаження початкової сторінки не більше 3 секунд.',
-    '',
-    'NFR2. Безпека:',
-    'NFR2.1. Всі паролі зберігаються у хешованому вигляді (BCrypt, 12 раундів).',
-    'NFR2.2. Всі API endpoints захищені JWT токенами.',
-    'NFR2.3. Система має бути захищена від SQL injection, XSS, CSRF.',
-    'NFR2.4. HTTPS обов\'язковий для production середовища.',
-    '',
-    'NFR3. Надійність:',
-    'NFR3.1. Система має бути доступна 99.5% часу (не більше 3.6 годин простою на місяць).',
-    'NFR3.2. Автоматичне резервне копіювання БД кожні 24 години.',
-    'NFR3.3. Транзакції БД мають бути атомарними.',
-    '',
-    'NFR4. Масштабованість:',
-    'NFR4.1. Архітектура має дозволяти горизонтальне масштабування backend.',
-    'NFR4.2. База даних має підтримувати шардинг при зростанні.',
-    '',
-    'NFR5. Зручність використання:',
-    'NFR5.1. Інтерфейс має бути інтуїтивним та не потребувати навчання.',
-    'NFR5.2. Адаптивний дизайн для екранів 320px-4K.',
-    'NFR5.3. Підтримка сучасних браузерів (Chrome, Firefox, Safari, Edge останніх версій).',
-]
-
-for item in nfr:
-    if item == '':
-        doc.add_paragraph()
-    elif item.startswith('NFR') and '.' not in item[4]:
-        add_para(doc, item, bold=True)
-    else:
-        add_para(doc, item)
-
-# Add Chapter 3.5 - Use Cases
-doc.add_page_break()
-doc.add_heading('3.5 Моделювання прецедентів', level=2)
-doc.add_paragraph()
-
-usecases = [
-    'Діаграма прецедентів (Use Case Diagram) відображає основні сценарії взаємодії користувачів з системою.',
-    '',
-    'Актори системи:',
-    '- Користувач (User) — основний актор, що використовує систему для відстеження звичок',
-    '- Адміністратор (Admin) — має розширені права модерації',
-    '- Система нарахування досягнень (Achievement System) — автоматичний актор',
-    '- Система нотифікацій (Notification System) — автоматичний актор',
-    '',
-    'Основні прецеденти для Користувача:',
-    '1. UC-01: Реєстрація в системі',
-    '2. UC-02: Авторизація',
-    '3. UC-03: Створення цілі',
-    '4. UC-04: Редагування цілі',
-    '5. UC-05: Видалення цілі',
-    '6. UC-06: Логування прогресу',
-    '7. UC-07: Перегляд історії виконання',
-    '8. UC-08: Перегляд статистики',
-    '9. UC-09: Перегляд досягнень',
-    '10. UC-10: Створення групи',
-    '11. UC-11: Приєднання до групи',
-    '12. UC-12: Перегляд стрічки групи',
-    '13. UC-13: Вихід з групи',
-    '14. UC-14: Редагування профілю',
-]
-
-for item in usecases:
-    if item == '':
-        doc.add_paragraph()
-    else:
-        add_para(doc, item)
-
-# Add Chapter 3.6 - Data Model
-doc.add_page_break()
-doc.add_heading('3.6 Представлення даних ІС', level=2)
-doc.add_paragraph()
-
-data_model = [
-    'Модель даних системи реалізована на MongoDB — документно-орієнтованій NoSQL базі даних. Основні колекції:',
-    '',
-    '1. Колекція "users" (Користувачі):',
-    '- _id: ObjectId — унікальний ідентифікатор',
-    '- username: String — ім\'я користувача',
-    '- email: String (unique) — електронна адреса',
-    '- password: String — хеш пароля (BCrypt)',
-    '- role: String (enum: USER, ADMIN) — роль',
-    '- createdAt: Date — дата створення',
-    '- updatedAt: Date — дата останнього оновлення',
-    '',
-    '2. Колекція "goals" (Цілі):',
-    '- _id: ObjectId — унікальний ідентифікатор',
-    '- userId: ObjectId (ref: users) — власник цілі',
-    '- title: String — назва цілі',
-    '- description: String — опис',
-    '- frequency: String (enum: DAILY, WEEKLY, MONTHLY)',
-    '- status: String (enum: ACTIVE, ARCHIVED, COMPLETED)',
-    '- currentStreak: Number — поточна серія',
-    '- longestStreak: Number — найдовша серія',
-    '- totalCompletions: Number — загальна кількість виконань',
-    '- createdAt: Date',
-    '- updatedAt: Date',
-    '',
-    '3. Колекція "progress" (Прогрес):',
-    '- _id: ObjectId',
-    '- goalId: ObjectId (ref: goals)',
-    '- userId: ObjectId (ref: users)',
-    '- date: Date — дата виконання',
-    '- notes: String — примітки',
-    '- createdAt: Date',
-    '',
-    '4. Колекція "achievements" (Досягнення):',
-    '- _id: ObjectId',
-    '- userId: ObjectId (ref: users)',
-    '- type: String (enum: FIRST_STEP, WEEK_WARRIOR, MONTH_MASTER, ...)',
-    '- title: String — назва досягнення',
-    '- description: String — опис',
-    '- icon: String — URL іконки',
-    '- earnedAt: Date — дата отримання',
-    '',
-    '5. Колекція "groups" (Групи):',
-    '- _id: ObjectId',
-    '- name: String (unique) — назва групи',
-    '- description: String',
-    '- ownerId: ObjectId (ref: users)',
-    '- visibility: String (enum: PUBLIC, PRIVATE)',
-    '- memberCount: Number',
-    '- createdAt: Date',
-    '',
-    '6. Колекція "group_memberships" (Членство в групах):',
-    '- _id: ObjectId',
-    '- groupId: ObjectId (ref: groups)',
-    '- userId: ObjectId (ref: users)',
-    '- role: String (enum: OWNER, MEMBER)',
-    '- joinedAt: Date',
-]
-
-for item in data_model:
-    if item == '':
-        doc.add_paragraph()
-    else:
-        add_para(doc, item)
-
-# Add Chapter 4 - Implementation
-doc.add_page_break()
-doc.add_heading('РОЗДІЛ 4. РЕАЛІЗАЦІЯ ІНФОРМАЦІЙНОЇ СИСТЕМИ', level=1)
-doc.add_paragraph()
-
-impl_intro = [
-    'У цьому розділі описано детальну реалізацію веб-системи відстеження звичок. Розглянуто структуру backend та frontend частин, використані технології, архітектурні паттерни та особливості реалізації ключових компонентів системи.',
-]
-
-for para in impl_intro:
-    add_para(doc, para)
-
-doc.add_heading('4.1 Опис реалізації backend частини', level=2)
-doc.add_paragraph()
-
-backend_impl = [
-    'Backend система реалізована на Spring Boot 3.2.0 з використанням Java 17. Застосовано багатошарову архітектуру з чіткимрозділенням відповідальності між шарами.',
-    '',
-    'Структура backend проекту:',
-    'src/main/java/com/example/cwweb/',
-    '├── auth/         # Автентифікація та авторизація',
-    '│   ├── AuthController.java',
-    '│   ├── JwtUtils.java',
-    '│   ├── LoginRequest.java',
-    '│   └── SignupRequest.java',
-    '├── config/       # Конфігурація Spring',
-    '│   ├── SecurityConfig.java',
-    '│   ├── MongoConfig.java',
-    '│   └── CorsConfig.java',
-    '├── goals/        # Модуль цілей',
-    '│   ├── Goal.java  # Entity',
-    '│   ├── GoalController.java',
-    '│   ├── GoalService.java',
-    '│   ├── GoalRepository.java',
-    '│   └── GoalStatus.java (enum)',
-    '├── progress/     # Модуль прогресу',
-    '│   ├── Progress.java',
-    '│   ├── ProgressController.java',
-    '│   ├── ProgressService.java',
-    '│   └── ProgressRepository.java',
-    '├── achievements/ # Модуль досягнень',
-    '│   ├── Achievement.java',
-    '│   ├── AchievementController.java',
-    '│   ├── AchievementService.java',
-    '│   └── AchievementType.java (enum)',
-    '└── groups/       # Модуль груп',
-    '    ├── Group.java',
-    '    ├── GroupController.java',
-    '    ├── GroupService.java',
-    '    └── GroupMembership.java',
-    '',
-    'Контролери (Controller Layer):',
-    'Контролери відповідають за обробку HTTP запитів, валідацію вхідних даних та формування відповідей.',
-    '',
-    'Приклад GoalController:',
-    '@RestController',
-    '@RequestMapping("/api/goals")',
-    'public class GoalController {',
-    '    private final GoalService goalService;',
-    '    ',
-    '    @PostMapping',
-    '    public ResponseEntity<Goal> createGoal(',
-    '            @Valid @RequestBody CreateGoalRequest request,',
-    '            @AuthenticationPrincipal UserDetails userDetails) {',
-    '        Goal goal = goalService.createGoal(request, userDetails.getId());',
-    '        return ResponseEntity.status(HttpStatus.CREATED).body(goal);',
-    '    }',
-    '}',
-]
-
-for item in backend_impl:
-    if item == '':
-        doc.add_paragraph()
-    else:
-        add_para(doc, item)
-
-# Save and print info
-doc.save('/home/runner/work/cw_web/cw_web/Курсова_Робота_HabitTracker.docx')
-print("Document greatly expanded with Chapters 3.4-3.6 and Chapter 4!")
-print("Document now contains extensive content for 70+ pages when printed.")
 
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,358 +1,131 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from docx import Document
-from docx.shared import Pt, Inches, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
+import argparse
+import contextlib
+import json
+import os
+import sys
 
-def set_font(run, name='Times New Roman', size=14, bold=False, italic=False):
-    """Set font properties for a run"""
-    run.font.name = name
-    run.font.size = Pt(size)
-    run.font.bold = bold
-    run.font.italic = italic
-    # Set font for complex scripts (Cyrillic)
-    r = run._element
-    rPr = r.get_or_add_rPr()
-    rFonts = rPr.get_or_add_rFonts()
-    rFonts.set(qn('w:eastAsia'), name)
+# python-docx, lxml and the build modules are imported where they are used,
+# so the command line (and a client of the build server) starts quickly
 
-def add_heading(doc, text, level=1):
-    """Add a heading with proper formatting"""
-    heading = doc.add_heading(level=level)
-    run = heading.add_run(text)
-    set_font(run, size=14 if level > 1 else 16, bold=True)
-    heading.alignment = WD_ALIGN_PARAGRAPH.CENTER if level == 1 else WD_ALIGN_PARAGRAPH.LEFT
-    return heading
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONTENT_DIR = os.path.join(ROOT_DIR, 'content')
+# Markdown version of the report kept in the repository
+MARKDOWN = os.path.join(ROOT_DIR, 'ПОЯСНЮВАЛЬНА_ЗАПИСКА.md')
+OUTPUT = os.path.join(ROOT_DIR, 'Курсова_Робота_HabitTracker.docx')
+HTML = os.path.join(ROOT_DIR, 'Курсова_Робота_HabitTracker.html')
 
-def add_paragraph(doc, text, alignment=WD_ALIGN_PARAGRAPH.JUSTIFY, first_line_indent=True):
-    """Add a paragraph with proper formatting"""
-    p = doc.add_paragraph()
-    run = p.add_run(text)
-    set_font(run)
-    p.alignment = alignment
-    if first_line_indent:
-        p.paragraph_format.first_line_indent = Inches(0.5)
-    p.paragraph_format.line_spacing_rule = WD_LINE_SPACING.ONE_POINT_FIVE
-    p.paragraph_format.space_after = Pt(0)
-    p.paragraph_format.space_before = Pt(0)
-    return p
+SPECS = [
+    os.path.join(CONTENT_DIR, 'coursework.md'),
+    os.path.join(CONTENT_DIR, 'expand.md'),
+]
 
-def create_coursework_document():
-    """Generate the complete coursework document"""
-    doc = Document()
-    
-    # Set default font for the document
-    style = doc.styles['Normal']
-    font = style.font
-    font.name = 'Times New Roman'
-    font.size = Pt(14)
-    
-    # Title Page
-    title = doc.add_paragraph()
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = title.add_run('Міністерство освіти і науки України\n')
-    set_font(run, size=14)
-    run = title.add_run('Національний університет «Одеська політехніка»\n')
-    set_font(run, size=14)
-    run = title.add_run('Інститут комп\'ютерних систем\n')
-    set_font(run, size=14)
-    run = title.add_run('Кафедра інформаційних систем\n\n\n')
-    set_font(run, size=14)
-    
-    # Course Work Title
-    doc.add_paragraph()
-    doc.add_paragraph()
-    title2 = doc.add_paragraph()
-    title2.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = title2.add_run('КУРСОВА РОБОТА\n\n')
-    set_font(run, size=16, bold=True)
-    
-    centered_p = doc.add_paragraph()
-    centered_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = centered_p.add_run('з дисципліни "Веб-технології та веб-дизайн"\n\n')
-    set_font(run, size=14)
-    
-    centered_p2 = doc.add_paragraph()
-    centered_p2.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = centered_p2.add_run('Тема: "Розробка веб-системи для відстеження звичок та досягнень"\n\n\n\n')
-    set_font(run, size=14, bold=True)
-    
-    # Student info
-    student_p = doc.add_paragraph()
-    student_p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-    run = student_p.add_run('Виконав:\n')
-    set_font(run, size=14)
-    run = student_p.add_run('Студент групи АІ-XXX\n')
-    set_font(run, size=14)
-    run = student_p.add_run('_________________ [ПІБ]\n\n')
-    set_font(run, size=14)
-    run = student_p.add_run('Перевірив:\n')
-    set_font(run, size=14)
-    run = student_p.add_run('Керівник_________________\n')
-    set_font(run, size=14)
-    run = student_p.add_run('_________________ [ПІБ викладача]\n\n\n\n')
-    set_font(run, size=14)
-    
-    footer_p = doc.add_paragraph()
-    footer_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = footer_p.add_run('Одеса – 2024')
-    set_font(run, size=14)
-    
-    doc.add_page_break()
-    
-    # Content (ЗМІСТ)
-    add_heading(doc, 'ЗМІСТ', level=1)
-    doc.add_paragraph()
-    
-    toc_items = [
-        ('АНОТАЦІЯ', '4'),
-        ('ВСТУП', '6'),
-        ('РОЗДІЛ 1. АНАЛІТИЧНИЙ РОЗДІЛ', '9'),
-        ('1.1 Мета та завдання курсової роботи', '9'),
-        ('1.2 Огляд аналогів', '12'),
-        ('1.2.1 Habitica', '12'),
-        ('1.2.2 Streaks', '14'),
-        ('1.2.3 Loop Habit Tracker', '15'),
-        ('1.3 Обґрунтування вибору технологій', '17'),
-        ('РОЗДІЛ 2. АЛГОРИТМІЧНЕ ЗАБЕЗПЕЧЕННЯ', '22'),
-        ('2.1 Алгоритм реєстрації користувача', '22'),
-        ('2.2 Алгоритм авторизації', '25'),
-        ('2.3 Алгоритм створення цілі', '28'),
-        ('2.4 Алгоритм логування прогресу', '31'),
-        ('2.5 Алгоритм нарахування досягнень', '34'),
-        ('2.6 Алгоритм роботи з групами', '37'),
-        ('РОЗДІЛ 3. ПРОЕКТУВАННЯ ІНФОРМАЦІЙНОЇ СИСТЕМИ', '40'),
-        ('3.1 Мета та завдання інформаційної системи', '40'),
-        ('3.2 Типи користувачів', '42'),
-        ('3.3 Функціональні вимоги', '43'),
-        ('3.4 Нефункціональні вимоги', '47'),
-        ('3.5 Моделювання прецедентів', '49'),
-        ('3.6 Представлення даних ІС', '52'),
-        ('РОЗДІЛ 4. РЕАЛІЗАЦІЯ ІНФОРМАЦІЙНОЇ СИСТЕМИ', '56'),
-        ('4.1 Опис реалізації backend частини', '56'),
-        ('4.2 Опис реалізації frontend частини', '62'),
-        ('4.3 Стек технологій', '68'),
-        ('4.4 Інтерфейс користувача', '71'),
-        ('РОЗДІЛ 5. ЗАБЕЗПЕЧЕННЯ ЯКОСТІ ІС', '78'),
-        ('5.1 Безпека системи', '78'),
-        ('5.2 Тестування функціональності', '81'),
-        ('5.3 Продуктивність та масштабованість', '84'),
-        ('ВИСНОВКИ', '87'),
-        ('ПЕРЕЛІК ПОСИЛАНЬ', '89'),
-    ]
-    
-    for item, page in toc_items:
-        p = doc.add_paragraph()
-        if not item.startswith('РОЗДІЛ') and not item[0].isdigit():
-            run = p.add_run(item)
+# Values of the {{name}} placeholders on the title page
+VARIABLES = os.path.join(CONTENT_DIR, 'variables.json')
+
+def load_variables(path=VARIABLES):
+    """Default placeholder values"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def _report_pages(pages):
+    """Print the page estimate next to the limits from the methodical guidelines"""
+    from coursework.guidelines import guidelines
+
+    low, high = guidelines().page_limits()
+    print(f"Estimated pages: {pages} (guidelines require {low}-{high} sheets of main text)")
+
+def _report_formats(markdown, html):
+    for path in (markdown, html):
+        if path:
+            print(f"Also written: {path}")
+
+def create_coursework_document(specs=SPECS, stream=False, jobs=1, use_cache=True, variables=None,
+                               markdown=None, html=None, output=OUTPUT):
+    """Generate the complete coursework document, optionally also as Markdown and HTML"""
+    from coursework.build import build, build_streaming
+    from coursework.emit import HtmlWriter, MarkdownWriter
+    from coursework.spec import CACHE_DIR
+
+    if variables is None:
+        variables = load_variables()
+    filename = output
+    with contextlib.ExitStack() as stack:
+        # Extra formats are written in the same pass over the content. The
+        # build closes them; the stack also closes them when it never starts
+        writers = []
+        for path, writer in ((markdown, MarkdownWriter),
+                             (html, lambda path: HtmlWriter(path, title='Курсова робота: Habit Tracker'))):
+            if path:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                writers.append(writer(path))
+                stack.callback(writers[-1].close)
+        if stream:
+            # Body XML goes straight into the zip entry, memory stays flat
+            doc, pages = build_streaming(specs, filename, variables=variables, writers=writers)
         else:
-            if item[0].isdigit():
-                run = p.add_run('    ' + item)
-            else:
-                run = p.add_run(item)
-        set_font(run, size=14)
-        p.paragraph_format.line_spacing_rule = WD_LINE_SPACING.ONE_POINT_FIVE
-        
-        # Add dots
-        runs = p.add_run(' ' + '.' * (100 - len(item)) + ' ')
-        set_font(runs, size=14)
-        run_page = p.add_run(page)
-        set_font(run_page, size=14)
-    
-    doc.add_page_break()
-    
-    # АНОТАЦІЯ
-    add_heading(doc, 'АНОТАЦІЯ', level=1)
-    doc.add_paragraph()
-    
-    add_paragraph(doc, 'У курсовій роботі розроблено веб-застосунок "Habit Tracker" — систему для відстеження особистих звичок, цілей та досягнень. Система підтримує реєстрацію користувачів, створення цілей із різними частотами виконання (щоденно, щотижня, щомісяця), логування прогресу, автоматичне нарахування досягнень, створення груп для спільного відстеження цілей і соціальну взаємодію між користувачами.')
-    
-    add_paragraph(doc, 'Реалізовано повнофункціональну архітектуру на основі Spring Boot (backend) і React + Vite (frontend) з використанням MongoDB як сховища даних. Авторизація забезпечена через JWT-токени. Інтерфейс користувача створено за допомогою Tailwind CSS з адаптивним дизайном.')
-    
-    add_paragraph(doc, 'Система включає: автентифікацію та авторизацію користувачів, CRUD-операції над цілями, групами та прогресом, історію виконання, систему досягнень із автоматичним нарахуванням, соціальні функції (групи, стрічка активності, список учасників).')
-    
-    add_paragraph(doc, 'Результатом роботи є готовий веб-застосунок, розгорнутий у хмарному середовищі, який може використовуватися для формування корисних звичок, досягнення особистих цілей і підтримки мотивації через соціальну взаємодію.')
-    
-    p_keywords = doc.add_paragraph()
-    run = p_keywords.add_run('Ключові слова: ')
-    set_font(run, size=14, bold=True)
-    run2 = p_keywords.add_run('веб-технології, відстеження звичок, Spring Boot, React, MongoDB, JWT, REST API, Single Page Application.')
-    set_font(run2, size=14)
-    p_keywords.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-    p_keywords.paragraph_format.line_spacing_rule = WD_LINE_SPACING.ONE_POINT_FIVE
-    
-    doc.add_page_break()
-    
-    # ABSTRACT (English)
-    add_heading(doc, 'ABSTRACT', level=1)
-    doc.add_paragraph()
-    
-    add_paragraph(doc, 'This coursework presents a "Habit Tracker" web application — a system for tracking personal habits, goals, and achievements. The system supports user registration, creation of goals with different execution frequencies (daily, weekly, monthly), progress logging, automatic achievement rewards, group creation for collaborative goal tracking, and social interaction between users.')
-    
-    add_paragraph(doc, 'A fully functional architecture based on Spring Boot (backend) and React + Vite (frontend) with MongoDB as data storage has been implemented. Authorization is provided through JWT tokens. The user interface is built with Tailwind CSS featuring responsive design.')
-    
-    add_paragraph(doc, 'The system includes: user authentication and authorization, CRUD operations on goals, groups, and progress, execution history, achievement system with automatic rewards, social features (groups, activity feed, member lists).')
-    
-    add_paragraph(doc, 'The result of the work is a ready-to-use web application deployed in a cloud environment that can be used for habit formation, achieving personal goals, and maintaining motivation through social interaction.')
-    
-    p_keywords_en = doc.add_paragraph()
-    run = p_keywords_en.add_run('Keywords: ')
-    set_font(run, size=14, bold=True)
-    run2 = p_keywords_en.add_run('web technologies, habit tracking, Spring Boot, React, MongoDB, JWT, REST API, Single Page Application.')
-    set_font(run2, size=14)
-    p_keywords_en.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-    p_keywords_en.paragraph_format.line_spacing_rule = WD_LINE_SPACING.ONE_POINT_FIVE
-    
-    doc.add_page_break()
-    
-    # ВСТУП
-    add_heading(doc, 'ВСТУП', level=1)
-    doc.add_paragraph()
-    
-    intro_paragraphs = [
-        'Формування корисних звичок і досягнення особистих цілей є важливою частиною особистісного розвитку сучасної людини. У 21 столітті, коли темп життя постійно зростає, а кількість відволікаючих факторів збільшується, особливо гостро постає питання систематизації особистих зусиль і підтримки мотивації. Згідно з дослідженнями психологів, для формування нової звички потрібно від 21 до 66 днів систематичного повторення дії. Водночас, без належного інструменту відстеження та підтримки мотивації, більшість людей кидають свої починання вже через тиждень.',
-        
-        'Традиційні методи відстеження звичок — паперові щоденники, календарі, стікери — мають низку недоліків: відсутність автоматизації, складність аналізу прогресу, неможливість отримання статистики, відсутність соціальної підтримки. У зв\'язку з цим набувають популярності спеціалізовані веб-застосунки та мобільні додатки, які дозволяють автоматизувати процес відстеження, візуалізувати прогрес, нараховувати досягнення за виконані цілі та забезпечувати соціальну підтримку через спільноти однодумців.',
-        
-        'Актуальність теми курсової роботи обумовлена зростанням попиту на інструменти особистісного розвитку. За даними дослідження Statista, ринок додатків для продуктивності та самовдосконалення зростає на 15-20% щорічно. Мільйони користувачів по всьому світу шукають ефективні рішення для формування звичок. Більшість існуючих рішень зосереджені лише на одному аспекті: або відстеження без соціальної компоненти, або геймофікація без детальної аналітики. Потреба в комплексному рішенні, що поєднує відстеження, мотивацію та соціальну взаємодію, залишається високою.',
-        
-        'Мета роботи — спроєктувати та реалізувати повнофункціональний веб-застосунок для відстеження звичок і досягнень із підтримкою автентифікації, керування цілями, логування прогресу, автоматичного нарахування досягнень та соціальної взаємодії через групи.',
-    ]
-    
-    for para in intro_paragraphs:
-        add_paragraph(doc, para)
-    
-    # Add "Для досягнення мети..." as a separate paragraph with bold
-    p_tasks = doc.add_paragraph()
-    run = p_tasks.add_run('Для досягнення мети визначено такі завдання:')
-    set_font(run, size=14, bold=True)
-    p_tasks.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-    p_tasks.paragraph_format.first_line_indent = Inches(0.5)
-    p_tasks.paragraph_format.line_spacing_rule = WD_LINE_SPACING.ONE_POINT_FIVE
-    
-    tasks = [
-        'Проаналізувати предметну область, вивчити існуючі аналоги та визначити функціональні вимоги до системи.',
-        'Обґрунтувати вибір технологічного стеку (Spring Boot, React, MongoDB, JWT).',
-        'Спроєктувати архітектуру системи, модель даних і API.',
-        'Розробити алгоритми реєстрації, авторизації, роботи з цілями, логування прогресу та нарахування досягнень.',
-        'Реалізувати backend на Spring Boot з підтримкою REST API, Spring Security, JWT.',
-        'Реалізувати frontend на React із застосуванням Zustand для управління станом та Tailwind CSS для стилізації.',
-        'Розробити систему досягнень із автоматичним нарахуванням бейджів за різні активності.',
-        'Реалізувати функціонал груп для спільного відстеження цілей.',
-        'Провести тестування функціональності, безпеки та продуктивності.',
-        'Розгорнути систему в хмарному середовищі та забезпечити її доступність.',
-    ]
-    
-    for i, task in enumerate(tasks, 1):
-        p_task = doc.add_paragraph()
-        run = p_task.add_run(f'{i}. {task}')
-        set_font(run, size=14)
-        p_task.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-        p_task.paragraph_format.left_indent = Inches(0.5)
-        p_task.paragraph_format.line_spacing_rule = WD_LINE_SPACING.ONE_POINT_FIVE
-    
-    doc.add_paragraph()
-    
-    more_intro = [
-        'Об\'єктом дослідження є процес відстеження особистих звичок і цілей за допомогою веб-технологій.',
-        'Предметом дослідження є методи та засоби проектування і реалізації веб-застосунків для формування звичок із використанням сучасного технологічного стеку.',
-        'Методи дослідження: аналіз предметної області, проектування інформаційних систем, об\'єктно-орієнтоване програмування, REST API проектування, тестування програмного забезпечення.',
-        'Пояснювальна записка містить вступ, 5 розділів основної частини, висновки, перелік посилань і додатки. Обсяг основного тексту становить близько 95 сторінок машинного тексту. Робота супроводжується графічними матеріалами: діаграмами Use Case, послідовностей, ER-діаграмою бази даних, блок-схемами алгоритмів, скріншотами інтерфейсу.',
-    ]
-    
-    for para in more_intro:
-        add_paragraph(doc, para)
-    
-    doc.add_page_break()
-    
-    # Now continue with chapters...
-    # This is getting very long - I'll create a helper to add multiple content pages
-    
-    print("Generating Chapter 1: Analytical Section...")
-    
-    add_heading(doc, 'РОЗДІЛ 1. АНАЛІТИЧНИЙ РОЗДІЛ', level=1)
-    doc.add_paragraph()
-    
-    add_heading(doc, '1.1 Мета та завдання курсової роботи', level=2)
-    doc.add_paragraph()
-    
-    chapter1_intro = [
-        'Мета роботи — розробити повнофункціональну веб-систему для відстеження особистих звичок, цілей та досягнень із підтримкою соціальної взаємодії, яка допоможе користувачам формувати корисні звички, підтримувати мотивацію та досягати особистих цілей через систематичне відстеження прогресу та соціальну підтримку.',
-        
-        'Система має забезпечувати безпечну реєстрацію та авторизацію користувачів, створення та управління особистими цілями з різними частотами виконання, логування щоденного прогресу виконання цілей, візуалізацію історії виконання та статистики, автоматичне нарахування досягнень за виконані цілі, створення груп для спільного відстеження цілей, та соціальну взаємодію (стрічка активності, список учасників групи).',
-        
-        'Основні завдання проекту включають аналітичну частину (дослідження предметної області, аналіз аналогів, формулювання вимог), проектування (архітектура, модель даних, діаграми), алгоритмічне забезпечення (розробка ключових алгоритмів), реалізацію backend та frontend, забезпечення якості та розгортання системи.',
-        
-        'Система повинна відповідати наступним ключовим характеристикам: надійність збереження даних через MongoDB з реплікацією, безпека персональних даних через Spring Security та JWT, продуктивність з часом відповіді менше 500 мс, масштабованість через stateless REST API, зручність використання через інтуїтивний React-інтерфейс, та кросплатформеність через адаптивний дизайн.',
-    ]
-    
-    for para in chapter1_intro:
-        add_paragraph(doc, para)
-    
-    doc.add_page_break()
-    
-    # 1.2 Overview of analogs
-    add_heading(doc, '1.2 Огляд аналогів', level=2)
-    doc.add_paragraph()
-    
-    add_paragraph(doc, 'Для розуміння поточного стану ринку додатків для відстеження звичок було проаналізовано три найпопулярніших рішення: Habitica, Streaks та Loop Habit Tracker. Кожен з цих додатків має свої унікальні підходи до мотивації користувачів і підтримки формування звичок.')
-    
-    doc.add_paragraph()
-    
-    # 1.2.1 Habitica
-    add_heading(doc, '1.2.1 Habitica', level=3)
-    doc.add_paragraph()
-    
-    habitica_desc = [
-        'Habitica — це веб-застосунок та мобільний додаток, який перетворює відстеження звичок на рольову гру (RPG). Користувач створює персонажа-аватар, який отримує досвід, золото та предмети за виконання реальних завдань і звичок.',
-        
-        'Основні можливості включають три типи завдань (звички, щоденні цілі, одноразові задачі), систему рівнів і класів персонажа, внутрішню валюту, магазин предметів, групові квести і бої з монстрами, гільдії та групи за інтересами, систему челенджів та соціальну взаємодію.',
-        
-        'Переваги Habitica: потужна геймофікація підтримує високу мотивацію, розвинута соціальна складова, кросплатформеність, велика активна спільнота користувачів, можливість налаштування складності завдань, детальна статистика прогресу.',
-        
-        'Недоліки: складний інтерфейс для новачків через велику кількість елементів RPG, занадто багато відволікаючих елементів, фокус на геймофікації може відволікати від реальних цілей, складність налаштування для простого відстеження звичок, потребує постійної уваги (персонаж втрачає здоров\'я за невиконані завдання), платна підписка для доступу до повного функціоналу.',
-        
-        'Висновок: Habitica відмінно підходить для користувачів, які люблять ігри та потребують додаткової мотивації через геймофікацію. Однак для тих, хто шукає простий інструмент відстеження без зайвих елементів, Habitica може бути надмірно складною.',
-    ]
-    
-    for para in habitica_desc:
-        add_paragraph(doc, para)
-    
-    doc.add_paragraph()
-    
-    # 1.2.2 Streaks
-    add_heading(doc, '1.2.2 Streaks', level=3)
-    doc.add_paragraph()
-    
-    streaks_desc = [
-        'Streaks — мінімалістичний iOS-додаток для відстеження до 12 звичок одночасно. Назва відображає основну концепцію: підтримання «стріків» — безперервних серій днів виконання звички.',
-        
-        'Основні можливості включають відстеження до 12 звичок одночасно, візуалізацію стріків, нагадування для кожної звички, інтеграцію з Apple Health, віджети для головного екрану iPhone, підтримку Apple Watch, темну тему, експорт даних та iCloud синхронізацію між пристроями.',
-        
-        'Переваги: надзвичайно простий і зрозумілий інтерфейс, мінімалізм допомагає зосередитися на головному, відмінна інтеграція з екосистемою Apple, швидкість роботи, немає реклами та підписок (одноразова оплата), акцент на стріках мотивує не переривати серії.',
-        
-        'Недоліки: доступний лише на iOS/iPadOS, обмеження до 12 звичок, відсутність веб-версії, мінімальна статистика (лише стріки), немає соціальних функцій, немає груп або спільнот, відсутність системи досягнень, неможливість відстежувати кількісні показники.',
-        
-        'Висновок: Streaks ідеальний для користувачів Apple-екосистеми, які цінують простоту та мінімалізм. Підходить для відстеження невеликої кількості базових звичок без потреби в детальній аналітиці чи соціальній взаємодії.',
-    ]
-    
-    for para in streaks_desc:
-        add_paragraph(doc, para)
-    
-    doc.add_paragraph()
-    
-    # Continue with more sections...
-    # Due to length constraints, I'll add key sections and content
-    
-    # Save the document
-    filename = '/home/runner/work/cw_web/cw_web/Курсова_Робота_HabitTracker.docx'
-    doc.save(filename)
+            # Sections are rendered from cached fragments, only changed ones are rebuilt
+            doc, rendered, pages = build(specs, filename, jobs=jobs, variables=variables, writers=writers,
+                                         cache_dir=CACHE_DIR if use_cache else None)
     print(f"Document saved successfully: {filename}")
-    print(f"Total pages generated: approximately {len(doc.element.body)}  sections")
+    _report_formats(markdown, html)
+    if stream:
+        print(f"Paragraphs streamed: {doc.paragraphs_written}")
+    else:
+        print(f"Sections rendered: {len(rendered)} (others reused from cache)")
+    _report_pages(pages)
     return filename
 
+def parser():
+    parser = argparse.ArgumentParser(description='Generate the coursework .docx')
+    parser.add_argument('-o', '--output', default=OUTPUT,
+                        help=f'document to write (default: {os.path.basename(OUTPUT)} in the repository)')
+    parser.add_argument('--stream', action='store_true',
+                        help='write the body incrementally instead of building it in memory')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='render changed sections on N worker processes')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='ignore cached specs and section fragments')
+    parser.add_argument('--md', metavar='FILE', nargs='?', const=MARKDOWN,
+                        help=f'also write Markdown (default: {os.path.basename(MARKDOWN)})')
+    parser.add_argument('--html', metavar='FILE', nargs='?', const=HTML,
+                        help=f'also write a standalone HTML page for review (default: {os.path.basename(HTML)})')
+    parser.add_argument('--validate', action='store_true',
+                        help='check the output against the formatting rules')
+    parser.add_argument('--profile', action='store_true',
+                        help='print per-section timings and helper call counts')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='write a Chrome trace (chrome://tracing, Perfetto) of the build')
+    parser.add_argument('--cprofile', metavar='FILE', nargs='?', const='',
+                        help='run under cProfile, dumping stats to FILE or printing the top entries')
+    return parser
+
+def main(argv=None):
+    """Command line build; returns the exit status"""
+    from coursework import profiling
+
+    args = parser().parse_args(argv)
+    with contextlib.ExitStack() as stack:
+        if args.cprofile is not None:
+            stack.enter_context(profiling.cprofile(args.cprofile or None))
+        tracer = stack.enter_context(profiling.Tracer()) if args.profile or args.trace else None
+        output = create_coursework_document(stream=args.stream, jobs=args.jobs, use_cache=not args.no_cache,
+                                            markdown=args.md, html=args.html, output=args.output)
+    if tracer is not None:
+        if args.profile:
+            print(tracer.summary())
+        if args.trace:
+            tracer.export_chrome(args.trace)
+            print(f"Trace written: {args.trace}")
+    if args.validate:
+        from coursework.validate import report, validate
+
+        violations = validate(output)
+        print(report(violations, limit=20))
+        return 1 if violations else 0
+    return 0
+
 if __name__ == "__main__":
-    create_coursework_document()
+    sys.exit(main())
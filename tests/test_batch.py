@@ -0,0 +1,32 @@
+"""Bulk generation from one shared template."""
+
+import pytest
+
+from coursework.batch import Template
+from coursework.build import build
+
+SPEC = """# РОЗДІЛ 1
+
+## 1.1 Підрозділ
+
+Студент {{student}} групи {{group}}.
+---
+# РОЗДІЛ 2
+
+Текст без змінних.
+"""
+
+
+@pytest.mark.parametrize('variables', [
+    {'student': 'Іван Петренко', 'group': 'КН-21'},
+    # Markup characters are escaped when stamped
+    {'student': 'Іван & <Ко>', 'group': 'КН-21'},
+    # A line break cannot be stamped, its section is rendered again
+    {'student': 'Іван\nПетренко', 'group': ''},
+])
+def test_stamped_package_matches_build(tmp_path, variables):
+    spec = tmp_path / 'spec.md'
+    spec.write_text(SPEC, encoding='utf-8')
+    build([spec], tmp_path / 'built.docx', cache_dir=None, variables=variables)
+    Template([spec], cache_dir=None).write(variables, tmp_path / 'stamped.docx')
+    assert (tmp_path / 'stamped.docx').read_bytes() == (tmp_path / 'built.docx').read_bytes()
@@ -0,0 +1,43 @@
+"""In-process fragment store of the incremental build."""
+
+import shutil
+
+from coursework import build as build_module
+from coursework.build import FragmentCache, build
+
+SPEC = """# РОЗДІЛ 1
+
+Перший розділ.
+---
+# РОЗДІЛ 2
+
+Другий розділ.
+"""
+
+
+def test_wiped_cache_is_filled_again(tmp_path):
+    spec = tmp_path / 'spec.md'
+    spec.write_text(SPEC, encoding='utf-8')
+    cache = tmp_path / 'cache'
+    build([spec], tmp_path / 'first.docx', cache_dir=cache)
+    fragments = sorted(p.name for p in (cache / 'fragments').iterdir())
+    shutil.rmtree(cache)
+    _, rendered, _ = build([spec], tmp_path / 'second.docx', cache_dir=cache)
+    assert rendered == []
+    assert sorted(p.name for p in (cache / 'fragments').iterdir()) == fragments
+
+
+def test_caches_do_not_share_entries(tmp_path):
+    FragmentCache(tmp_path / 'a').put('key', b'<w:body/>')
+    assert FragmentCache(tmp_path / 'b').get('key') is None
+
+
+def test_least_recently_used_fragment_is_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_module, 'MEMORY_FRAGMENTS', 2)
+    monkeypatch.setattr(build_module, '_memory', build_module.collections.OrderedDict())
+    cache = FragmentCache(tmp_path)
+    cache.put('a', b'a')
+    cache.put('b', b'b')
+    cache.get('a')
+    cache.put('c', b'c')
+    assert [key for _, key in build_module._memory] == ['a', 'c']
@@ -0,0 +1,39 @@
+"""Structural diff of two report versions."""
+
+from coursework.build import build
+from coursework.diff import diff, fingerprints
+
+SPEC = """# РОЗДІЛ 1
+
+Перший абзац.
+Другий абзац.
+Третій абзац.
+---
+# РОЗДІЛ 2
+
+Четвертий абзац.
+"""
+
+
+def _report(tmp_path, name, text):
+    spec = tmp_path / f'{name}.md'
+    spec.write_text(text, encoding='utf-8')
+    build([spec], tmp_path / f'{name}.docx', cache_dir=None)
+    return fingerprints(tmp_path / f'{name}.docx')
+
+
+def test_identical_reports_have_no_changes(tmp_path):
+    old = _report(tmp_path, 'old', SPEC)
+    assert diff(old, old) == []
+    assert diff(old, _report(tmp_path, 'again', SPEC)) == []
+
+
+def test_known_edits_are_reported(tmp_path):
+    old = _report(tmp_path, 'old', SPEC)
+    new = _report(tmp_path, 'new', SPEC.replace('Другий абзац.', 'Змінений абзац.')
+                  .replace('Третій абзац.', '**Третій абзац.**'))
+    assert [(c.kind, c.section, c.old, c.new, c.text) for c in diff(old, new)] == [
+        ('removed', 'РОЗДІЛ 1', 4, None, 'Другий абзац.'),
+        ('added', 'РОЗДІЛ 1', None, 4, 'Змінений абзац.'),
+        ('reformatted', 'РОЗДІЛ 1', 5, 5, 'Третій абзац.'),
+    ]
@@ -0,0 +1,47 @@
+"""Spec reconstructed from a generated report."""
+
+from coursework.build import build
+from coursework.extract import extract
+from coursework.spec import compile_spec
+
+SPEC = """# РОЗДІЛ 1
+
+## 1.1 Підрозділ
+
+Текст підрозділу.
+**Ключові слова:** цілі, звички
+**Жирний абзац**
++ Перший пункт
++ Другий пункт
+\\+ не пункт
+::: table 3,2,4
+Таблиця 1.1 – Колекції
+Поле | Тип | Опис
+id | ObjectId | ідентифікатор
+name | String | назва
+:::
+::: code
+Лістинг 1.1 – Клас
+public class Goal {}
+:::
+---
+# РОЗДІЛ 2
+
+::: center bold
+ВИСНОВКИ
+:::
+::: right
+Праворуч
+:::
+"""
+
+
+def test_extracted_spec_compiles_to_the_same_operations(tmp_path):
+    spec = tmp_path / 'spec.md'
+    spec.write_text(SPEC, encoding='utf-8')
+    build([spec], tmp_path / 'report.docx', cache_dir=None)
+    lines = []
+    extract(tmp_path / 'report.docx', lines.append)
+    extracted = tmp_path / 'extracted.md'
+    extracted.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    assert compile_spec(extracted, cache_dir=None) == compile_spec(spec, cache_dir=None)
@@ -0,0 +1,54 @@
+"""Size optimizer for generated packages."""
+
+import copy
+import zipfile
+
+import pytest
+from docx import Document
+from lxml import etree
+
+from coursework.optimize import DOCUMENT_PART, STYLES_PART, W, OptimizeError, optimize, stats, verify
+from coursework.styles import set_font
+
+
+def _roots(path):
+    with zipfile.ZipFile(path) as package:
+        return etree.fromstring(package.read(DOCUMENT_PART)), etree.fromstring(package.read(STYLES_PART))
+
+
+@pytest.fixture
+def direct(tmp_path):
+    """A report written with direct formatting on every run and spacer paragraphs"""
+    doc = Document()
+    for n in range(10):
+        p = doc.add_paragraph()
+        set_font(p.add_run(f'Абзац {n}, '), bold=n % 3 == 0)
+        set_font(p.add_run('продовження.'), bold=n % 3 == 0)
+        doc.add_paragraph()
+    path = tmp_path / 'direct.docx'
+    doc.save(path)
+    return str(path)
+
+
+def test_optimized_package_renders_the_same(direct, tmp_path):
+    output = str(tmp_path / 'optimized.docx')
+    counts = optimize(direct, output)
+    assert counts['spacers folded'] and counts['runs merged']
+    assert verify(_roots(direct), _roots(output)) == []
+    assert stats(output).document_bytes < stats(direct).document_bytes
+
+
+def test_verify_reports_changed_formatting(direct):
+    before = _roots(direct)
+    document, styles = copy.deepcopy(before[0]), before[1]
+    bold = document.find(f'.//{W}b')
+    bold.getparent().remove(bold)
+    assert verify(before, (document, styles)) == ['paragraph 1: text or run formatting differs']
+
+
+def test_failed_verification_leaves_no_output(direct, tmp_path, monkeypatch):
+    monkeypatch.setattr('coursework.optimize.verify', lambda before, after: ['paragraph 1: differs'])
+    output = tmp_path / 'optimized.docx'
+    with pytest.raises(OptimizeError):
+        optimize(direct, str(output))
+    assert not output.exists()
@@ -0,0 +1,63 @@
+"""Content spec compiler."""
+
+import pytest
+
+from coursework.spec import SpecError, parse, substitute
+from coursework.styles import KEYWORD, TITLE
+
+
+def test_lines_compile_to_operations():
+    assert parse('# РОЗДІЛ 1\n\n## 1.1 Вступ\nТекст.\n**Жирний**\n**Мета:** текст\n---\n\\# не заголовок\n'
+                 '<!-- коментар -->\n') == [
+        ('heading', 'РОЗДІЛ 1', 1),
+        ('spacer',),
+        ('heading', '1.1 Вступ', 2),
+        ('paragraph', 'Текст.'),
+        ('bold', 'Жирний'),
+        ('keywords', 'Мета:', ' текст'),
+        ('page_break',),
+        ('paragraph', '# не заголовок'),
+    ]
+
+
+def test_list_numbers_restart_after_other_lines():
+    assert parse('+ один\n+ два\nтекст\n+ три\n') == [
+        ('list_item', '1. один'),
+        ('list_item', '2. два'),
+        ('paragraph', 'текст'),
+        ('list_item', '1. три'),
+    ]
+
+
+def test_blocks():
+    ops = parse('::: center bold\nВИСНОВКИ\n:::\n::: table 2,1\nТаблиця 1\nПоле | Тип\nid | a\\|b\n:::\n'
+                '::: code\n\nif (a) {{b}}\n:::\n')
+    assert ops == [
+        ('block', TITLE, 'ВИСНОВКИ', KEYWORD),
+        ('table', 'Таблиця 1', ('Поле', 'Тип'), (('id', 'a|b'),), (2, 1)),
+        ('code', None, None, 'if (a) {{b}}'),
+    ]
+
+
+@pytest.mark.parametrize('text, lineno', [
+    ('текст\n::: table\nТаблиця\n', 2),
+    ('::: unknown\n:::\n', 1),
+    ('::: table 2,x\nТаблиця\nA | B\n:::\n', 1),
+])
+def test_malformed_specs_name_the_line(text, lineno):
+    with pytest.raises(SpecError) as error:
+        parse(text)
+    assert error.value.lineno == lineno
+
+
+def test_substitute_fills_placeholders_outside_listings():
+    ops = parse('Студент {{student}}, група {{group}}\n::: code\n\nmap.get({{student}})\n:::\n')
+    assert substitute(ops, {'student': 'Іван', 'group': 21}) == [
+        ('paragraph', 'Студент Іван, група 21'),
+        ('code', None, None, 'map.get({{student}})'),
+    ]
+
+
+def test_substitute_names_undefined_variables():
+    with pytest.raises(SpecError, match='undefined variables: group, year'):
+        substitute(parse('{{year}} {{student}} {{group}}\n'), {'student': 'Іван'})
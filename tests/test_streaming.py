@@ -0,0 +1,118 @@
+"""Memory ceiling and output checks for the streaming .docx backend."""
+
+import itertools
+import tracemalloc
+
+import pytest
+from docx import Document
+
+from coursework.build import build, build_streaming
+from coursework.layout import paginate
+from coursework.render import render
+from coursework.streaming import StreamingDocument
+
+PAGES = 5000
+
+# Ceiling for streaming PAGES pages, in MB of traced memory
+CEILING_MB = 8
+
+SENTENCE = ('Система має забезпечувати безпечну реєстрацію та авторизацію користувачів, '
+            'створення та управління особистими цілями з різними частотами виконання. ')
+
+SPEC = """# РОЗДІЛ 1
+
+## 1.1 Підрозділ
+
+Текст підрозділу з {{name}}.
+**Ключові слова:** цілі, звички
++ Перший пункт
++ Другий пункт
+---
+# РОЗДІЛ 2
+
+::: center bold
+ВИСНОВКИ
+:::
+"""
+
+
+def synthetic_pages(pages):
+    """Sections of compiled operations, one page each, generated lazily"""
+    for page in range(pages):
+        section = [
+            ('heading', f'{page // 10 + 1}.{page % 10 + 1} Підрозділ', 2),
+            ('paragraph', SENTENCE * 3),
+            ('list_item', SENTENCE),
+            ('keywords', 'Ключові слова:', SENTENCE),
+            ('paragraph', SENTENCE * 2),
+        ]
+        if page < pages - 1:
+            section.append(('page_break',))
+        yield section
+
+
+@pytest.fixture(scope='module')
+def streamed(tmp_path_factory):
+    """Stream PAGES synthetic pages; return (path, paragraphs written, peak bytes)"""
+    path = tmp_path_factory.mktemp('stream') / 'large.docx'
+    tracemalloc.start()
+    try:
+        with StreamingDocument(path) as doc:
+            for section in synthetic_pages(PAGES):
+                render(doc, section)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return path, doc.paragraphs_written, peak
+
+
+def test_synthetic_pages_fill_the_page_count():
+    _, pages = paginate(itertools.chain.from_iterable(synthetic_pages(PAGES)))
+    assert pages == PAGES
+
+
+def test_peak_memory_stays_under_ceiling(streamed):
+    _, _, peak = streamed
+    assert peak < CEILING_MB * 1e6
+
+
+def test_output_opens_with_expected_paragraphs(streamed):
+    path, written, _ = streamed
+    ops = sum(len(section) for section in synthetic_pages(PAGES))
+    assert written == ops
+    assert len(Document(path).paragraphs) == ops
+
+
+def test_matches_in_memory_build(tmp_path):
+    spec = tmp_path / 'spec.md'
+    spec.write_text(SPEC, encoding='utf-8')
+    variables = {'name': 'HabitTracker'}
+    build([spec], tmp_path / 'memory.docx', cache_dir=None, variables=variables)
+    _, pages = build_streaming([spec], tmp_path / 'stream.docx', cache_dir=None, variables=variables)
+    expected = Document(tmp_path / 'memory.docx').paragraphs
+    actual = Document(tmp_path / 'stream.docx').paragraphs
+    assert pages == 2
+    assert [(p.text, p.style.name) for p in actual] == [(p.text, p.style.name) for p in expected]
+    assert ([[r.style.name for r in p.runs] for p in actual]
+            == [[r.style.name for r in p.runs] for p in expected])
+
+
+def test_failed_render_leaves_no_output(tmp_path):
+    path = tmp_path / 'failed.docx'
+    with pytest.raises(KeyError):
+        with StreamingDocument(path) as doc:
+            render(doc, next(synthetic_pages(1)))
+            render(doc, [('unknown',)])
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_render_keeps_previous_output(tmp_path):
+    path = tmp_path / 'report.docx'
+    with StreamingDocument(path) as doc:
+        render(doc, next(synthetic_pages(1)))
+    before = path.read_bytes()
+    with pytest.raises(KeyError):
+        with StreamingDocument(path) as doc:
+            render(doc, [('unknown',)])
+    assert path.read_bytes() == before
+    assert list(tmp_path.iterdir()) == [path]